@@ -0,0 +1,4 @@
+"""Benchmarks the hot paths of sweb: parsing, loading and analysing.
+
+Run them with ``python -m benchmarks`` (see benchmarks.__main__).
+"""
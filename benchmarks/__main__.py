@@ -0,0 +1,313 @@
+"""Runs the sweb benchmarks, and compares them with a baseline.
+
+The benchmarks measure:
+
+- parse_<engine>: pages parsed per second, by each sweb.parser engine;
+- load_site and load_bulk: rows loaded per second into SQLite,
+  one site at a time (sweb.loader.load_csv_into_sqlite) and in bulk;
+- rank_websites and get_webvisits_timeseries: latency, in seconds;
+- import_workflow: time to import sweb.workflow, which the sweb command pays
+  on every run, in a fresh interpreter, in seconds.
+
+They run on synthetic corpora (see benchmarks.corpus), as large as the options
+set, and keep the best of a few repetitions.
+The results are compared with a baseline of the same options, and a benchmark
+worse than the baseline by more than the threshold is a regression,
+failing the run.
+"""
+import argparse
+import dataclasses
+import json
+import sqlite3
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.corpus import scale_pages, write_sites_csv
+from sweb.analyser import get_webvisits_timeseries, rank_websites
+from sweb.loader import bulk_load_csv_into_sqlite, load_csv_into_sqlite
+from sweb.parser import ENGINES
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+THRESHOLD = 0.25
+
+TABLES = ("webvisits", "visitsbyage", "countryvisitsshare")
+
+IMPORT_TIMER = (
+    "import time; start = time.perf_counter(); import {module};"
+    " print(time.perf_counter() - start)"
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Result:
+    """The result of a benchmark."""
+
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    """Times a function, keeping its best time.
+
+    Args:
+        function: function to time.
+        repeat: number of times to call it.
+
+    Returns:
+        The shortest of the times it took, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _parse_all(parse: Callable[[str], Any], pages: List[str]) -> None:
+    for page in pages:
+        parse(page)
+
+
+def bench_parse(pages: int, repeat: int) -> Dict[str, Result]:
+    """Benchmarks parsing pages, with each parser engine.
+
+    Args:
+        pages: number of pages to parse.
+        repeat: number of times to parse them.
+
+    Returns:
+        The pages parsed per second by each engine.
+    """
+    htmls = list(scale_pages(pages))
+    return {
+        f"parse_{name}": Result(
+            pages / best_time(partial(_parse_all, parse, htmls), repeat),
+            "pages/s",
+            True,
+        )
+        for name, parse in ENGINES.items()
+    }
+
+
+def _load(
+    loader: Callable[[Path, Path], None], csv_file: Path, sqlite_file: Path
+) -> None:
+    sqlite_file.unlink(missing_ok=True)
+    loader(csv_file, sqlite_file)
+
+
+def count_rows(sqlite_file: Path) -> int:
+    """Counts the rows loaded into a DB.
+
+    Args:
+        sqlite_file: the SQLite DB.
+
+    Returns:
+        The number of rows of the tables loaded from the sites.
+    """
+    with sqlite3.connect(sqlite_file) as connection:
+        return sum(
+            connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]  # nosec
+            for table in TABLES
+        )
+
+
+def bench_load(csv_file: Path, sqlite_file: Path, repeat: int) -> Dict[str, Result]:
+    """Benchmarks loading sites into a DB, one site at a time and in bulk.
+
+    Args:
+        csv_file: csv file with the sites to load.
+        sqlite_file: SQLite file where to load them, left loaded.
+        repeat: number of times to load them.
+
+    Returns:
+        The rows loaded per second one site at a time, and in bulk.
+    """
+    results = {}
+    for name, loader in (
+        ("load_site", load_csv_into_sqlite),
+        ("load_bulk", bulk_load_csv_into_sqlite),
+    ):
+        seconds = best_time(partial(_load, loader, csv_file, sqlite_file), repeat)
+        results[name] = Result(count_rows(sqlite_file) / seconds, "rows/s", True)
+    return results
+
+
+def bench_analyse(sqlite_file: Path, repeat: int) -> Dict[str, Result]:
+    """Benchmarks analysing a DB.
+
+    Args:
+        sqlite_file: the SQLite DB to analyse.
+        repeat: number of times to analyse it.
+
+    Returns:
+        The latency of ranking the websites, and of querying their visits.
+    """
+    return {
+        "rank_websites": Result(
+            best_time(partial(rank_websites, sqlite_file), repeat), "s", False
+        ),
+        "get_webvisits_timeseries": Result(
+            best_time(
+                partial(get_webvisits_timeseries, sqlite_file, "total_visits"), repeat
+            ),
+            "s",
+            False,
+        ),
+    }
+
+
+def import_time(module: str) -> float:
+    """Times importing a module in a fresh interpreter.
+
+    Args:
+        module: name of the module.
+
+    Returns:
+        The time it took, in seconds, without the interpreter start up.
+    """
+    timer = subprocess.run(  # nosec
+        [sys.executable, "-c", IMPORT_TIMER.format(module=module)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return float(timer.stdout)
+
+
+def bench_import(repeat: int) -> Dict[str, Result]:
+    """Benchmarks importing the workflow, as the sweb command does.
+
+    Args:
+        repeat: number of times to import it.
+
+    Returns:
+        The time to import sweb.workflow.
+    """
+    seconds = min(import_time("sweb.workflow") for _ in range(repeat))
+    return {"import_workflow": Result(seconds, "s", False)}
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Compares benchmark results with a baseline.
+
+    Args:
+        results: the results to compare.
+        baseline: the baseline results, as reported (see report).
+        threshold: fraction by which a result can be worse than the baseline.
+
+    Returns:
+        A description of each regression, of the results worse than the baseline
+        by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["value"]
+        ratio = result.value / expected
+        if not result.higher_is_better:
+            ratio = 1 / ratio
+        if ratio < 1 - threshold:
+            regressions.append(
+                f"{name}: {result.value:.4g} {result.unit},"
+                f" baseline {expected:.4g} {result.unit}"
+            )
+    return regressions
+
+
+def report(params: Dict[str, int], results: Dict[str, Result]) -> Dict[str, Any]:
+    """Reports benchmark results.
+
+    Args:
+        params: the options the benchmarks ran with.
+        results: the results of the benchmarks.
+
+    Returns:
+        A JSON serializable report, to store as a baseline.
+    """
+    return {
+        "params": params,
+        "results": {
+            name: dataclasses.asdict(result) for name, result in results.items()
+        },
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    """Parses the command line options.
+
+    Args:
+        argv: the command line arguments, or None for sys.argv.
+
+    Returns:
+        The options.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Runs the sweb benchmarks."
+    )
+    parser.add_argument("--pages", type=int, default=20, help="pages to parse")
+    parser.add_argument("--domains", type=int, default=1000, help="domains to load")
+    parser.add_argument("--months", type=int, default=12, help="months per domain")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--output", type=Path, help="JSON file for the results")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store the results as the baseline, instead of comparing them",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs the benchmarks, and compares them with the baseline.
+
+    Args:
+        argv: the command line arguments, or None for sys.argv.
+
+    Returns:
+        The exit status, 1 if any benchmark regressed, or 0 otherwise.
+    """
+    args = parse_args(argv)
+    params = {"pages": args.pages, "domains": args.domains, "months": args.months}
+    results = bench_parse(args.pages, args.repeat)
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_file = Path(work_dir) / "webvisits.csv"
+        sqlite_file = Path(work_dir) / "webvisits.db"
+        write_sites_csv(csv_file, args.domains, args.months)
+        results.update(bench_load(csv_file, sqlite_file, args.repeat))
+        results.update(bench_analyse(sqlite_file, args.repeat))
+    results.update(bench_import(args.repeat))
+    for name, result in results.items():
+        print(f"{name:<28}{result.value:>14.4g} {result.unit}")
+    if args.output is not None:
+        args.output.write_text(json.dumps(report(params, results), indent=2))
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report(params, results), indent=2) + "\n")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline in {args.baseline}")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["params"] != params:
+        print(f"The baseline in {args.baseline} ran with {baseline['params']}")
+        return 0
+    regressions = compare(results, baseline["results"], args.threshold)
+    for regression in regressions:
+        print(f"Regression of {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
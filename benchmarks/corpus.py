@@ -0,0 +1,67 @@
+"""Makes the synthetic corpora to benchmark, with sweb.synthetic."""
+import itertools
+from pathlib import Path
+from typing import Iterator, List
+
+from sweb.synthetic import (
+    MONTHS_PER_SITE,
+    PageTemplate,
+    generate_history,
+    history_sites,
+    write_history_csv,
+)
+
+ROOT_DIR = Path(__file__).parent.parent
+SOURCE_HTML_DIR = ROOT_DIR / "source_html"
+
+
+def _history_months(months: int) -> int:
+    # the sites carry the visits of their previous months too
+    return months + MONTHS_PER_SITE - 1
+
+
+def load_templates(html_dir: Path = SOURCE_HTML_DIR) -> List[PageTemplate]:
+    """Makes PageTemplates out of the fixture pages.
+
+    Args:
+        html_dir: directory with the fixture pages.
+
+    Returns:
+        The templates of the fixture pages with visits.
+    """
+    templates = []
+    for html_file in sorted(html_dir.glob("*.html")):
+        try:
+            templates.append(PageTemplate.from_file(html_file))
+        except ValueError:
+            continue
+    return templates
+
+
+def scale_pages(pages: int, html_dir: Path = SOURCE_HTML_DIR) -> Iterator[str]:
+    """Makes HTML pages of distinct domains, with the fixture pages as templates.
+
+    Args:
+        pages: number of pages to make.
+        html_dir: directory with the fixture pages.
+
+    Yields:
+        The pages, rendered into each template in turn.
+    """
+    sites = history_sites(generate_history(pages, MONTHS_PER_SITE), sites=1)
+    for site, template in zip(sites, itertools.cycle(load_templates(html_dir))):
+        yield template.render(site)
+
+
+def write_sites_csv(csv_file: Path, domains: int, months: int) -> None:
+    """Writes a synthetic corpus of SimilarwebSites into a csv file.
+
+    Each domain gets a site every MONTHS_PER_SITE months,
+    so that their visits cover months months.
+
+    Args:
+        csv_file: csv file where to write the sites.
+        domains: number of domains.
+        months: number of months of history of each domain.
+    """
+    write_history_csv(generate_history(domains, _history_months(months)), csv_file)
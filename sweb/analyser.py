@@ -1,10 +1,262 @@
 """Analyses similaerwebsites data."""
-import sqlite3
+import dataclasses
+import datetime
 from pathlib import Path
+from typing import List, Optional, Sequence
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import plotly.io as pio
+from sqlalchemy import Boolean, func, inspect, select
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.schema import Table
+
+from sweb.loader import create_sqlite_file_db_engine, get_table
+from sweb.model import MonthlyGrowth, WebVisits
+
+VARIABLES = ("total_visits", "category_rank")
+
+
+@dataclasses.dataclass(frozen=True)
+class VisitsFilter:
+    """Selects the webvisits to analyse.
+
+    The filters are applied by the DB query, so that only the selected rows
+    are loaded. Unset filters select everything.
+    """
+
+    start: Optional[datetime.date] = None
+    end: Optional[datetime.date] = None
+    domains: Optional[Sequence[str]] = None
+    domain_prefix: str = ""
+    top: Optional[int] = None
+
+    def where(self, table: Table) -> List["ColumnElement[Boolean]"]:
+        """Builds the conditions selecting the rows of the webvisits table.
+
+        Args:
+            table: the webvisits table, or a table aggregated from it.
+
+        Returns:
+            The conditions that the selected rows meet:
+            a date from start to end (inclusive),
+            a domain from domains and starting with domain_prefix,
+            and, with top, one of the top domains by total visits within
+            the other conditions.
+        """
+        conditions: List["ColumnElement[Boolean]"] = []
+        if self.start is not None:
+            conditions.append(table.c.date >= self.start)
+        if self.end is not None:
+            conditions.append(table.c.date <= self.end)
+        if self.domains is not None:
+            conditions.append(table.c.domain.in_(self.domains))
+        if self.domain_prefix:
+            conditions.append(
+                table.c.domain.startswith(self.domain_prefix, autoescape=True)
+            )
+        if self.top is not None:
+            visits = get_table(WebVisits)
+            top_domains = (
+                select(visits.c.domain)
+                .where(*dataclasses.replace(self, top=None).where(visits))
+                .group_by(visits.c.domain)
+                .order_by(func.sum(visits.c.total_visits).desc(), visits.c.domain)
+                .limit(self.top)
+            )
+            conditions.append(table.c.domain.in_(top_domains))
+        return conditions
+
+
+class WebVisitsAnalysis:
+    """Analyses the webvisits timeseries, loaded once into a single wide frame.
+
+    The frame has a row per date, and a column per variable and domain,
+    so every analysis derives from it without querying the DB again.
+    The growths summed over the months, which rank the websites, are either
+    precomputed by the DB (see MonthlyGrowth) or computed from the frame.
+    """
+
+    def __init__(self, frame: pd.DataFrame, growth: Optional[pd.DataFrame] = None):
+        """Wraps a frame of webvisits timeseries.
+
+        Args:
+            frame: dataframe indexed by date,
+                   with columns indexed by (variable, domain).
+            growth: dataframe indexed by domain, with the sums of the
+                    visits_growth and rank_growth of its months,
+                    or None to compute them from the frame.
+        """
+        self.frame = frame
+        self.growth = growth
+
+    @classmethod
+    def from_sqlite(
+        cls,
+        sqlite_file: Path,
+        variables: Sequence[str] = VARIABLES,
+        visits_filter: Optional[VisitsFilter] = None,
+    ) -> "WebVisitsAnalysis":
+        """Loads the webvisits timeseries from a SQLite DB, in a single query.
+
+        The query reads the index covering the timeseries (see WebVisits),
+        instead of scanning and sorting the table.
+        The growths are also loaded, summed by the DB,
+        if it has the aggregates maintained by the loader.
+        Like the ones computed from the frame, they only add up the changes
+        between the selected months.
+
+        Args:
+            sqlite_file: file path to the SQLite DB to query.
+            variables: columns of the webvisits table whose values to load.
+            visits_filter: filter selecting the rows to load, or None for all.
+
+        Returns:
+            The analysis of the loaded timeseries.
+        """
+        visits_filter = visits_filter or VisitsFilter()
+        table = get_table(WebVisits)
+        query = (
+            select(
+                table.c.domain,
+                table.c.date,
+                *(table.c[variable] for variable in variables),
+            )
+            .where(*visits_filter.where(table))
+            .order_by(table.c.date, table.c.domain)
+        )
+        growth_table = get_table(MonthlyGrowth)
+        growth_conditions = visits_filter.where(growth_table)
+        if visits_filter.start is not None:
+            # only the changes from a month within the filter, as in the frame
+            previous = table.alias("previous")
+            growth_conditions.append(
+                select(previous.c.date)
+                .where(
+                    previous.c.domain == growth_table.c.domain,
+                    previous.c.date >= visits_filter.start,
+                    previous.c.date < growth_table.c.date,
+                )
+                .exists()
+            )
+        growth_query = (
+            select(
+                growth_table.c.domain,
+                func.sum(growth_table.c.visits_growth).label("visits_growth"),
+                func.sum(growth_table.c.rank_growth).label("rank_growth"),
+            )
+            .where(*growth_conditions)
+            .group_by(growth_table.c.domain)
+        )
+        growth = None
+        engine = create_sqlite_file_db_engine(sqlite_file, "read")
+        with engine.connect() as connection:
+            dataframe = pd.read_sql(query, connection, parse_dates=["date"])
+            if inspect(connection).has_table(growth_table.name):
+                growth = pd.read_sql(growth_query, connection, index_col="domain")
+        engine.dispose()
+        frame = dataframe.pivot(index="date", columns="domain", values=list(variables))
+        return cls(frame.sort_index(), growth)
+
+    def timeseries(self, variable: str) -> pd.DataFrame:
+        """Gets the timeseries of a variable.
+
+        Args:
+            variable: loaded column whose values to get.
+
+        Returns:
+            A dataframe with
+                a column per domain
+                a row per date
+        """
+        # selects the variable's level, keeping the (empty) date index when
+        # nothing was loaded
+        series = self.frame.reindex(columns=[variable], level=0).droplevel(0, axis=1)
+        series.columns.name = None
+        return series
+
+    def visits_growth(self) -> pd.DataFrame:
+        """Gets visits month-on-month growth timeseries.
+
+        Returns:
+            A total visits dataframe with
+                column per domain
+                a row per date
+        """
+        return self.timeseries("total_visits")
+
+    def ranks_growth(self) -> pd.DataFrame:
+        """Gets ranks month-on-month growth timeseries.
+
+        Returns:
+            A ranks dataframe with
+                a column per domain
+                a row per date
+        """
+        return self.timeseries("category_rank")
+
+    def rank_websites(
+        self,
+        visits_weight: float = 1.0,
+        ranks_weight: float = 1.0,
+        top: Optional[int] = None,
+    ) -> pd.Series:
+        """Ranks websites with a relative scale.
+
+        The growth of a website is the weighted sum of its visits and category
+        rank month-on-month changes, which are either precomputed by the DB,
+        or computed over the domain by month matrices of the frame,
+        so they are aligned by construction.
+        The growths are then scaled to the [0, 1] interval, and normalized to
+        add up to 1.
+
+        Args:
+            visits_weight: weight of the visits changes in the growth.
+            ranks_weight: weight of the category rank changes in the growth.
+            top: number of best ranked websites to select, or None for all.
+
+        Returns:
+            A series with the websites rank, indexed by domain,
+            in descending order.
+        """
+        visits = self.visits_growth()
+        if visits.columns.empty:
+            return pd.Series(index=visits.columns, dtype=float)
+        if self.growth is None:
+            visits_growth = _changes_sum(visits.to_numpy(dtype=float))
+            ranks_growth = _changes_sum(self.ranks_growth().to_numpy(dtype=float))
+        else:
+            growths = self.growth.reindex(visits.columns).fillna(0.0)
+            visits_growth = growths["visits_growth"].to_numpy(dtype=float)
+            ranks_growth = growths["rank_growth"].to_numpy(dtype=float)
+        growth = visits_weight * visits_growth + ranks_weight * ranks_growth
+        # a single website, or websites growing alike, have no relative growth
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative_growth = (growth - growth.min()) / (growth.max() - growth.min())
+        rank = np.round(relative_growth / relative_growth.sum(), 2)
+        if top is None or top >= len(rank):
+            order = np.argsort(-rank, kind="stable")
+        else:
+            # selects the top websites in linear time, and only sorts those
+            best = np.argpartition(-rank, top - 1)[:top]
+            order = best[np.argsort(-rank[best], kind="stable")]
+        return pd.Series(rank[order], index=visits.columns[order])
+
+
+def _changes_sum(series: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    # sums the relative changes between consecutive rows, per column,
+    # measuring each one from the last value before it, across missing values
+    # (as the forward filling of pct_change)
+    rows = np.arange(len(series))[:, np.newaxis]
+    last = np.maximum.accumulate(np.where(np.isnan(series), 0, rows), axis=0)
+    filled = np.take_along_axis(series, last, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = filled[1:] / filled[:-1] - 1
+    sums: npt.NDArray[np.float64] = np.nansum(changes, axis=0)
+    return sums
 
 
 def get_webvisits_timeseries(sqlite_file: Path, variable: str) -> pd.DataFrame:
@@ -19,16 +271,7 @@ def get_webvisits_timeseries(sqlite_file: Path, variable: str) -> pd.DataFrame:
             column per domain
             a row per date
     """
-    with sqlite3.connect(sqlite_file.as_posix()) as conn:
-        query = f"""
-            SELECT domain, date, {variable}
-            FROM webvisits
-            ORDER BY date
-        """
-        dataframe = pd.read_sql(query, conn, parse_dates=["date"])
-    pivot = pd.pivot_table(dataframe, values=variable, index="date", columns="domain")
-    pivot.columns.name = None
-    return pivot
+    return WebVisitsAnalysis.from_sqlite(sqlite_file, (variable,)).timeseries(variable)
 
 
 def get_visits_growth(sqlite_file: Path) -> pd.DataFrame:
@@ -68,38 +311,27 @@ def rank_websites(sqlite_file: Path) -> pd.DataFrame:
     Returns:
         A dataframe with columns (domain, rank) representing the websites rank.
     """
-    visits = get_visits_growth(sqlite_file)
-    category_ranks = get_ranks_growth(sqlite_file)
-    visits_change_growth = visits.pct_change().dropna().sum()
-    category_ranks_growth = category_ranks.pct_change().dropna().sum()
-    growth = visits_change_growth.add(category_ranks_growth)
-    min_growth = growth.min()
-    growth_interval = growth.max() - min_growth
-    relative_growth = growth.apply(lambda x: (x - min_growth) / growth_interval)
-    relative_growth_sum = relative_growth.sum()
-    rank = relative_growth.apply(lambda x: x / relative_growth_sum)
-    rank = rank.apply(lambda x: round(x, 2))
-    rank = rank.sort_values(ascending=False)
-    return rank
+    return WebVisitsAnalysis.from_sqlite(sqlite_file).rank_websites()
 
 
-def plot_timeseries(
+def timeseries_figure(
     series: pd.DataFrame,
-    chart_file: Path,
     title: str,
     unit: str,
     reversed_y: bool = False,
-) -> None:
-    """Plots a set of timeseries.
+) -> go.Figure:
+    """Builds the line chart of a set of timeseries.
 
     Args:
         series: dataframe with a columns per series,
                 a row per month within the given interval,
                 indexed by date.
-        chart_file: file where to plot the timeseries chart.
         title: chart title.
         unit: the unit of y-axis.
         reversed_y: flag to reverse the y axis.
+
+    Returns:
+        The timeseries chart.
     """
     fig = px.line(
         series, x=series.index, y=list(series.columns), log_y=True, title=title
@@ -112,6 +344,44 @@ def plot_timeseries(
         fig.update_layout(
             yaxis={"autorange": "reversed", "range": [series.max().max(), 0]}
         )
+    return fig
+
+
+def rank_figure(rank: pd.Series, title: str) -> go.Figure:
+    """Builds the bar chart of a rank.
+
+    Args:
+        rank: series with rank values, indexed by website.
+        title: chart title.
+
+    Returns:
+        The rank chart.
+    """
+    fig = px.bar(rank.sort_values(), title=title, orientation="h")
+    fig.update_traces(showlegend=False)
+    fig.update_layout(xaxis_title="", yaxis_title="", legend_title="")
+    return fig
+
+
+def plot_timeseries(
+    series: pd.DataFrame,
+    chart_file: Path,
+    title: str,
+    unit: str,
+    reversed_y: bool = False,
+) -> None:
+    """Plots a set of timeseries.
+
+    Args:
+        series: dataframe with a columns per series,
+                a row per month within the given interval,
+                indexed by date.
+        chart_file: file where to plot the timeseries chart.
+        title: chart title.
+        unit: the unit of y-axis.
+        reversed_y: flag to reverse the y axis.
+    """
+    fig = timeseries_figure(series, title, unit, reversed_y)
     pio.write_image(fig, chart_file.as_posix())
 
 
@@ -127,7 +397,4 @@ def plot_rank(
         chart_file: file where to plot the timeseries chart.
         title: chart title.
     """
-    fig = px.bar(rank.sort_values(), title=title, orientation="h")
-    fig.update_traces(showlegend=False)
-    fig.update_layout(xaxis_title="", yaxis_title="", legend_title="")
-    pio.write_image(fig, chart_file.as_posix())
+    pio.write_image(rank_figure(rank, title), chart_file.as_posix())
@@ -0,0 +1,217 @@
+"""Caches the SimilarwebSites parsed from HTML pages."""
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple, Optional, Type
+
+from sweb.parser import PARSER_VERSION
+from sweb.site import SimilarwebSite, decode_site, encode_site
+from sweb.sources import HtmlSource, read_source
+
+MAX_ENTRIES = 100000
+
+# entries written between commits
+COMMIT_EVERY = 1000
+
+
+def file_digest(html_file: Path) -> str:
+    """Hashes the content of a file.
+
+    Args:
+        html_file: file to hash.
+
+    Returns:
+        The SHA-256 hex digest of html_file's content.
+    """
+    digest = hashlib.sha256()
+    with html_file.open("rb") as html_stream:
+        for chunk in iter(lambda: html_stream.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digest(source: HtmlSource) -> str:
+    """Hashes the content of an HTML page source.
+
+    Args:
+        source: the source to hash.
+
+    Returns:
+        The SHA-256 hex digest of the file content, for files,
+        or of the decompressed page, for archive members.
+    """
+    if not source.member:
+        return file_digest(source.path)
+    return hashlib.sha256(read_source(source).encode()).hexdigest()
+
+
+class CacheLookup(NamedTuple):
+    """The result of looking up an HTML page in the cache."""
+
+    # hash of the page content (see source_digest), the key of its entry
+    digest: str
+    cached: bool
+
+
+class ExtractionCache:
+    """Persistent cache of the SimilarwebSites parsed from HTML pages.
+
+    Entries are keyed by the hash of the HTML page content (see source_digest).
+    A file whose modification time and size didn't change since it was cached
+    is looked up without hashing it, unlike archive members.
+    Entries cached by another PARSER_VERSION are discarded,
+    and the least recently used ones are evicted beyond max_entries.
+    The entries are committed every commit_every writes,
+    so that an interrupted extraction keeps most of what it cached.
+    """
+
+    def __init__(
+        self,
+        cache_file: Path,
+        max_entries: int = MAX_ENTRIES,
+        commit_every: int = COMMIT_EVERY,
+    ) -> None:
+        """Opens the cache stored in a SQLite file.
+
+        Args:
+            cache_file: SQLite file where the cache is stored.
+            max_entries: maximum number of entries kept in the cache.
+            commit_every: number of entries written between commits.
+        """
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self._writes = 0
+        self._db = sqlite3.connect(cache_file.as_posix())
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                version TEXT NOT NULL,
+                site TEXT NOT NULL,
+                used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest, version)"
+        )
+        self._db.execute("DELETE FROM entries WHERE version != ?", (PARSER_VERSION,))
+
+    def __enter__(self) -> "ExtractionCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def lookup(self, source: HtmlSource) -> CacheLookup:
+        """Looks up the cache entry for an HTML page.
+
+        Args:
+            source: source of the HTML page to look up.
+
+        Returns:
+            The key of the source's entry, and whether it's cached,
+            so that caching the source doesn't hash it again.
+        """
+        if not source.member:
+            stat = source.path.stat()
+            entry = self._db.execute(
+                "SELECT digest FROM entries "
+                "WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (source.name, stat.st_mtime_ns, stat.st_size),
+            ).fetchone()
+            if entry is not None:
+                return CacheLookup(entry[0], True)
+        digest = source_digest(source)
+        entry = self._db.execute(
+            "SELECT site FROM entries WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if entry is None:
+            return CacheLookup(digest, False)
+        self._store(source, digest, entry[0])
+        return CacheLookup(digest, True)
+
+    def get(self, key: str) -> SimilarwebSite:
+        """Gets a cached SimilarwebSite.
+
+        Args:
+            key: key of the entry, as lookup returns it.
+
+        Returns:
+            The cached SimilarwebSite.
+        """
+        (site,) = self._db.execute(
+            "SELECT site FROM entries WHERE digest = ? LIMIT 1", (key,)
+        ).fetchone()
+        self._db.execute(
+            "UPDATE entries SET used = ? WHERE digest = ?", (time.time(), key)
+        )
+        self._written()
+        return decode_site(json.loads(site))
+
+    def put(
+        self, source: HtmlSource, swsite: SimilarwebSite, key: Optional[str] = None
+    ) -> None:
+        """Caches the SimilarwebSite parsed from an HTML page.
+
+        Args:
+            source: source of the parsed HTML page.
+            swsite: the SimilarwebSite parsed from the source.
+            key: key of the source's entry, as lookup returns it,
+                 or None to hash the source.
+        """
+        digest = source_digest(source) if key is None else key
+        self._store(source, digest, json.dumps(encode_site(swsite)))
+
+    def _store(self, source: HtmlSource, digest: str, site: str) -> None:
+        # archive members are always hashed, so their stat is never looked up
+        mtime_ns, size = (-1, -1)
+        if not source.member:
+            stat = source.path.stat()
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                source.name,
+                mtime_ns,
+                size,
+                digest,
+                PARSER_VERSION,
+                site,
+                time.time(),
+            ),
+        )
+        self._written()
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % self.commit_every == 0:
+            self._db.commit()
+
+    def evict(self) -> None:
+        """Evicts the least recently used entries beyond max_entries."""
+        self._db.execute(
+            """
+            DELETE FROM entries WHERE path IN (
+                SELECT path FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        """Evicts the entries beyond max_entries, and closes the cache."""
+        self.evict()
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,273 @@
+"""Exports plotly charts into image, HTML or JSON files."""
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from kaleido.scopes.plotly import PlotlyScope
+
+from sweb.analyser import timeseries_figure
+
+IMAGE_FORMATS = ("jpg", "jpeg", "png", "webp", "svg", "pdf")
+FORMATS = IMAGE_FORMATS + ("html", "json")
+
+MAX_POINTS = 500
+MAX_LINES = 20
+
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.-]")
+
+
+class ChartExporter:
+    """Exports charts into files, with a pool of renderers kept warm.
+
+    Each renderer is a kaleido process, started on its first image,
+    and reused for the following ones, instead of starting one per image.
+    The renderers export images concurrently, one each.
+    HTML and JSON files are written without rendering.
+    """
+
+    def __init__(self, renderers: int = 1) -> None:
+        """Creates the pool of renderers.
+
+        Args:
+            renderers: number of images exported concurrently.
+        """
+        self.renderers = renderers
+        self._executor = ThreadPoolExecutor(max_workers=renderers)
+        self._scopes = threading.local()
+
+    def __enter__(self) -> "ChartExporter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _scope(self) -> PlotlyScope:
+        if not hasattr(self._scopes, "scope"):
+            # renders with the plotly.js bundled with plotly, as plotly.io does
+            self._scopes.scope = PlotlyScope(
+                plotlyjs=pio.kaleido.scope.plotlyjs, mathjax=pio.kaleido.scope.mathjax
+            )
+        return self._scopes.scope
+
+    def write(self, figure: go.Figure, chart_file: Path) -> None:
+        """Exports a chart into a file, in the format of its suffix (see FORMATS).
+
+        Args:
+            figure: the chart to export.
+            chart_file: file where to export the chart.
+
+        Raises:
+            ValueError: if the file suffix isn't a supported format.
+        """
+        chart_format = chart_file.suffix[1:]
+        if chart_format == "html":
+            figure.write_html(chart_file.as_posix(), include_plotlyjs="cdn")
+        elif chart_format == "json":
+            figure.write_json(chart_file.as_posix())
+        elif chart_format in IMAGE_FORMATS:
+            image = self._scope().transform(figure.to_dict(), format=chart_format)
+            chart_file.write_bytes(image)
+        else:
+            raise ValueError(f"Unsupported chart format: {chart_file.suffix}")
+
+    def export(self, charts: Iterable[Tuple[go.Figure, Path]]) -> None:
+        """Exports charts into files, concurrently.
+
+        The charts are taken as the renderers become free,
+        so that only a few figures are in memory at once.
+
+        Args:
+            charts: the charts to export, with the files where to export them.
+        """
+        exports: "deque[Future[None]]" = deque()
+        for figure, chart_file in charts:
+            exports.append(self._executor.submit(self.write, figure, chart_file))
+            if len(exports) > 2 * self.renderers:
+                exports.popleft().result()
+        while exports:
+            exports.popleft().result()
+
+    def close(self) -> None:
+        """Waits for the exports, and stops the renderers.
+
+        The renderers stop with the threads holding them.
+        """
+        self._executor.shutdown()
+
+
+def lttb(
+    x_values: npt.NDArray[np.float64], y_values: npt.NDArray[np.float64], threshold: int
+) -> npt.NDArray[np.int64]:
+    """Selects the points keeping the shape of a line (Largest-Triangle-Three-Buckets).
+
+    The first and last points are kept, and the others are split in buckets,
+    from each of which the point forming the largest triangle with the point
+    selected from the bucket before and the average of the bucket after is kept.
+
+    Args:
+        x_values: x coordinates of the line points, in increasing order.
+        y_values: y coordinates of the line points.
+        threshold: number of points to select.
+
+    Returns:
+        The indices of the selected points, in increasing order.
+    """
+    size = len(x_values)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    edges = (np.arange(threshold - 1) * (size - 2) / (threshold - 2)).astype(int) + 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = x_values[end:next_end].mean(), y_values[end:next_end].mean()
+        last = selected[bucket]
+        areas = np.abs(
+            (x_values[last] - next_x) * (y_values[start:end] - y_values[last])
+            - (x_values[last] - x_values[start:end]) * (next_y - y_values[last])
+        )
+        selected[bucket + 1] = start + int(np.argmax(areas))
+    return selected
+
+
+def top_with_others(
+    series: pd.DataFrame,
+    lines: int = MAX_LINES,
+    others: str = "sum",
+    ascending: bool = False,
+) -> pd.DataFrame:
+    """Keeps the top timeseries, and aggregates the rest into an "others" one.
+
+    Args:
+        series: dataframe with a column per timeseries.
+        lines: maximum number of timeseries to keep, including "others".
+        others: name of the pandas aggregation of the rest (e.g. sum, median).
+        ascending: flag to rank the timeseries by ascending mean value
+                   (e.g. for ranks), instead of descending.
+
+    Returns:
+        The top lines - 1 timeseries, by their mean value, and the "others" one,
+        or all the series if they are no more than lines.
+    """
+    if len(series.columns) <= lines:
+        return series
+    means = series.mean().sort_values(ascending=ascending, kind="stable")
+    top = list(means.index[: lines - 1])
+    rest = series.drop(columns=top)
+    return series[top].assign(others=rest.agg(others, axis=1))
+
+
+def downsample(
+    series: pd.DataFrame,
+    max_points: int = MAX_POINTS,
+    max_lines: int = MAX_LINES,
+    others: str = "sum",
+    ascending: bool = False,
+) -> pd.DataFrame:
+    """Bounds the size of a set of timeseries, to chart it.
+
+    The timeseries beyond max_lines are aggregated (see top_with_others),
+    and the dates are reduced to max_points, selected by LTTB
+    over the total of the timeseries.
+
+    Args:
+        series: dataframe with a column per timeseries, indexed by date.
+        max_points: maximum number of dates.
+        max_lines: maximum number of timeseries.
+        others: name of the pandas aggregation of the timeseries beyond max_lines.
+        ascending: flag to rank the timeseries by ascending mean value.
+
+    Returns:
+        The downsampled timeseries.
+    """
+    series = top_with_others(series, max_lines, others, ascending)
+    dates = series.index.to_numpy(dtype="datetime64[ns]").astype(np.float64)
+    total = series.sum(axis=1).to_numpy(dtype=float)
+    return series.iloc[lttb(dates, total, max_points)]
+
+
+def _export_timeseries(  # pylint: disable=too-many-arguments
+    charts: List[Tuple[str, pd.DataFrame]],
+    chart_dir: Path,
+    chart_format: str,
+    unit: str,
+    max_points: int,
+    max_lines: int,
+) -> None:
+    with ChartExporter() as exporter:
+        exporter.export(
+            (
+                timeseries_figure(
+                    downsample(series, max_points, max_lines), name, unit
+                ),
+                chart_dir / f"{_UNSAFE_CHARACTERS.sub('_', name)}.{chart_format}",
+            )
+            for name, series in charts
+        )
+
+
+def export_timeseries_charts(  # pylint: disable=too-many-arguments
+    series: pd.DataFrame,
+    chart_dir: Path,
+    chart_format: str = "jpg",
+    unit: str = "visits",
+    cohorts: Optional[Mapping[str, Sequence[str]]] = None,
+    workers: int = 1,
+    max_points: int = MAX_POINTS,
+    max_lines: int = MAX_LINES,
+) -> None:
+    """Charts the timeseries of each domain, or of each cohort of domains.
+
+    Each chart is downsampled (see downsample), so that its size is bounded,
+    however many dates and domains there are.
+    With more than one worker, the charts are split among a pool of processes,
+    each exporting its share with its own renderer.
+
+    Args:
+        series: dataframe with a column per domain, indexed by date.
+        chart_dir: directory where to export the charts, named after
+                   their domain or cohort.
+        chart_format: format of the charts (see FORMATS).
+        unit: the unit of y-axis.
+        cohorts: domains of each cohort, or None to chart each domain.
+        workers: number of processes exporting the charts.
+        max_points: maximum number of dates in a chart.
+        max_lines: maximum number of timeseries in a chart.
+    """
+    if cohorts is None:
+        cohorts = {domain: [domain] for domain in series.columns}
+    charts = [(name, series[list(domains)]) for name, domains in cohorts.items()]
+    chart_dir.mkdir(parents=True, exist_ok=True)
+    if workers <= 1:
+        _export_timeseries(charts, chart_dir, chart_format, unit, max_points, max_lines)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        exports = [
+            executor.submit(
+                _export_timeseries,
+                charts[worker::workers],
+                chart_dir,
+                chart_format,
+                unit,
+                max_points,
+                max_lines,
+            )
+            for worker in range(workers)
+        ]
+        for export in exports:
+            export.result()
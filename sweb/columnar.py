@@ -0,0 +1,78 @@
+"""Writes the normalized values of SimilarwebSites in Parquet files, and reads them.
+
+The values are written normalized, with Arrow types,
+so that loading them doesn't parse them again (see sweb.loader.load_normalized).
+
+Requires the optional dependency pyarrow (install sweb with the parquet extra).
+"""
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sweb.rows import NormalizedSite
+
+# the columns of the fields of NormalizedSite
+SCHEMA = pa.schema(
+    [
+        ("domain", pa.string()),
+        ("date", pa.date32()),
+        ("global_rank", pa.int64()),
+        ("total_visits", pa.int64()),
+        ("bounce_rate", pa.float64()),
+        ("avg_visit_duration", pa.int64()),
+        ("category_rank", pa.int64()),
+        ("previous_category_ranks", pa.list_(pa.int64())),
+        ("previous_total_visits", pa.list_(pa.int64())),
+        ("countries", pa.list_(pa.string())),
+        ("country_shares", pa.list_(pa.float64())),
+        ("age_visits", pa.list_(pa.float64())),
+    ]
+)
+
+
+def write_parquet(
+    batches: Iterable[Sequence[NormalizedSite]], parquet_file: Path
+) -> None:
+    """Writes the normalized values of SimilarwebSites into a Parquet file.
+
+    Each batch is written as a row group, with a column per NormalizedSite field.
+
+    Args:
+        batches: normalized values of the SimilarwebSites to write, in batches
+                 (see sweb.loader.normalize_batches).
+        parquet_file: path to the Parquet file where to write the sites.
+    """
+    with pq.ParquetWriter(parquet_file.as_posix(), SCHEMA) as writer:
+        for sites in batches:
+            columns = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*sites), SCHEMA)
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=SCHEMA))
+
+
+def parse_parquet(parquet_file: Path) -> Iterator[List[NormalizedSite]]:
+    """Parses the normalized values of SimilarwebSites from a Parquet file.
+
+    The file is memory mapped and read one row group at a time,
+    a column at a time.
+
+    Args:
+        parquet_file: path to the Parquet file written by write_parquet.
+
+    Yields:
+        The normalized values of the SimilarwebSites of each row group.
+
+    Raises:
+        ValueError: if the file doesn't have the columns of SCHEMA,
+                    e.g. since it was written by a former version.
+    """
+    parquet = pq.ParquetFile(parquet_file.as_posix(), memory_map=True)
+    if not parquet.schema_arrow.equals(SCHEMA):
+        raise ValueError(f"{parquet_file} doesn't hold normalized SimilarwebSites!")
+    for index in range(parquet.num_row_groups):
+        row_group = parquet.read_row_group(index)
+        columns = [column.to_pylist() for column in row_group.columns]
+        yield [NormalizedSite(*values) for values in zip(*columns)]
@@ -1,41 +1,89 @@
 """Loads a csv file of SimilarwebSites into a SQLite DB."""
 import calendar
+import csv
 import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 import dateutil.parser
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 from dateutil.relativedelta import relativedelta
-from sqlalchemy.engine import Engine
-from sqlmodel import Session, SQLModel, create_engine
-
-from sweb.model import CountryVisitsShare, SimilarwebSite, VisitsByAge, WebVisits
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql.schema import Table
+from sqlmodel import SQLModel, create_engine
+
+from sweb.metrics import METRICS, Timing
+from sweb.model import CountryVisitsShare, VisitsByAge, WebVisits
+from sweb.rows import (
+    CountryVisitsShareRow,
+    NormalizedSite,
+    Row,
+    VisitsByAgeRow,
+    WebVisitsRow,
+)
+from sweb.site import SimilarwebSite, decode_site, has_visits
+
+BATCH_SIZE = 1000
+
+# the table model of each row type
+ROW_MODELS: Dict[Type[Row], Type[SQLModel]] = {
+    WebVisitsRow: WebVisits,
+    VisitsByAgeRow: VisitsByAge,
+    CountryVisitsShareRow: CountryVisitsShare,
+}
+
+_SCALES = {"K": 1000.0, "M": 1000000.0, "B": 1000000000.0, "%": 1.0}
+
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "load": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-262144",
+        "mmap_size": "1073741824",
+        "temp_store": "MEMORY",
+    },
+    "read": {
+        "query_only": "ON",
+        "cache_size": "-65536",
+        "mmap_size": "1073741824",
+        "temp_store": "MEMORY",
+    },
+}
 
 
 def parse_csv(csv_file: Path) -> Iterable[SimilarwebSite]:
     """Parses SimilarwebSites from a csv file.
 
+    The csv file is read one row at a time.
+
     Args:
         csv_file: path to the csv file containing the SimilarwebSites.
 
     Yields:
         The SimilarwebSites in csv_file.
     """
-    dataframe = pd.read_csv(csv_file)
-    items = dataframe.to_dict(orient="records")
-    for record in items:
-        if record["total_visits"] != "< 5K":
-            for key in [
-                "past_category_ranks",
-                "past_total_visits",
-                "top_countries",
-                "age_distribution",
-            ]:
-                record[key] = eval(record[key])  # nosec pylint: disable=eval-used
-                # we can trust there isn't malicious Python injection in the csv cell
-                # because we created it
-            yield SimilarwebSite(**record)
+    with csv_file.open(newline="") as csv_stream:
+        for record in csv.DictReader(csv_stream):
+            swsite = decode_site(record)
+            if has_visits(swsite):
+                yield swsite
 
 
 def as_float(number_repr: str) -> float:
@@ -85,16 +133,398 @@ def as_seconds(time_repr: str) -> int:
     Returns:
         The seconds represented by number_repr.
     """
-    time = dateutil.parser.parse(time_repr)
-    return 3600 * time.hour + 60 * time.minute + time.second
+    hours, minutes, seconds = time_repr.split(":")
+    return 3600 * int(hours) + 60 * int(minutes) + int(seconds)
+
+
+def _as_codes(values: pd.Series) -> Tuple[npt.NDArray[np.uint32], npt.NDArray[Any]]:
+    # the UTF-32 code of each character of the strings, a column per position,
+    # padded with zeros, and the length of each string, up to its last character
+    strings = np.array(values.tolist(), dtype=str)
+    codes = strings.view(np.uint32).reshape(len(strings), strings.itemsize // 4)
+    characters = codes != 0
+    lengths = codes.shape[1] - np.argmax(characters[:, ::-1], axis=1)
+    return codes, np.where(characters.any(axis=1), lengths, 0)
+
+
+def as_float_array(  # pylint: disable=too-many-locals
+    numbers_repr: pd.Series,
+) -> pd.Series:
+    """Normalizes a series of number strings, all at once.
+
+    The numbers are parsed a character position at a time, over all of them.
+    The few ones that aren't plain digits and separators with a suffix,
+    like the invalid ones, or the percentages with more than 2 decimals,
+    are normalized by as_float instead,
+    which raises a ValueError for the invalid ones.
+
+    Args:
+        numbers_repr: number representations.
+
+    Returns:
+        The numbers represented by numbers_repr, as as_float normalizes them.
+    """
+    codes, lengths = _as_codes(numbers_repr)
+    rows = np.flatnonzero(lengths)
+    last = codes[rows, lengths[rows] - 1]
+    scales = np.ones(len(codes))
+    percentages = np.zeros(len(codes), dtype=bool)
+    for suffix, scale in _SCALES.items():
+        suffixed = rows[last == ord(suffix)]
+        scales[suffixed] = scale
+        percentages[suffixed] = suffix == "%"
+        # the suffix is skipped as the padding after the number
+        lengths[suffixed] -= 1
+    mantissas = np.zeros(len(codes), dtype=np.int64)
+    digits = np.zeros(len(codes), dtype=np.int64)
+    decimals = np.zeros(len(codes), dtype=np.int64)
+    dots = np.zeros(len(codes), dtype=np.int64)
+    invalid = np.zeros(len(codes), dtype=bool)
+    for position, column in enumerate(codes.T):
+        # the codes below the digits wrap around, above them
+        digit = column - ord("0")
+        is_digit = (digit <= 9) & (position < lengths)
+        is_dot = column == ord(".")
+        mantissas = np.where(is_digit, mantissas * 10 + digit, mantissas)
+        digits += is_digit
+        decimals += is_digit & (dots > 0)
+        dots += is_dot
+        invalid |= ~(is_digit | is_dot | (column == ord(","))) & (position < lengths)
+    # beyond 15 digits, the mantissas aren't exact floats anymore
+    invalid |= (digits == 0) | (digits > 15) | (dots > 1)
+    values = mantissas / 10.0**decimals * scales
+    # the percentages are rounded to 4 decimals as round rounds them,
+    # from their integer hundredths
+    hundredths = mantissas * 10 ** (2 - decimals).clip(0)
+    values[percentages] = hundredths[percentages] / 10000
+    unparsed = np.flatnonzero(invalid | (percentages & (decimals > 2)))
+    values[unparsed] = [as_float(numbers_repr.iloc[row]) for row in unparsed]
+    return pd.Series(values, index=numbers_repr.index)
+
+
+def as_int_array(numbers_repr: pd.Series) -> pd.Series:
+    """Normalizes a series of number strings into integers, all at once.
+
+    Args:
+        numbers_repr: number representations.
+
+    Returns:
+        The integers represented by numbers_repr, as as_int normalizes them.
+    """
+    return as_float_array(numbers_repr).astype("int64")
 
 
+def as_seconds_array(times_repr: pd.Series) -> pd.Series:
+    """Normalizes a series of time strings into seconds, all at once.
+
+    The times are parsed a character position at a time, over all of them,
+    but the ones that aren't formatted as HH:MM:SS, which as_seconds normalizes.
+
+    Args:
+        times_repr: time representations, formatted as HH:MM:SS.
+
+    Returns:
+        The seconds represented by times_repr.
+    """
+    codes, lengths = _as_codes(times_repr)
+    seconds = np.zeros(len(codes), dtype=np.int64)
+    parts = np.zeros(len(codes), dtype=np.int64)
+    colons = np.zeros(len(codes), dtype=np.int64)
+    digits = np.zeros(len(codes), dtype=np.int64)
+    invalid = np.zeros(len(codes), dtype=bool)
+    for position, column in enumerate(codes.T):
+        digit = column - ord("0")
+        is_digit = (digit <= 9) & (position < lengths)
+        is_colon = column == ord(":")
+        parts = np.where(is_digit, parts * 10 + digit, parts)
+        # each colon carries the hours, or minutes, over into the next part
+        seconds = np.where(is_colon, (seconds + parts) * 60, seconds)
+        parts[is_colon] = 0
+        invalid |= ~(is_digit | is_colon) & (position < lengths)
+        # each part has digits
+        invalid |= is_colon & (digits == 0)
+        digits = np.where(is_colon, 0, digits + is_digit)
+        colons += is_colon
+    # beyond 15 characters, the seconds could overflow
+    invalid |= (colons != 2) | (digits == 0) | (lengths > 15)
+    seconds += parts
+    unparsed = np.flatnonzero(invalid)
+    seconds[unparsed] = [as_seconds(times_repr.iloc[row]) for row in unparsed]
+    return pd.Series(seconds, index=times_repr.index)
+
+
+@lru_cache(maxsize=None)
 def _get_date(date_repr: str) -> datetime.date:
     date = dateutil.parser.parse(date_repr).date()
     day = calendar.monthrange(date.year, date.month)[1]
     return datetime.date(date.year, date.month, day)
 
 
+@lru_cache(maxsize=None)
+def _get_month_dates(date: datetime.date) -> Tuple[str, ...]:
+    # the ISO dates of the months before a site's, oldest first, and its own
+    return tuple(
+        (date - relativedelta(months=months_before)).isoformat()
+        for months_before in (2, 1, 0)
+    )
+
+
+def _top_countries(swsite: SimilarwebSite) -> List[Tuple[str, str]]:
+    return [
+        (country, share)
+        for country, share in swsite.top_countries
+        if country != "Others"
+    ]
+
+
+def normalize_site(swsite: SimilarwebSite) -> NormalizedSite:
+    """Normalizes the values of a SimilarwebSite, one at a time.
+
+    Args:
+        swsite: SimilarwebSite with visits stats (see has_visits).
+
+    Returns:
+        The normalized values of swsite.
+    """
+    top_countries = _top_countries(swsite)
+    return NormalizedSite(
+        swsite.domain,
+        _get_date(swsite.date),
+        as_int(swsite.global_rank),
+        as_int(swsite.total_visits),
+        as_float(swsite.bounce_rate),
+        as_seconds(swsite.avg_visit_duration),
+        swsite.past_category_ranks[2],
+        swsite.past_category_ranks[:-1],
+        [as_int(visits) for visits in swsite.past_total_visits[:-1]],
+        [country for country, _ in top_countries],
+        [as_float(share) for _, share in top_countries],
+        [as_float(visits) for visits in swsite.age_distribution],
+    )
+
+
+def _split(values: List[Any], lengths: Iterable[int]) -> Iterator[List[Any]]:
+    # splits values into consecutive lists of the given lengths
+    end = 0
+    for length in lengths:
+        start, end = end, end + length
+        yield values[start:end]
+
+
+def normalize_sites(
+    swsites: Sequence[SimilarwebSite],
+) -> List[NormalizedSite]:
+    """Normalizes the values of a batch of SimilarwebSites, per column.
+
+    Each value is normalized as normalize_site normalizes it,
+    but the numbers of the whole batch at once (see as_float_array).
+
+    Args:
+        swsites: SimilarwebSites with visits stats (see has_visits).
+
+    Returns:
+        The normalized values of each SimilarwebSite, in order.
+    """
+    top_countries = [_top_countries(swsite) for swsite in swsites]
+    # the numbers of the batch, a column after another,
+    # with the integer ones first
+    numbers = [swsite.global_rank for swsite in swsites]
+    numbers.extend(swsite.total_visits for swsite in swsites)
+    numbers.extend(
+        visits for swsite in swsites for visits in swsite.past_total_visits[:-1]
+    )
+    integers = len(numbers)
+    numbers.extend(swsite.bounce_rate for swsite in swsites)
+    numbers.extend(share for countries in top_countries for _, share in countries)
+    numbers.extend(visits for swsite in swsites for visits in swsite.age_distribution)
+    values = as_float_array(pd.Series(numbers, dtype=object)).to_numpy()
+    ints: List[int] = values[:integers].astype("int64").tolist()
+    floats: List[float] = values[integers:].tolist()
+    durations: List[int] = as_seconds_array(
+        pd.Series([swsite.avg_visit_duration for swsite in swsites], dtype=object)
+    ).tolist()
+    size = len(swsites)
+    previous_visits = _split(
+        ints[2 * size :], (len(swsite.past_total_visits[:-1]) for swsite in swsites)
+    )
+    shares = _split(floats[size:], (len(countries) for countries in top_countries))
+    ages_visits = _split(
+        floats[size + sum(map(len, top_countries)) :],
+        (len(swsite.age_distribution) for swsite in swsites),
+    )
+    return [
+        NormalizedSite(
+            swsite.domain,
+            _get_date(swsite.date),
+            ints[index],
+            ints[size + index],
+            floats[index],
+            durations[index],
+            swsite.past_category_ranks[2],
+            swsite.past_category_ranks[:-1],
+            next(previous_visits),
+            [country for country, _ in top_countries[index]],
+            next(shares),
+            next(ages_visits),
+        )
+        for index, swsite in enumerate(swsites)
+    ]
+
+
+def _normalize_each(swsites: Sequence[SimilarwebSite]) -> List[NormalizedSite]:
+    return [normalize_site(swsite) for swsite in swsites]
+
+
+def normalize_batches(
+    swsites: Iterable[SimilarwebSite],
+    batch_size: int = BATCH_SIZE,
+    normalize: Callable[
+        [Sequence[SimilarwebSite]], List[NormalizedSite]
+    ] = normalize_sites,
+) -> Iterator[List[NormalizedSite]]:
+    """Normalizes SimilarwebSites a batch at a time.
+
+    Args:
+        swsites: SimilarwebSites with visits stats (see has_visits).
+        batch_size: number of sites normalized at once.
+        normalize: function normalizing a batch, either per column
+                   (normalize_sites), or a site at a time.
+
+    Yields:
+        The normalized values of each batch of swsites.
+    """
+    swsites = iter(swsites)
+    while batch := list(islice(swsites, batch_size)):
+        with METRICS.measure("load.normalize", items=len(batch)):
+            sites = normalize(batch)
+        yield sites
+
+
+def parse_normalized_sites(
+    sites_file: Path,
+    batch_size: int = BATCH_SIZE,
+    normalize: Callable[
+        [Sequence[SimilarwebSite]], List[NormalizedSite]
+    ] = normalize_sites,
+) -> Iterable[List[NormalizedSite]]:
+    """Parses the normalized values of SimilarwebSites from a csv or Parquet file.
+
+    The sites of a csv file are normalized batch_size at a time,
+    whereas a Parquet file holds their normalized values already,
+    which are read a row group at a time (see sweb.columnar).
+    Parquet files are told apart by their .parquet suffix,
+    and require the optional dependency pyarrow.
+
+    Args:
+        sites_file: path to the file containing the SimilarwebSites.
+        batch_size: number of sites of a csv file normalized at once.
+        normalize: function normalizing a batch of sites of a csv file.
+
+    Returns:
+        The normalized values of the SimilarwebSites in sites_file
+        with visits stats (see has_visits), in batches.
+    """
+    if sites_file.suffix == ".parquet":
+        # pylint: disable-next=import-outside-toplevel
+        from sweb.columnar import parse_parquet
+
+        return parse_parquet(sites_file)
+    return normalize_batches(parse_csv(sites_file), batch_size, normalize)
+
+
+def get_webvisits_rows(site: NormalizedSite) -> Iterator[WebVisitsRow]:
+    """Obtains the WebVisits rows represented in a SimilarwebSite.
+
+    Args:
+        site: normalized values of the SimilarwebSite.
+
+    Yields:
+        the WebVisits rows from site, as plain tuples.
+    """
+    *previous_dates, date = _get_month_dates(site.date)
+    for previous_date, category_rank, total_visits in zip(
+        previous_dates, site.previous_category_ranks, site.previous_total_visits
+    ):
+        yield WebVisitsRow(site.domain, previous_date, total_visits, category_rank)
+    yield WebVisitsRow(
+        site.domain,
+        date,
+        site.total_visits,
+        site.category_rank,
+        site.global_rank,
+        site.bounce_rate,
+        site.avg_visit_duration,
+    )
+
+
+def get_visits_by_age_rows(site: NormalizedSite) -> Iterator[VisitsByAgeRow]:
+    """Obtains the VisitsByAge rows represented in a SimilarwebSite.
+
+    Args:
+        site: normalized values of the SimilarwebSite.
+
+    Yields:
+        the VisitsByAge rows from site, as plain tuples.
+    """
+    date = _get_month_dates(site.date)[-1]
+    for min_age, visits in zip([18, 25, 35, 45, 55, 65], site.age_visits):
+        yield VisitsByAgeRow(site.domain, date, min_age, visits)
+
+
+def get_country_visits_share_rows(
+    site: NormalizedSite,
+) -> Iterator[CountryVisitsShareRow]:
+    """Obtains the CountryVisitsShare rows represented in a SimilarwebSite.
+
+    Args:
+        site: normalized values of the SimilarwebSite.
+
+    Yields:
+        the CountryVisitsShare rows from site, as plain tuples.
+    """
+    date = _get_month_dates(site.date)[-1]
+    for country, share in zip(site.countries, site.country_shares):
+        yield CountryVisitsShareRow(site.domain, date, country, share)
+
+
+def get_site_rows(site: NormalizedSite) -> Iterator[Row]:
+    """Obtains the rows of every table represented in a SimilarwebSite.
+
+    Args:
+        site: normalized values of the SimilarwebSite.
+
+    Yields:
+        the WebVisits, VisitsByAge and CountryVisitsShare rows from site,
+        as plain tuples.
+    """
+    yield from get_webvisits_rows(site)
+    yield from get_visits_by_age_rows(site)
+    yield from get_country_visits_share_rows(site)
+
+
+def group_rows(rows: Iterable[Row]) -> Dict[Type[SQLModel], List[Row]]:
+    """Groups rows by the table model they belong to.
+
+    Args:
+        rows: rows of any table.
+
+    Returns:
+        The rows of each table model (see ROW_MODELS), in order.
+    """
+    grouped: Dict[Type[SQLModel], List[Row]] = {
+        model: [] for model in ROW_MODELS.values()
+    }
+    for row in rows:
+        grouped[ROW_MODELS[type(row)]].append(row)
+    return grouped
+
+
+def _model_fields(row: Row) -> Dict[str, Any]:
+    fields = row._asdict()
+    fields["date"] = datetime.date.fromisoformat(row.date)
+    return fields
+
+
 def get_webvisits(swsite: SimilarwebSite) -> Iterable[WebVisits]:
     """Obtains the WebVisits represented in a SimilarwebSite.
 
@@ -102,27 +532,10 @@ def get_webvisits(swsite: SimilarwebSite) -> Iterable[WebVisits]:
         swsite: swsite with the visits to obtain.
 
     Yields:
-        the WebVisits from swsite.
+        the WebVisits from swsite, as instances of the table model.
     """
-    date = _get_date(swsite.date)
-    for months_before, category_rank, total_visits in zip(
-        [2, 1], swsite.past_category_ranks[:-1], swsite.past_total_visits[:-1]
-    ):
-        yield WebVisits(
-            domain=swsite.domain,
-            date=date - relativedelta(months=months_before),
-            category_rank=category_rank,
-            total_visits=as_int(total_visits),
-        )
-    yield WebVisits(
-        domain=swsite.domain,
-        date=date,
-        global_rank=as_int(swsite.global_rank),
-        category_rank=swsite.past_category_ranks[2],
-        total_visits=as_int(swsite.total_visits),
-        bounce_rate=as_float(swsite.bounce_rate),
-        avg_visit_duration=as_seconds(swsite.avg_visit_duration),
-    )
+    for row in get_webvisits_rows(normalize_site(swsite)):
+        yield WebVisits(**_model_fields(row))
 
 
 def get_visits_by_age(swsite: SimilarwebSite) -> Iterable[VisitsByAge]:
@@ -132,19 +545,10 @@ def get_visits_by_age(swsite: SimilarwebSite) -> Iterable[VisitsByAge]:
         swsite: swsite with the visits to obtain.
 
     Yields:
-        the visits by age.
+        the visits by age, as instances of the table model.
     """
-    date = _get_date(swsite.date)
-    for min_age, visits in zip(
-        [18, 25, 35, 45, 55, 65],
-        swsite.age_distribution,
-    ):
-        yield VisitsByAge(
-            domain=swsite.domain,
-            date=date,
-            min_age=min_age,
-            visits=as_float(visits),
-        )
+    for row in get_visits_by_age_rows(normalize_site(swsite)):
+        yield VisitsByAge(**_model_fields(row))
 
 
 def get_country_visists_shares(swsite: SimilarwebSite) -> Iterable[CountryVisitsShare]:
@@ -154,46 +558,351 @@ def get_country_visists_shares(swsite: SimilarwebSite) -> Iterable[CountryVisits
         swsite: swsite with the visits to obtain.
 
     Yields:
-        country visits shares.
+        country visits shares, as instances of the table model.
     """
-    date = _get_date(swsite.date)
-    for country, share in swsite.top_countries:
-        if country != "Others":
-            yield CountryVisitsShare(
-                domain=swsite.domain,
-                date=date,
-                country=country,
-                share=as_float(share),
-            )
+    for row in get_country_visits_share_rows(normalize_site(swsite)):
+        yield CountryVisitsShare(**_model_fields(row))
 
 
-def create_sqlite_file_db_engine(sqlite_file: Path) -> Engine:
+def create_sqlite_file_db_engine(
+    sqlite_file: Path, profile: Optional[str] = None
+) -> Engine:
     """Returns a SQLAlchemy DB engine for a certain SQLite file.
 
+    The engine sets the PRAGMAs of the given profile (see SQLITE_PROFILES)
+    on every connection it opens:
+    "load" trades durability for write speed, with WAL and relaxed fsync,
+    "read" makes the connections read-only and maps the DB file into memory.
+
     Args:
         sqlite_file: the sqlite file to store the DB.
+        profile: name of the PRAGMAs profile to apply.
 
     Returns:
         the SQLAlchemy engine for the DB stored at sqlite_file.
     """
-    return create_engine(f"sqlite:///{sqlite_file.as_posix()}")
+    engine = create_engine(f"sqlite:///{sqlite_file.as_posix()}")
+    if profile is not None:
+        pragmas = SQLITE_PROFILES[profile]
+
+        def _set_pragmas(dbapi_connection: Any, _: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.close()
+
+        event.listen(engine, "connect", _set_pragmas)
+    return engine
+
+
+def create_tables(engine: Engine) -> None:
+    """Creates the tables missing from a DB, without their secondary indexes.
+
+    Args:
+        engine: engine of the DB where to create the tables.
+    """
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            connection.execute(CreateTable(table, if_not_exists=True))
+
+
+def create_indexes(engine: Engine) -> None:
+    """Creates the secondary indexes missing from a DB.
+
+    Building the indexes once the rows are loaded is faster than
+    updating them on every insert.
+
+    Args:
+        engine: engine of the DB where to create the indexes.
+    """
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+_UPDATE_MONTHLY_GROWTH = """
+    WITH affected (domain, date) AS (
+        SELECT domain, date FROM touched
+        UNION
+        SELECT touched.domain, (
+            SELECT MIN(webvisits.date) FROM webvisits
+            WHERE webvisits.domain = touched.domain AND webvisits.date > touched.date
+        ) FROM touched
+    )
+    INSERT OR REPLACE INTO monthlygrowth (domain, date, visits_growth, rank_growth)
+    SELECT
+        visits.domain,
+        visits.date,
+        visits.total_visits * 1.0 / previous.total_visits - 1,
+        visits.category_rank * 1.0 / previous.category_rank - 1
+    FROM affected
+    JOIN webvisits AS visits
+        ON visits.domain = affected.domain AND visits.date = affected.date
+    LEFT JOIN webvisits AS previous
+        ON previous.domain = affected.domain AND previous.date = (
+            SELECT MAX(webvisits.date) FROM webvisits
+            WHERE webvisits.domain = affected.domain AND webvisits.date < affected.date
+        )
+"""
+
+_UPDATE_MONTHLY_COUNTRY_SHARE = """
+    INSERT OR REPLACE INTO monthlycountryshare (date, country, domains, mean_share)
+    SELECT date, country, COUNT(*), AVG(share)
+    FROM countryvisitsshare
+    WHERE date IN (SELECT date FROM touched)
+    GROUP BY date, country
+"""
+
+
+def touch_aggregates(
+    connection: Connection, keys: Optional[Iterable[Tuple[Any, ...]]] = None
+) -> None:
+    """Marks the aggregates depending on some WebVisits rows to update.
+
+    The marked rows are kept in a temporary table, until update_aggregates
+    recomputes their aggregates, all at once.
+
+    Args:
+        connection: connection to the DB where to update the aggregates.
+        keys: (domain, date) keys of the inserted WebVisits rows,
+              with dates in ISO format, or None for all the rows.
+    """
+    cursor = connection.connection.cursor()
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS touched"
+        " (domain TEXT, date DATE, PRIMARY KEY (domain, date))"
+    )
+    if keys is None:
+        cursor.execute(
+            "INSERT OR IGNORE INTO touched SELECT domain, date FROM webvisits"
+        )
+    else:
+        cursor.executemany("INSERT OR IGNORE INTO touched VALUES (?, ?)", keys)
+    cursor.close()
+
+
+def update_aggregates(
+    connection: Connection, keys: Optional[Iterable[Tuple[Any, ...]]] = None
+) -> None:
+    """Updates the aggregate tables (MonthlyGrowth and MonthlyCountryShare).
+
+    Only the aggregates depending on the given WebVisits rows,
+    and on the ones marked by touch_aggregates, are recomputed:
+    their growth, the growth of the next month of their domain,
+    and the country shares of their month.
+
+    Args:
+        connection: connection to the DB where to update the aggregates.
+        keys: (domain, date) keys of the inserted WebVisits rows,
+              with dates in ISO format, or None to recompute all the aggregates.
+    """
+    touch_aggregates(connection, keys)
+    cursor = connection.connection.cursor()
+    cursor.execute(_UPDATE_MONTHLY_GROWTH)
+    cursor.execute(_UPDATE_MONTHLY_COUNTRY_SHARE)
+    cursor.execute("DELETE FROM touched")
+    cursor.close()
 
 
 def load_csv_into_sqlite(csv_file: Path, sqlite_file: Path) -> None:
     """Loads SimilarwebSites from a csv file into a SQLite DB file.
 
+    Each site is normalized (see normalize_site), one at a time,
+    and the rows of every BATCH_SIZE sites are inserted as they are read
+    (see load_normalized), in a single transaction.
+
+    Args:
+        csv_file: csv file to load, or Parquet file (see parse_normalized_sites).
+        sqlite_file: sqlite_file where to load the csv_file.
+    """
+    sites = parse_normalized_sites(csv_file, BATCH_SIZE, _normalize_each)
+    _load_into_sqlite(sites, sqlite_file)
+
+
+@lru_cache(maxsize=None)
+def get_table(model: Type[SQLModel]) -> Table:
+    """Obtains the table of a model.
+
+    Args:
+        model: table model class.
+
+    Returns:
+        the SQLAlchemy table where model's rows are stored.
+    """
+    table: Table = inspect(model).local_table
+    return table
+
+
+def insert_many(
+    connection: Connection,
+    table: Table,
+    rows: Sequence[Tuple[Any, ...]],
+    on_conflict: str = "fail",
+) -> None:
+    """Inserts plain rows into a table, at once, without the ORM.
+
+    Args:
+        connection: connection to the DB, in a transaction.
+        table: table where to insert the rows (see get_table).
+        rows: values of the rows, in the order of the table's columns.
+        on_conflict: what to do with the rows whose primary key already exists,
+                     either fail, update the existing rows with the values
+                     of the new ones which aren't null, or ignore the new ones.
+    """
+    columns = [column.name for column in table.columns]
+    statement = (
+        f"INSERT INTO {table.name} ({', '.join(columns)})"  # nosec
+        f" VALUES ({', '.join('?' for _ in columns)})"
+    )
+    key_columns = [column.name for column in table.primary_key.columns]
+    keys = ", ".join(key_columns)
+    if on_conflict == "update":
+        updates = [
+            f"{column} = COALESCE(excluded.{column}, {table.name}.{column})"
+            for column in columns
+            if column not in key_columns
+        ]
+        statement += f" ON CONFLICT ({keys}) DO UPDATE SET "  # nosec
+        statement += ", ".join(updates)
+    elif on_conflict == "ignore":
+        statement += f" ON CONFLICT ({keys}) DO NOTHING"
+    connection.connection.cursor().executemany(statement, rows)
+
+
+def _split_past_months(rows: List[Row]) -> Tuple[List[Row], List[Row]]:
+    # splits WebVisits rows into the ones of the sites' own months,
+    # and the ones of the months before them, which only have visits and ranks
+    own_rows: List[Row] = []
+    past_rows: List[Row] = []
+    for row in rows:
+        is_past = isinstance(row, WebVisitsRow) and row.global_rank is None
+        (past_rows if is_past else own_rows).append(row)
+    return own_rows, past_rows
+
+
+def _insert_all(
+    connection: Connection,
+    rows: Dict[Type[SQLModel], List[Row]],
+    upsert: bool = False,
+) -> None:
+    # when upserting, only the rows of the sites' own months are updated,
+    # the WebVisits rows of the months before them are inserted only if missing
+    with METRICS.measure("load.flush") as flush:
+        for model, model_rows in rows.items():
+            if model_rows and upsert and model is WebVisits:
+                own_rows, past_rows = _split_past_months(model_rows)
+                insert_many(connection, get_table(model), own_rows, "update")
+                insert_many(connection, get_table(model), past_rows, "ignore")
+            elif model_rows:
+                on_conflict = "update" if upsert else "fail"
+                insert_many(connection, get_table(model), model_rows, on_conflict)
+            flush.items += len(model_rows)
+
+
+def load_normalized(
+    batches: Iterable[Sequence[NormalizedSite]],
+    engine: Engine,
+    upsert: bool = False,
+) -> None:
+    """Loads the normalized values of SimilarwebSites into a DB, a batch at a time.
+
+    The rows of each batch are laid out as plain tuples (see get_site_rows),
+    and inserted with an executemany call per table.
+    The aggregates of the inserted rows are then updated, once all of them
+    are inserted (see touch_aggregates), so that each one is computed once.
+
+    When upserting, the rows of the sites' own months whose primary key
+    already exists are updated instead, keeping the stored values where the new
+    ones are missing. The WebVisits rows of the months before a site's,
+    with the visits and category ranks its page re-reports,
+    are only inserted when missing, so that re-loading a month only touches
+    the rows of that month, instead of mixing two crawls in a row.
+
+    Args:
+        batches: normalized values of the SimilarwebSites to load, in batches.
+        engine: engine of the DB where to load the sites.
+        upsert: flag to update the rows that already exist.
+    """
+    with engine.begin() as connection:
+        for batch in batches:
+            METRICS.record("load", Timing(items=len(batch)))
+            rows = group_rows(row for site in batch for row in get_site_rows(site))
+            _insert_all(connection, rows, upsert)
+            touch_aggregates(connection, (row[:2] for row in rows[WebVisits]))
+        with METRICS.measure("load.aggregate"):
+            update_aggregates(connection, ())
+
+
+def bulk_load(
+    swsites: Iterable[SimilarwebSite],
+    engine: Engine,
+    batch_size: int = BATCH_SIZE,
+    upsert: bool = False,
+) -> None:
+    """Loads SimilarwebSites into a DB, with batched executemany calls.
+
+    Every batch_size sites are normalized at once (see normalize_sites),
+    and loaded as load_normalized does.
+
+    Args:
+        swsites: SimilarwebSites to load.
+        engine: engine of the DB where to load the swsites.
+        batch_size: number of sites loaded at once.
+        upsert: flag to update the rows that already exist.
+    """
+    load_normalized(normalize_batches(swsites, batch_size), engine, upsert)
+
+
+def _load_into_sqlite(
+    batches: Iterable[Sequence[NormalizedSite]], sqlite_file: Path, upsert: bool = False
+) -> None:
+    # creates the secondary indexes of a new DB only after loading it,
+    # and the aggregates missing from a DB loaded before they existed before
+    engine = create_sqlite_file_db_engine(sqlite_file, "load")
+    tables = inspect(engine).get_table_names()
+    create_tables(engine)
+    if "webvisits" in tables and "monthlygrowth" not in tables:
+        with engine.begin() as connection:
+            update_aggregates(connection)
+    load_normalized(batches, engine, upsert)
+    create_indexes(engine)
+    engine.dispose()
+
+
+def bulk_load_into_sqlite(
+    swsites: Iterable[SimilarwebSite],
+    sqlite_file: Path,
+    batch_size: int = BATCH_SIZE,
+    upsert: bool = False,
+) -> None:
+    """Loads SimilarwebSites into a SQLite DB file, in bulk.
+
+    The secondary indexes of a new DB are only created after loading it.
+    The aggregates missing from a DB loaded before they existed
+    are computed before loading.
+
+    Args:
+        swsites: SimilarwebSites to load.
+        sqlite_file: sqlite_file where to load the swsites.
+        batch_size: number of sites loaded at once.
+        upsert: flag to update the rows that already exist in sqlite_file.
+    """
+    _load_into_sqlite(normalize_batches(swsites, batch_size), sqlite_file, upsert)
+
+
+def bulk_load_csv_into_sqlite(
+    csv_file: Path,
+    sqlite_file: Path,
+    batch_size: int = BATCH_SIZE,
+    upsert: bool = False,
+) -> None:
+    """Loads SimilarwebSites from a csv file into a SQLite DB file, in bulk.
+
     Args:
-        csv_file: csv file to load.
+        csv_file: csv file to load, or Parquet file (see parse_normalized_sites).
         sqlite_file: sqlite_file where to load the csv_file.
+        batch_size: number of sites of a csv file loaded at once.
+        upsert: flag to update the rows that already exist in sqlite_file.
     """
-    engine = create_sqlite_file_db_engine(sqlite_file)
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        for swsite in parse_csv(csv_file):
-            for webvisits in get_webvisits(swsite):
-                session.add(webvisits)
-            for visits_by_age in get_visits_by_age(swsite):
-                session.add(visits_by_age)
-            for country_visits_share in get_country_visists_shares(swsite):
-                session.add(country_visits_share)
-        session.commit()
+    _load_into_sqlite(parse_normalized_sites(csv_file, batch_size), sqlite_file, upsert)
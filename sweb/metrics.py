@@ -0,0 +1,199 @@
+"""Measures the time, memory and throughput of the workflow stages."""
+import contextlib
+import dataclasses
+import datetime
+import json
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class Timing:
+    """Time spent by a stage, or a sub-step of it, and the items it processed.
+
+    Times add up over the calls of the stage.
+    """
+
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    items: int = 0
+    calls: int = 0
+
+    @property
+    def items_per_second(self) -> float:
+        """Throughput of the stage.
+
+        Returns:
+            The processed items per second of wall time, or 0 without any time.
+        """
+        return self.items / self.wall_time if self.wall_time else 0.0
+
+    def add(self, other: "Timing") -> None:
+        """Adds the times and items of another Timing.
+
+        Args:
+            other: Timing to add to this one.
+        """
+        self.wall_time += other.wall_time
+        self.cpu_time += other.cpu_time
+        self.items += other.items
+        self.calls += other.calls
+
+
+def _cpu_time() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _peak_rss() -> int:
+    # the peak over the lifetime of the process, since ru_maxrss can't be reset,
+    # in kilobytes on Linux
+    return 1024 * max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+class Metrics:
+    """Records the Timings of named stages.
+
+    Sub-steps are named after their stage, like "extract.read".
+    CPU time is measured for the whole process, and its finished children,
+    so stages overlapping in threads share it.
+    The Timings are recorded from any thread, one at a time.
+    """
+
+    def __init__(self) -> None:
+        """Starts recording, with no Timings."""
+        self.started = datetime.datetime.now()
+        self.timings: Dict[str, Timing] = {}
+        self._lock = threading.Lock()
+        # the Timings collected apart by each thread (see collect)
+        self._collected = threading.local()
+
+    def reset(self) -> None:
+        """Discards the recorded Timings, and starts recording anew."""
+        with self._lock:
+            self.started = datetime.datetime.now()
+            self.timings = {}
+
+    @contextlib.contextmanager
+    def measure(self, name: str, items: int = 0) -> Iterator[Timing]:
+        """Measures a stage, adding its Timing to the stage's ones.
+
+        Args:
+            name: name of the stage.
+            items: number of items the stage processes,
+                   which can also be set on the yielded Timing.
+
+        Yields:
+            The Timing of the stage, which is measured when the stage exits.
+        """
+        timing = Timing(items=items, calls=1)
+        wall_time, cpu_time = time.perf_counter(), _cpu_time()
+        try:
+            yield timing
+        finally:
+            timing.wall_time = time.perf_counter() - wall_time
+            timing.cpu_time = _cpu_time() - cpu_time
+            self.record(name, timing)
+
+    def record(self, name: str, timing: Timing) -> None:
+        """Adds a Timing to a stage's ones, or to the ones the thread collects.
+
+        Args:
+            name: name of the stage.
+            timing: the Timing to add.
+        """
+        collected: Optional[Dict[str, Timing]] = getattr(
+            self._collected, "timings", None
+        )
+        if collected is not None:
+            collected.setdefault(name, Timing()).add(timing)
+            return
+        with self._lock:
+            self.timings.setdefault(name, Timing()).add(timing)
+
+    def count(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Counts the items processed by a stage, as they come.
+
+        Args:
+            name: name of the stage.
+            items: the items to count.
+
+        Yields:
+            The items, which are recorded once they're all processed.
+        """
+        count = 0
+        try:
+            for item in items:
+                count += 1
+                yield item
+        finally:
+            self.record(name, Timing(items=count))
+
+    def merge(self, timings: Dict[str, Timing]) -> None:
+        """Adds the Timings recorded elsewhere, e.g. by a worker process.
+
+        Args:
+            timings: Timings by stage name.
+        """
+        for name, timing in timings.items():
+            self.record(name, timing)
+
+    @contextlib.contextmanager
+    def collect(self) -> Iterator[Dict[str, Timing]]:
+        """Records the Timings of some stages apart, e.g. to send them elsewhere.
+
+        Only the Timings recorded by the calling thread are collected,
+        until exiting, while other threads keep recording theirs.
+        The collected Timings can then be merged into the recorded ones.
+
+        Yields:
+            The Timings recorded by the thread until exiting, by stage name.
+        """
+        collected = getattr(self._collected, "timings", None)
+        self._collected.timings = {}
+        try:
+            yield self._collected.timings
+        finally:
+            self._collected.timings = collected
+
+    def report(self) -> Dict[str, Any]:
+        """Reports the recorded Timings.
+
+        Returns:
+            A JSON serializable report, with the start time,
+            the peak resident memory of the process and its children so far,
+            and the Timings and throughput of every stage.
+        """
+        with self._lock:
+            return {
+                "started": self.started.isoformat(),
+                "peak_rss": _peak_rss(),
+                "stages": {
+                    name: {
+                        **dataclasses.asdict(timing),
+                        "items_per_second": timing.items_per_second,
+                    }
+                    for name, timing in sorted(self.timings.items())
+                },
+            }
+
+    def write_json(self, json_file: Path) -> None:
+        """Writes the report of the recorded Timings into a JSON file.
+
+        Args:
+            json_file: file where to write the report.
+        """
+        json_file.write_text(json.dumps(self.report(), indent=2))
+
+
+# records the stages of the process, and of the worker processes it merges
+METRICS = Metrics()
@@ -1,35 +1,41 @@
 """Defines the base model."""
 import datetime
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Optional
 
+import sqlalchemy
 import sqlmodel
 
+from sweb.site import SimilarwebSite
 
-@dataclass()
-class SimilarwebSite:  # pylint: disable=too-many-instance-attributes
-    """Represents website page scraped from Similarweb.
-
-    All properties represent the literal strings or string lists scraped from the HTML.
-    Properties are assigned with empty strings or lists by default.
-    """
-
-    domain: str = ""
-    date: str = ""
-    global_rank: str = ""
-    total_visits: str = ""
-    bounce_rate: str = ""
-    avg_visit_duration: str = ""
-    past_category_ranks: List[int] = field(default_factory=lambda: [-1, -1, -1])
-    past_total_visits: List[str] = field(default_factory=lambda: ["", "", ""])
-    top_countries: List[Tuple[str, str]] = field(default_factory=lambda: [])
-    age_distribution: List[str] = field(default_factory=lambda: [])
+__all__ = [
+    "SimilarwebSite",
+    "WebVisits",
+    "VisitsByAge",
+    "CountryVisitsShare",
+    "MonthlyGrowth",
+    "MonthlyCountryShare",
+]
 
 
 class WebVisits(
     sqlmodel.SQLModel, table=True
 ):  # pylint: disable=too-many-instance-attributes
-    """Visit stats for a web page."""
+    """Visit stats for a web page.
+
+    Besides the (domain, date) primary key, the table has an index covering the
+    timeseries queries, which read every domain's values ordered by date.
+    """
+
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_webvisits_date_domain",
+            "date",
+            "domain",
+            "total_visits",
+            "category_rank",
+        ),
+    )
 
     domain: str = sqlmodel.Field(primary_key=True)
     date: datetime.date = sqlmodel.Field(primary_key=True)
@@ -53,7 +59,33 @@ class VisitsByAge(sqlmodel.SQLModel, table=True):
 class CountryVisitsShare(sqlmodel.SQLModel, table=True):
     """Web page visits share for a top visitor country."""
 
+    __table_args__ = (
+        sqlalchemy.Index("ix_countryvisitsshare_date", "date", "country", "share"),
+    )
+
     domain: str = sqlmodel.Field(primary_key=True)
     date: datetime.date = sqlmodel.Field(primary_key=True)
     country: str = sqlmodel.Field(primary_key=True)
     share: float = sqlmodel.Field()
+
+
+class MonthlyGrowth(sqlmodel.SQLModel, table=True):
+    """Month-on-month growth of a web page, aggregated from its WebVisits.
+
+    The growths are the relative changes from the previous month loaded for the
+    domain, and are missing for its first month.
+    """
+
+    domain: str = sqlmodel.Field(primary_key=True)
+    date: datetime.date = sqlmodel.Field(primary_key=True)
+    visits_growth: Optional[float] = sqlmodel.Field(default=None)
+    rank_growth: Optional[float] = sqlmodel.Field(default=None)
+
+
+class MonthlyCountryShare(sqlmodel.SQLModel, table=True):
+    """Monthly visits share of a country, aggregated from its CountryVisitsShares."""
+
+    date: datetime.date = sqlmodel.Field(primary_key=True)
+    country: str = sqlmodel.Field(primary_key=True)
+    domains: int
+    mean_share: float
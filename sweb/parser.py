@@ -1,9 +1,19 @@
 """Parses website pages from Similarweb."""
-from typing import List
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import parsel.selector
 
-from sweb.model import SimilarwebSite
+from sweb.metrics import METRICS
+from sweb.site import SimilarwebSite
+
+# bump whenever a change to the parsing changes the scraped values,
+# to invalidate the extractions cached with the previous version
+PARSER_VERSION = "1"
+
+SECTIONS = ("overview", "ranking", "traffic", "geography", "demographics")
+
+_SECTION_TAG = re.compile(r"<(/?)section\b")
 
 
 def parse_number(text: str) -> float:
@@ -90,3 +100,84 @@ def parse(dom: parsel.selector.Selector) -> SimilarwebSite:
         ),
         age_distribution=_txt_list_at("#demographics .wa-demographics__age-data-label"),
     )
+
+
+def find_section(html: str, section: str) -> Optional[Tuple[int, int]]:
+    """Finds a section of a Similarweb page, without parsing the page.
+
+    The section is looked up by id, up to its closing tag.
+
+    Args:
+        html: Similarweb page HTML.
+        section: id of the section element.
+
+    Returns:
+        The start and end positions of the section in html,
+        or None if it's missing (or never closed).
+    """
+    start = re.search(rf'<section\b[^>]*\bid="{section}"', html)
+    if start is None:
+        return None
+    depth = 0
+    for tag in _SECTION_TAG.finditer(html, start.start()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return start.start(), html.index(">", tag.end()) + 1
+    return None
+
+
+def slice_sections(html: str, sections: Sequence[str] = SECTIONS) -> str:
+    """Slices the given sections out of a Similarweb page.
+
+    The sections are cut out without parsing the rest of the page
+    (see find_section). Sections missing from the page are left out.
+
+    Args:
+        html: Similarweb page HTML.
+        sections: ids of the section elements to slice.
+
+    Returns:
+        An HTML document containing only the sliced sections.
+    """
+    slices = []
+    for section in sections:
+        bounds = find_section(html, section)
+        if bounds is not None:
+            slices.append(html[bounds[0] : bounds[1]])
+    return "<html><body>" + "".join(slices) + "</body></html>"
+
+
+def parse_dom(html: str) -> SimilarwebSite:
+    """Parses a Similarweb page by building the DOM of the whole page.
+
+    Args:
+        html: Similarweb page HTML.
+
+    Returns:
+        SimilarwebSite containing the scraped values.
+    """
+    with METRICS.measure("extract.dom", items=1):
+        dom = parsel.selector.Selector(text=html)
+    with METRICS.measure("extract.select", items=1):
+        return parse(dom)
+
+
+def parse_sections(html: str) -> SimilarwebSite:
+    """Parses a Similarweb page by building the DOM of the scraped sections only.
+
+    Args:
+        html: Similarweb page HTML.
+
+    Returns:
+        SimilarwebSite containing the scraped values.
+    """
+    with METRICS.measure("extract.dom", items=1):
+        dom = parsel.selector.Selector(text=slice_sections(html))
+    with METRICS.measure("extract.select", items=1):
+        return parse(dom)
+
+
+ENGINES: Dict[str, Callable[[str], SimilarwebSite]] = {
+    "dom": parse_dom,
+    "sections": parse_sections,
+}
@@ -0,0 +1,122 @@
+"""Profiles the workflow stages with cProfile, on demand.
+
+Profiling slows the profiled code down, so only the stages selected
+(see parse_stages) are profiled.
+Each one is dumped into a pstats file, which pstats, snakeviz or flameprof
+(to draw it as a flame graph) read, and summarized into a text file.
+"""
+import contextlib
+import cProfile
+import pstats
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional
+
+STAGES = ("extract", "load", "analyse")
+
+# number of functions in the summary of each stage
+SUMMARY_SIZE = 50
+
+
+def parse_stages(stages: str) -> FrozenSet[str]:
+    """Parses the stages to profile.
+
+    Args:
+        stages: comma separated names of workflow stages (see STAGES),
+                or "all" for all of them.
+
+    Returns:
+        The names of the stages.
+
+    Raises:
+        ValueError: if any stage isn't a workflow stage.
+    """
+    names = frozenset(name.strip() for name in stages.split(",") if name.strip())
+    if names == {"all"}:
+        return frozenset(STAGES)
+    unknown = names.difference(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages to profile: {', '.join(sorted(unknown))}")
+    return names
+
+
+class Profiler:
+    """Profiles the selected stages, each one in the thread that runs it.
+
+    A stage that runs several times adds up to the same profile.
+    Only one stage is profiled at a time, since a process can't run several
+    profilers at once (Python 3.12 refuses to).
+    """
+
+    def __init__(self) -> None:
+        """Starts with no stage to profile."""
+        self.stages: FrozenSet[str] = frozenset()
+        self.output_dir = Path(".")
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        # the stage being profiled, in any thread
+        self.active: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def configure(self, stages: Iterable[str], output_dir: Path) -> None:
+        """Selects the stages to profile, discarding the previous profiles.
+
+        Args:
+            stages: names of the stages to profile.
+            output_dir: directory where to write the profiles.
+        """
+        self.stages = frozenset(stages)
+        self.output_dir = output_dir
+        self.profiles = {}
+
+    @contextlib.contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """Profiles a stage, if selected, and writes its profile on exit.
+
+        Args:
+            stage: name of the stage.
+
+        Yields:
+            Nothing, while the stage runs.
+
+        Raises:
+            RuntimeError: if another stage is being profiled.
+        """
+        if stage not in self.stages:
+            yield
+            return
+        with self._lock:
+            if self.active is not None:
+                raise RuntimeError(
+                    f"Can't profile the {stage} stage"
+                    f" while profiling the {self.active} stage!"
+                )
+            self.active = stage
+        profile = self.profiles.setdefault(stage, cProfile.Profile())
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.active = None
+            self.write(stage)
+
+    def write(self, stage: str) -> Path:
+        """Writes the profile of a stage, and its summary.
+
+        Args:
+            stage: name of the profiled stage.
+
+        Returns:
+            The pstats file, next to which the summary is written,
+            with the functions taking the most cumulative time.
+        """
+        stats_file = self.output_dir / f"profile-{stage}.pstats"
+        self.profiles[stage].dump_stats(stats_file)
+        with stats_file.with_suffix(".txt").open("w", encoding="utf-8") as summary:
+            stats = pstats.Stats(str(stats_file), stream=summary)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_SIZE)
+        return stats_file
+
+
+# profiles the stages selected for the process
+PROFILER = Profiler()
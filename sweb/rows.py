@@ -0,0 +1,71 @@
+"""Defines the rows of the normalized tables, as plain tuples.
+
+The rows are the ones of the sweb.model tables, without their validation and
+ORM instrumentation, so that loading the SimilarwebSites only allocates tuples.
+Their fields are ordered as the tables' columns, with dates in ISO format,
+so that they can be inserted as they are.
+"""
+import datetime
+from typing import List, NamedTuple, Optional, Union
+
+
+class NormalizedSite(NamedTuple):
+    """The values of a SimilarwebSite with visits stats, normalized.
+
+    They are the values of the rows of the site,
+    whichever way they were normalized, before they are laid out into rows.
+    """
+
+    domain: str
+    # the last day of the month of the site
+    date: datetime.date
+    global_rank: int
+    total_visits: int
+    bounce_rate: float
+    avg_visit_duration: int
+    category_rank: int
+    # the category ranks and visits of the months before, oldest first
+    previous_category_ranks: List[int]
+    previous_total_visits: List[int]
+    # the top countries, but "Others", and their shares of the visits
+    countries: List[str]
+    country_shares: List[float]
+    # the visits of the age groups, youngest first
+    age_visits: List[float]
+
+
+class WebVisitsRow(NamedTuple):
+    """A row of the WebVisits table.
+
+    The rows of the months before a site's, re-reported by its page,
+    only have the total visits and category rank.
+    """
+
+    domain: str
+    date: str
+    total_visits: int
+    category_rank: int
+    global_rank: Optional[int] = None
+    bounce_rate: Optional[float] = None
+    avg_visit_duration: Optional[int] = None
+
+
+class VisitsByAgeRow(NamedTuple):
+    """A row of the VisitsByAge table."""
+
+    domain: str
+    date: str
+    min_age: int
+    visits: float
+
+
+class CountryVisitsShareRow(NamedTuple):
+    """A row of the CountryVisitsShare table."""
+
+    domain: str
+    date: str
+    country: str
+    share: float
+
+
+Row = Union[WebVisitsRow, VisitsByAgeRow, CountryVisitsShareRow]
@@ -0,0 +1,91 @@
+"""Defines the website pages scraped from Similarweb, and their csv records.
+
+It doesn't depend on the DB model, so that extracting the pages doesn't load it.
+"""
+import ast
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+SERIES_FIELDS = (
+    "past_category_ranks",
+    "past_total_visits",
+    "top_countries",
+    "age_distribution",
+)
+
+
+@dataclass()
+class SimilarwebSite:  # pylint: disable=too-many-instance-attributes
+    """Represents website page scraped from Similarweb.
+
+    All properties represent the literal strings or string lists scraped from the HTML.
+    Properties are assigned with empty strings or lists by default.
+    """
+
+    domain: str = ""
+    date: str = ""
+    global_rank: str = ""
+    total_visits: str = ""
+    bounce_rate: str = ""
+    avg_visit_duration: str = ""
+    past_category_ranks: List[int] = field(default_factory=lambda: [-1, -1, -1])
+    past_total_visits: List[str] = field(default_factory=lambda: ["", "", ""])
+    top_countries: List[Tuple[str, str]] = field(default_factory=lambda: [])
+    age_distribution: List[str] = field(default_factory=lambda: [])
+
+
+def has_visits(swsite: SimilarwebSite) -> bool:
+    """Tells whether a SimilarwebSite has visits stats.
+
+    Similarweb doesn't show the stats of websites with less than 5K visits.
+
+    Args:
+        swsite: SimilarwebSite to check.
+
+    Returns:
+        False if swsite has less than 5K visits, True otherwise.
+    """
+    return swsite.total_visits != "< 5K"
+
+
+def encode_site(swsite: SimilarwebSite) -> Dict[str, str]:
+    """Encodes a SimilarwebSite into a csv record.
+
+    The series fields are encoded in JSON.
+
+    Args:
+        swsite: SimilarwebSite to encode.
+
+    Returns:
+        The csv record, with a cell per SimilarwebSite field.
+    """
+    record = vars(swsite).copy()
+    for key in SERIES_FIELDS:
+        record[key] = json.dumps(record[key])
+    return record
+
+
+def _decode_series(cell: str) -> Any:
+    try:
+        return json.loads(cell)
+    except json.JSONDecodeError:
+        # csv files written before the series were JSON encoded
+        # hold their Python representation instead
+        return ast.literal_eval(cell)
+
+
+def decode_site(record: Dict[str, str]) -> SimilarwebSite:
+    """Decodes a SimilarwebSite from a csv record.
+
+    Args:
+        record: csv record, with a cell per SimilarwebSite field.
+
+    Returns:
+        The SimilarwebSite encoded in record.
+    """
+    fields: Dict[str, Any] = dict(record)
+    for key in SERIES_FIELDS:
+        fields[key] = _decode_series(record[key])
+    fields["top_countries"] = [tuple(country) for country in fields["top_countries"]]
+    return SimilarwebSite(**fields)
@@ -0,0 +1,125 @@
+"""Finds and reads the HTML pages to parse, plain or compressed.
+
+Pages are read from HTML files, gzip or zstd compressed HTML files,
+and tar or zip archives of them.
+They are decompressed while read, in memory, without inflating them to disk.
+Reading zstd compressed pages requires the optional dependency zstandard
+(install sweb with the zstd extra).
+"""
+import gzip
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple, Optional
+
+HTML_SUFFIXES = (".html", ".html.gz", ".html.zst")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+ZIP_SUFFIXES = (".zip",)
+
+
+class HtmlSource(NamedTuple):
+    """An HTML page to parse: a file, or a member of an archive file.
+
+    Members of archives are read while finding them, in a single pass over
+    each archive, and carry their content in html.
+    Files are only read when parsed.
+    """
+
+    path: Path
+    member: str = ""
+    html: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Names the source, telling archive members apart.
+
+        Returns:
+            The path of the file, followed by the member name for archive members.
+        """
+        if self.member:
+            return f"{self.path.as_posix()}!{self.member}"
+        return self.path.as_posix()
+
+
+def _decompress(stream: IO[bytes], name: str) -> bytes:
+    if name.endswith(".gz"):
+        with gzip.GzipFile(fileobj=stream) as page:
+            return page.read()
+    if name.endswith(".zst"):
+        # pylint: disable-next=import-outside-toplevel
+        import zstandard
+
+        with zstandard.ZstdDecompressor().stream_reader(stream) as page:
+            return page.read()
+    return stream.read()
+
+
+def read_html(stream: IO[bytes], name: str) -> str:
+    """Reads an HTML page, decompressing it as it's read.
+
+    Args:
+        stream: binary stream with the (compressed) page, closed once read.
+        name: name of the page, telling its compression by its suffix.
+
+    Returns:
+        The HTML of the page.
+    """
+    with stream:
+        return _decompress(stream, name).decode("utf-8")
+
+
+def read_source(source: HtmlSource) -> str:
+    """Reads the HTML page of a source.
+
+    Args:
+        source: the source to read.
+
+    Returns:
+        The HTML of the source page.
+    """
+    if source.html is not None:
+        return source.html
+    return read_html(source.path.open("rb"), source.path.name)
+
+
+def is_html(name: str) -> bool:
+    """Tells whether a file is an HTML page, plain or compressed.
+
+    Args:
+        name: name of the file.
+
+    Returns:
+        True if the name has an HTML page suffix.
+    """
+    return name.endswith(HTML_SUFFIXES)
+
+
+def find_sources(html_dir: Path) -> Iterator[HtmlSource]:
+    """Finds the HTML pages in a directory, and in the archives in it.
+
+    Args:
+        html_dir: directory containing the HTML files and archives.
+
+    Yields:
+        The sources of the HTML pages, ordered by file name,
+        and by member name inside zip archives.
+        Members of tar archives are yielded in the archive order.
+        Each archive is opened once, reading its members as they're yielded.
+    """
+    for path in sorted(html_dir.iterdir()):
+        if is_html(path.name):
+            yield HtmlSource(path)
+        elif path.name.endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(path) as archive:
+                for member in sorted(archive.namelist()):
+                    if is_html(member):
+                        # read_html closes the member once read
+                        # pylint: disable-next=consider-using-with
+                        html = read_html(archive.open(member), member)
+                        yield HtmlSource(path, member, html)
+        elif path.name.endswith(TAR_SUFFIXES):
+            with tarfile.open(path, "r|*") as archive:
+                for info in archive:
+                    stream = archive.extractfile(info)
+                    if stream is not None and is_html(info.name):
+                        yield HtmlSource(path, info.name, read_html(stream, info.name))
@@ -0,0 +1,672 @@
+"""Generates synthetic Similarweb data, to test and benchmark sweb at scale.
+
+A History holds the monthly visits of any number of domains,
+generated at random, all at once, with NumPy.
+Its values are drawn in the units of the strings Similarweb shows
+(e.g. tenths of millions of visits, hundredths of percent),
+so that the sites made from it load back into the same values.
+
+A History is emitted as:
+
+- SimilarwebSites, one every 3 months per domain (see history_sites);
+- a csv file of those sites, as sweb.workflow.write_csv writes them;
+- a SQLite DB, as loading those sites makes it;
+- HTML pages, rendered into a PageTemplate made from a Similarweb page.
+"""
+import html
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from sweb.loader import (
+    create_indexes,
+    create_sqlite_file_db_engine,
+    create_tables,
+    get_table,
+    insert_many,
+)
+from sweb.model import (
+    CountryVisitsShare,
+    MonthlyCountryShare,
+    MonthlyGrowth,
+    VisitsByAge,
+    WebVisits,
+)
+from sweb.parser import find_section
+from sweb.site import SimilarwebSite
+
+COUNTRIES = (
+    "United States",
+    "India",
+    "United Kingdom",
+    "Canada",
+    "Germany",
+    "Brazil",
+    "Japan",
+    "France",
+    "Russia",
+    "Spain",
+    "Italy",
+    "Mexico",
+    "Indonesia",
+    "Turkey",
+    "Australia",
+    "Netherlands",
+    "South Korea",
+    "Poland",
+    "Vietnam",
+    "Philippines",
+)
+TOP_COUNTRIES = 5
+MIN_AGES = (18, 25, 35, 45, 55, 65)
+
+# each site carries the visits of 3 months
+MONTHS_PER_SITE = 3
+
+_VISITS_SUFFIXES = ("K", "M", "B")
+_NUMBERS = tuple(str(number) for number in range(1000))
+_TWO_DIGITS = tuple(f"{number:02d}" for number in range(100))
+
+IntArray = npt.NDArray[np.int64]
+
+
+class History(NamedTuple):
+    """Monthly visits of a set of domains.
+
+    The arrays are indexed by domain, then by month, in increasing order.
+    Visits are tenths of thousands, millions or billions (see visits_units),
+    and percentages are hundredths of percent.
+    """
+
+    domains: List[str]
+    months: "pd.PeriodIndex"
+    visits_tenths: IntArray
+    visits_units: IntArray
+    category_ranks: IntArray
+    global_ranks: IntArray
+    bounce_rates: IntArray
+    visit_durations: IntArray
+    countries: IntArray
+    country_shares: IntArray
+    age_shares: IntArray
+
+    @property
+    def total_visits(self) -> IntArray:
+        """Total visits of each domain and month.
+
+        Returns:
+            The visits, as sweb.loader normalizes their strings.
+        """
+        scales = 1000.0 ** (self.visits_units + 1)
+        total_visits: IntArray = (self.visits_tenths / 10 * scales).astype(np.int64)
+        return total_visits
+
+    @property
+    def site_months(self) -> IntArray:
+        """Months of the sites made from the History (see history_sites).
+
+        Returns:
+            The indices of the months, from the latest to the earliest.
+        """
+        return np.arange(len(self.months) - 1, MONTHS_PER_SITE - 2, -MONTHS_PER_SITE)
+
+
+def _shares(rng: np.random.Generator, shape: Tuple[int, ...], parts: int) -> IntArray:
+    # splits 100% into parts, in hundredths of percent
+    shares: IntArray = np.floor(rng.dirichlet(np.ones(parts), size=shape) * 10000)
+    return shares.astype(np.int64)
+
+
+def generate_history(
+    domains: int, months: int, end: str = "December 2022", seed: int = 0
+) -> History:
+    """Generates the visits of domains over months, at random.
+
+    Each domain's visits and category rank follow a random walk
+    from a random starting point, and its global rank follows its visits.
+
+    Args:
+        domains: number of domains.
+        months: number of months.
+        end: the last month.
+        seed: seed of the random generator.
+
+    Returns:
+        The generated History.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (domains, months)
+    walk = rng.normal(0.01, 0.08, shape).cumsum(axis=1)
+    visits = rng.lognormal(12, 2.5, (domains, 1)) * np.exp(walk)
+    visits_units = np.clip(np.floor(np.log10(visits) / 3) - 1, 0, 2).astype(np.int64)
+    visits_tenths = np.clip(
+        np.round(visits / 1000.0 ** (visits_units + 1) * 10), 0, 9999
+    )
+    # Similarweb shows visits below 5K as "< 5K"
+    visits_tenths[visits_units == 0] = np.maximum(visits_tenths[visits_units == 0], 50)
+    ranks_walk = rng.normal(0, 0.05, shape).cumsum(axis=1)
+    category_ranks = rng.integers(1, 5000, (domains, 1)) * np.exp(ranks_walk)
+    country_shares = _shares(rng, shape, TOP_COUNTRIES + 1)
+    country_shares[..., :TOP_COUNTRIES] = -np.sort(
+        -country_shares[..., :TOP_COUNTRIES], axis=-1
+    )
+    history = History(
+        domains=[f"domain{index}.com" for index in range(domains)],
+        months=pd.period_range(end=end, periods=months, freq="M"),
+        visits_tenths=visits_tenths.astype(np.int64),
+        visits_units=visits_units,
+        category_ranks=np.maximum(np.round(category_ranks), 1).astype(np.int64),
+        global_ranks=np.zeros(shape, dtype=np.int64),
+        bounce_rates=rng.integers(2000, 8000, shape),
+        visit_durations=rng.integers(10, 1800, shape),
+        countries=rng.random((domains, len(COUNTRIES))).argsort(axis=1)[
+            :, :TOP_COUNTRIES
+        ],
+        country_shares=country_shares,
+        age_shares=_shares(rng, shape, len(MIN_AGES)),
+    )
+    global_ranks = np.maximum(1e10 / history.total_visits, 1).astype(np.int64)
+    return history._replace(global_ranks=global_ranks)
+
+
+def _concat(*parts: "pd.Series[str]") -> "pd.Series[str]":
+    concatenated = parts[0]
+    for part in parts[1:]:
+        concatenated = concatenated + part
+    return concatenated
+
+
+def _strings(strings: Sequence[str], values: IntArray) -> "pd.Series[str]":
+    # formats the values by looking their strings up, much faster than str
+    return pd.Series(np.array(strings, dtype=object)[values.ravel()])
+
+
+def _visits_repr(tenths: IntArray, units: IntArray) -> "pd.Series[str]":
+    return _concat(
+        _strings(_NUMBERS, tenths // 10),
+        ".",
+        _strings(_NUMBERS, tenths % 10),
+        _strings(_VISITS_SUFFIXES, units),
+    )
+
+
+def _percent_repr(hundredths: IntArray) -> "pd.Series[str]":
+    return _concat(
+        _strings(_NUMBERS, hundredths // 100),
+        ".",
+        _strings(_TWO_DIGITS, hundredths % 100),
+        "%",
+    )
+
+
+def _duration_repr(seconds: IntArray) -> "pd.Series[str]":
+    return _concat(
+        _strings(_TWO_DIGITS, seconds // 3600),
+        ":",
+        _strings(_TWO_DIGITS, seconds // 60 % 60),
+        ":",
+        _strings(_TWO_DIGITS, seconds % 60),
+    )
+
+
+def _json_list(items: Sequence["pd.Series[str]"]) -> "pd.Series[str]":
+    parts: List["pd.Series[str]"] = []
+    for item in items:
+        parts.extend((", " if parts else "[", item))
+    return _concat(*parts, "]")
+
+
+def _quoted(strings: "pd.Series[str]") -> "pd.Series[str]":
+    return '"' + strings + '"'
+
+
+class _SiteColumns(NamedTuple):
+    fields: Dict[str, "pd.Series[str]"]
+    category_ranks: List["pd.Series[int]"]
+    total_visits: List["pd.Series[str]"]
+    country_names: List["pd.Series[str]"]
+    country_shares: List["pd.Series[str]"]
+    age_shares: List["pd.Series[str]"]
+
+
+def _site_columns(history: History, site_months: IntArray) -> _SiteColumns:
+    # the columns of the sites of all domains, by domain, then by month
+    domains = len(history.domains)
+    current = (slice(None), site_months)
+    past = [(slice(None), site_months - back) for back in (2, 1, 0)]
+    countries = np.repeat(history.countries, len(site_months), axis=0)
+    return _SiteColumns(
+        fields={
+            "domain": pd.Series(np.repeat(history.domains, len(site_months))),
+            "date": pd.Series(
+                np.tile(history.months.strftime("%B %Y")[site_months], domains)
+            ),
+            "global_rank": pd.Series(history.global_ranks[current].ravel()).map(
+                lambda rank: f"{rank:,}"
+            ),
+            "total_visits": _visits_repr(
+                history.visits_tenths[current], history.visits_units[current]
+            ),
+            "bounce_rate": _percent_repr(history.bounce_rates[current]),
+            "avg_visit_duration": _duration_repr(history.visit_durations[current]),
+        },
+        category_ranks=[
+            pd.Series(history.category_ranks[month].ravel()) for month in past
+        ],
+        total_visits=[
+            _visits_repr(history.visits_tenths[month], history.visits_units[month])
+            for month in past
+        ],
+        country_names=[
+            pd.Series(np.array(COUNTRIES)[countries[:, country]])
+            for country in range(TOP_COUNTRIES)
+        ]
+        + [pd.Series(["Others"] * len(countries))],
+        country_shares=[
+            _percent_repr(history.country_shares[current][..., country])
+            for country in range(TOP_COUNTRIES + 1)
+        ],
+        age_shares=[
+            _percent_repr(history.age_shares[current][..., age])
+            for age in range(len(MIN_AGES))
+        ],
+    )
+
+
+def history_sites(  # pylint: disable=too-many-locals
+    history: History, sites: Optional[int] = None
+) -> Iterator[SimilarwebSite]:
+    """Makes the SimilarwebSites whose pages would carry a History.
+
+    Each domain has a site every 3 months, carrying its last 3 months of visits,
+    from the last month of the History.
+    Months before the earliest site's 3 months are left out.
+
+    Args:
+        history: the History.
+        sites: number of sites of each domain, from the latest,
+               or None for all of them.
+
+    Yields:
+        The SimilarwebSites, by domain, from the latest to the earliest.
+    """
+    columns = _site_columns(history, history.site_months[:sites])
+    for values in zip(
+        *columns.fields.values(),
+        zip(*columns.category_ranks),
+        zip(*columns.total_visits),
+        zip(zip(*columns.country_names), zip(*columns.country_shares)),
+        zip(*columns.age_shares),
+    ):
+        *fields, ranks, visits, (names, shares), ages = values
+        domain, date, global_rank, total_visits, bounce_rate, duration = fields
+        yield SimilarwebSite(
+            domain=domain,
+            date=date,
+            global_rank=global_rank,
+            total_visits=total_visits,
+            bounce_rate=bounce_rate,
+            avg_visit_duration=duration,
+            past_category_ranks=list(ranks),
+            past_total_visits=list(visits),
+            top_countries=list(zip(names, shares)),
+            age_distribution=list(ages),
+        )
+
+
+def write_history_csv(history: History, csv_file: Path) -> None:
+    """Writes the SimilarwebSites of a History (see history_sites) into a csv file.
+
+    The csv is the one sweb.workflow.write_csv writes, but it's formatted
+    all at once, instead of one site at a time.
+
+    Args:
+        history: the History.
+        csv_file: csv file where to write the sites.
+    """
+    columns = _site_columns(history, history.site_months)
+    frame = pd.DataFrame(
+        {
+            **columns.fields,
+            "past_category_ranks": _json_list(
+                [ranks.astype(str) for ranks in columns.category_ranks]
+            ),
+            "past_total_visits": _json_list(
+                [_quoted(visits) for visits in columns.total_visits]
+            ),
+            "top_countries": _json_list(
+                [
+                    _json_list([_quoted(name), _quoted(share)])
+                    for name, share in zip(
+                        columns.country_names, columns.country_shares
+                    )
+                ]
+            ),
+            "age_distribution": _json_list(
+                [_quoted(share) for share in columns.age_shares]
+            ),
+        }
+    )
+    frame.to_csv(csv_file, index=False, lineterminator="\n")
+
+
+def _dates(history: History, months: IntArray) -> "pd.Series[str]":
+    # the dates sweb.loader gives the months of a site's visits:
+    # the last day of the site's month, moved back to each month
+    site_months = months + (len(history.months) - 1 - months) % MONTHS_PER_SITE
+    days = np.minimum(
+        history.months[site_months].days_in_month, history.months[months].days_in_month
+    )
+    dates = history.months[months].to_timestamp() + pd.to_timedelta(days - 1, "D")
+    return pd.Series(np.tile(dates.strftime("%Y-%m-%d"), len(history.domains)))
+
+
+def _rows(*columns: "pd.Series[str]") -> List[Tuple[object, ...]]:
+    return list(zip(*(column.tolist() for column in columns)))
+
+
+def _fractions(hundredths: IntArray) -> "pd.Series[float]":
+    # as sweb.loader normalizes percentages
+    return pd.Series(hundredths.ravel() / 100 / 100).round(4)
+
+
+def _only_sites(
+    values: "pd.Series[object]", is_site: "pd.Series[bool]"
+) -> "pd.Series[object]":
+    # the values of the months without a site are missing, as when loading the sites
+    return values.astype(object).where(is_site, None)
+
+
+def _webvisits_rows(
+    history: History, months: IntArray, site_months: IntArray
+) -> List[Tuple[object, ...]]:
+    is_site = pd.Series(np.tile(np.isin(months, site_months), len(history.domains)))
+    return _rows(
+        pd.Series(history.domains).repeat(len(months)),
+        _dates(history, months),
+        pd.Series(history.total_visits[:, months].ravel()),
+        pd.Series(history.category_ranks[:, months].ravel()),
+        _only_sites(pd.Series(history.global_ranks[:, months].ravel()), is_site),
+        _only_sites(_fractions(history.bounce_rates[:, months]), is_site),
+        _only_sites(pd.Series(history.visit_durations[:, months].ravel()), is_site),
+    )
+
+
+def _visits_by_age_rows(
+    history: History, site_months: IntArray
+) -> List[Tuple[object, ...]]:
+    rows = len(history.domains) * len(site_months)
+    return _rows(
+        pd.Series(history.domains).repeat(len(site_months) * len(MIN_AGES)),
+        _dates(history, site_months).repeat(len(MIN_AGES)),
+        pd.Series(np.tile(MIN_AGES, rows)),
+        _fractions(history.age_shares[:, site_months]),
+    )
+
+
+def _country_shares(history: History, site_months: IntArray) -> "pd.DataFrame":
+    # the CountryVisitsShare rows, in a frame, since they're aggregated too
+    countries = np.repeat(history.countries[:, np.newaxis], len(site_months), axis=1)
+    return pd.DataFrame(
+        {
+            "domain": np.repeat(history.domains, len(site_months) * TOP_COUNTRIES),
+            "date": _dates(history, site_months).repeat(TOP_COUNTRIES).to_numpy(),
+            "country": np.array(COUNTRIES)[countries.ravel()],
+            "share": _fractions(
+                history.country_shares[:, site_months, :TOP_COUNTRIES]
+            ).to_numpy(),
+        }
+    )
+
+
+def _growths(values: IntArray) -> "pd.Series[object]":
+    # the relative changes from each domain's previous month, missing for its first
+    growths = np.full(values.shape, np.nan)
+    growths[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+    series = pd.Series(growths.ravel())
+    return series.astype(object).where(series.notna(), None)
+
+
+def _monthly_growth_rows(
+    history: History, months: IntArray
+) -> List[Tuple[object, ...]]:
+    # as sweb.loader aggregates the WebVisits rows, the months being consecutive rows
+    return _rows(
+        pd.Series(history.domains).repeat(len(months)),
+        _dates(history, months),
+        _growths(history.total_visits[:, months]),
+        _growths(history.category_ranks[:, months]),
+    )
+
+
+def _monthly_country_share_rows(shares: "pd.DataFrame") -> List[Tuple[object, ...]]:
+    # grouped in the order of the primary key, (date, country)
+    aggregated = shares.groupby(["date", "country"])["share"].agg(["count", "mean"])
+    return _rows(
+        aggregated.index.get_level_values("date").to_series(),
+        aggregated.index.get_level_values("country").to_series(),
+        aggregated["count"],
+        aggregated["mean"],
+    )
+
+
+def write_history_sqlite(history: History, sqlite_file: Path) -> None:
+    """Writes a History into a SQLite DB file,
+    as loading its SimilarwebSites (see history_sites) would.
+
+    The rows are inserted all at once, without normalizing any site,
+    and the aggregates are computed from the History's arrays,
+    which hold the months of each domain in order.
+
+    Args:
+        history: the History.
+        sqlite_file: SQLite file where to write the History.
+    """
+    # the rows are inserted in the order of their primary keys,
+    # with their values in the order of the tables' columns
+    site_months = np.sort(history.site_months)
+    months = np.sort(np.concatenate([site_months - back for back in (2, 1, 0)]))
+    shares = _country_shares(history, site_months)
+    engine = create_sqlite_file_db_engine(sqlite_file, "load")
+    create_tables(engine)
+    with engine.begin() as connection:
+        for model, rows in (
+            (WebVisits, _webvisits_rows(history, months, site_months)),
+            (VisitsByAge, _visits_by_age_rows(history, site_months)),
+            (CountryVisitsShare, _rows(*(shares[column] for column in shares))),
+            (MonthlyGrowth, _monthly_growth_rows(history, months)),
+            (MonthlyCountryShare, _monthly_country_share_rows(shares)),
+        ):
+            insert_many(connection, get_table(model), rows)
+    create_indexes(engine)
+    engine.dispose()
+
+
+def _texts(css_class: str) -> "re.Pattern[str]":
+    # matches the text of the elements of a class, with no child elements
+    return re.compile(rf'class="{css_class}"[^>]*>([^<]*)<')
+
+
+def _numbered(kind: str, count: int) -> Tuple[str, ...]:
+    return tuple(f"{kind}{index}" for index in range(count))
+
+
+# the patterns of the scraped values in a page, with the names of their slots,
+# and an empty name for the values kept as they are
+_SLOT_PATTERNS = (
+    (_texts("wa-overview__text wa-overview__text--date"), ("date",)),
+    (
+        _texts("engagement-list__item-value"),
+        ("total_visits", "bounce_rate", "", "avg_visit_duration"),
+    ),
+    (_texts("wa-traffic__chart-data-label"), _numbered("traffic", 3)),
+    (
+        _texts("wa-geography__country-name"),
+        _numbered("country", TOP_COUNTRIES + 1),
+    ),
+    (
+        _texts("wa-geography__country-traffic-value"),
+        _numbered("share", TOP_COUNTRIES + 1),
+    ),
+    (_texts("wa-demographics__age-data-label"), _numbered("age", len(MIN_AGES))),
+)
+_DOMAIN = _texts("wa-overview__title")
+_GLOBAL_RANK = re.compile(
+    r'wa-rank-list__item--global".*?class="wa-rank-list__value">'
+    r"<small>#</small>([^<]*)<",
+    re.DOTALL,
+)
+_CHART_HEIGHT = re.compile(r'<svg[^>]*class="highcharts-root"[^>]*height="(\d+)"')
+_Y_AXIS = re.compile(r'<g class="[^"]*highcharts-yaxis-labels".*?</g>', re.DOTALL)
+_MARKERS = re.compile(r'<g class="highcharts-markers.*?</g>', re.DOTALL)
+_LABEL = re.compile(r">([^<]*)</text>")
+_MARKER_Y = re.compile(r'd="M [\d.]+ ([\d.]+) A [\d.]+ [\d.]+ 0 1 1 [\d.]+ ([\d.]+) Z"')
+
+Slot = Tuple[int, int, str]
+
+
+def _chart_slots(page: str, start: int, end: int) -> Tuple[int, int, List[Slot]]:
+    # the height, number of y axis labels, and slots of the ranking chart
+    height = _CHART_HEIGHT.search(page, start, end)
+    y_axis = _Y_AXIS.search(page, start, end)
+    markers = _MARKERS.search(page, start, end)
+    if height is None or y_axis is None or markers is None:
+        raise ValueError("The template is missing the ranking chart")
+    labels = list(_LABEL.finditer(page, *y_axis.span()))
+    points = list(_MARKER_Y.finditer(page, *markers.span()))
+    if len(labels) < 2 or len(points) != 3:
+        raise ValueError("The template is missing the ranking chart")
+    slots = [(*label.span(1), f"label{index}") for index, label in enumerate(labels)]
+    slots.extend(
+        (*point.span(group), f"rank{index}")
+        for index, point in enumerate(points)
+        for group in (1, 2)
+    )
+    return int(height.group(1)), len(labels), slots
+
+
+class PageTemplate:
+    """A Similarweb page, whose scraped values (see sweb.parser.parse) are slots
+    to render the values of any SimilarwebSite into.
+
+    The rest of the page is kept as it is, so that the rendered pages
+    are as large and as nested as the template page.
+    """
+
+    def __init__(self, page: str) -> None:
+        """Finds the slots of the scraped values in a Similarweb page.
+
+        Args:
+            page: HTML of a Similarweb page, with all the scraped values.
+
+        Raises:
+            ValueError: if any scraped value is missing from the page.
+        """
+        domain = _DOMAIN.search(page)
+        global_rank = _GLOBAL_RANK.search(page)
+        ranking = find_section(page, "ranking")
+        if domain is None or global_rank is None or ranking is None:
+            raise ValueError("The template isn't a Similarweb page with visits")
+        self._height, self._labels, slots = _chart_slots(page, *ranking)
+        slots.extend(
+            (*match.span(), "domain")
+            for match in re.finditer(re.escape(domain.group(1)), page)
+        )
+        slots.append((*global_rank.span(1), "global_rank"))
+        for pattern, names in _SLOT_PATTERNS:
+            matches = list(pattern.finditer(page))
+            if len(matches) < len(names):
+                raise ValueError(f"The template is missing {names[0]} values")
+            slots.extend(
+                (*match.span(1), name) for match, name in zip(matches, names) if name
+            )
+        slots.sort()
+        ends = [0] + [end for _, end, _ in slots]
+        starts = [start for start, _, _ in slots] + [len(page)]
+        self._pieces = [page[end:start] for end, start in zip(ends, starts)]
+        self._slots = [name for _, _, name in slots]
+
+    def _chart_values(self, ranks: Sequence[int]) -> Dict[str, str]:
+        # places the ranks as sweb.parser reads them from the y axis labels
+        low, high = min(ranks), max(ranks)
+        high = max(high, low + 1)
+        scale = (high - low) / self._height
+        step = (high - low) / (self._labels - 1)
+        values = {
+            f"label{index}": f"{round(low + step * index):,}"
+            for index in range(self._labels)
+        }
+        values.update(
+            (f"rank{index}", repr((rank - low) / scale))
+            for index, rank in enumerate(ranks)
+        )
+        return values
+
+    def render(self, site: SimilarwebSite) -> str:
+        """Renders a SimilarwebSite into the template.
+
+        Args:
+            site: the SimilarwebSite, with 3 months of visits, 6 countries
+                  (the last being "Others") and 6 age groups.
+
+        Returns:
+            The HTML of the page, which sweb.parser parses back into site.
+        """
+        values = {
+            "domain": site.domain,
+            "date": site.date,
+            "global_rank": site.global_rank,
+            "total_visits": site.total_visits,
+            "bounce_rate": site.bounce_rate,
+            "avg_visit_duration": site.avg_visit_duration,
+            **self._chart_values(site.past_category_ranks),
+        }
+        for kind, strings in (
+            ("traffic", site.past_total_visits),
+            ("country", [country for country, _ in site.top_countries]),
+            ("share", [share for _, share in site.top_countries]),
+            ("age", site.age_distribution),
+        ):
+            values.update(
+                (f"{kind}{index}", string) for index, string in enumerate(strings)
+            )
+        escaped = {name: html.escape(value) for name, value in values.items()}
+        rendered = [self._pieces[0]]
+        for name, piece in zip(self._slots, self._pieces[1:]):
+            rendered.extend((escaped[name], piece))
+        return "".join(rendered)
+
+    @classmethod
+    def from_file(cls, html_file: Path) -> "PageTemplate":
+        """Makes a template out of a Similarweb page file.
+
+        Args:
+            html_file: the file of the Similarweb page.
+
+        Returns:
+            The template of the page.
+        """
+        return cls(html_file.read_text())
+
+
+def write_pages(
+    sites: Iterable[SimilarwebSite], html_dir: Path, template: PageTemplate
+) -> None:
+    """Writes the Similarweb pages of SimilarwebSites into HTML files.
+
+    The files are named after the sites domains and dates.
+
+    Args:
+        sites: the SimilarwebSites.
+        html_dir: directory where to write the pages.
+        template: template of the pages.
+    """
+    html_dir.mkdir(parents=True, exist_ok=True)
+    for site in sites:
+        name = f"{site.domain} {site.date}".replace(".", "-").replace(" ", "-")
+        html_file = html_dir / f"similarweb-{name.lower()}.html"
+        html_file.write_text(template.render(site))
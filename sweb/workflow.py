@@ -1,48 +1,416 @@
-"""Provide the command line interface prototype_python_library."""
+"""Provide the command line interface prototype_python_library.
+
+The modules of each stage, and their heavy dependencies (parsel, SQLModel,
+pandas, plotly), are imported when the stage runs,
+so that running a stage doesn't pay for importing the others.
+"""
+# pylint: disable=import-outside-toplevel
+import argparse
+import contextlib
+import csv
+import dataclasses
 import logging
+import multiprocessing
 import os
+import queue
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice, tee
 from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-import pandas as pd
-import parsel.selector
+from sweb.metrics import METRICS, Timing
+from sweb.profiling import PROFILER, STAGES, parse_stages
+from sweb.site import SimilarwebSite, encode_site, has_visits
+from sweb.sources import HtmlSource, find_sources, read_source
 
-from sweb.analyser import (
-    get_ranks_growth,
-    get_visits_growth,
-    plot_rank,
-    plot_timeseries,
-    rank_websites,
-)
-from sweb.loader import load_csv_into_sqlite
-from sweb.parser import parse
+if TYPE_CHECKING:  # pragma: no cover
+    import plotly.graph_objects as go
+
+    from sweb.cache import CacheLookup, ExtractionCache
 
 LOGGER = logging.getLogger(__name__)
 
+QUEUE_SIZE = 1000
+
+# sites loaded at once, in bulk, as by default in sweb.loader
+BATCH_SIZE = 1000
+
+# formats of the file of the extracted sites, where none writes no file
+INTERMEDIATES = ("csv", "parquet", "none")
+
+# loaders of the extracted sites, normalizing a site at a time or a batch at once
+LOADERS = ("site", "bulk")
+
+
+def parse_html_file(source: HtmlSource, engine: str = "dom") -> SimilarwebSite:
+    """Parse a Similarweb site page HTML file.
+
+    Args:
+        source: the HTML page to parse, plain or compressed (see sweb.sources).
+        engine: name of the parser engine to use (see sweb.parser.ENGINES).
+
+    Returns:
+        The SimilarwebSite scraped from the source.
+    """
+    from sweb.parser import ENGINES
+
+    with METRICS.measure("extract.read", items=1):
+        html = read_source(source)
+    return ENGINES[engine](html)
+
+
+def _parse_chunk(
+    chunk: List[HtmlSource], engine: str
+) -> Tuple[List[SimilarwebSite], Dict[str, Timing]]:
+    # returns the timings with the sites, to merge the ones of worker processes
+    with METRICS.collect() as timings:
+        sites = [parse_html_file(source, engine) for source in chunk]
+    return sites, timings
+
+
+def _parse_html_files(
+    sources: Iterable[HtmlSource],
+    workers: int,
+    chunksize: int,
+    engine: str,
+) -> Iterator[SimilarwebSite]:
+    sources = iter(sources)
+    if workers <= 1:
+        while chunk := list(islice(sources, chunksize)):
+            yield from _merge_timings(*_parse_chunk(chunk, engine))
+        return
+    # the workers are started by a fork server, since forking the pipeline's
+    # process could copy a lock held by its loader thread, and deadlock
+    context = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        # submits a bounded window of chunks, so that only a few pages are in memory
+        chunks: "deque[Future[Tuple[List[SimilarwebSite], Dict[str, Timing]]]]"
+        chunks = deque()
+        while chunk := list(islice(sources, chunksize)):
+            chunks.append(executor.submit(_parse_chunk, chunk, engine))
+            if len(chunks) > 2 * workers:
+                yield from _merge_timings(*chunks.popleft().result())
+        while chunks:
+            yield from _merge_timings(*chunks.popleft().result())
+
+
+def _merge_timings(
+    sites: List[SimilarwebSite], timings: Dict[str, Timing]
+) -> List[SimilarwebSite]:
+    METRICS.merge(timings)
+    return sites
+
+
+def _lookup(
+    sources: Iterable[HtmlSource], cache: "ExtractionCache"
+) -> Iterator[Tuple[HtmlSource, "CacheLookup"]]:
+    for source in sources:
+        with METRICS.measure("extract.lookup", items=1):
+            lookup = cache.lookup(source)
+        yield source, lookup
+
+
+def _merge_cached(
+    lookups: Iterable[Tuple[HtmlSource, "CacheLookup"]],
+    parsed_sites: Iterator[SimilarwebSite],
+    cache: "ExtractionCache",
+) -> Iterator[SimilarwebSite]:
+    # gets the cached sites only here, so that the parsing read-ahead holds sources
+    for source, (digest, cached) in lookups:
+        if cached:
+            yield cache.get(digest)
+        else:
+            # there's a parsed site for every miss
+            # pylint: disable-next=stop-iteration-return
+            site = next(parsed_sites)
+            cache.put(source, site, digest)
+            yield site
+
+
+def extract_sites(  # pylint: disable=too-many-arguments
+    html_dir: Path,
+    workers: int = 1,
+    chunksize: int = 1,
+    engine: str = "dom",
+    cache: Optional["ExtractionCache"] = None,
+) -> Iterator[SimilarwebSite]:
+    """Parse a collection of Similarweb site page HTML files.
+
+    The pages are read from HTML files, compressed or not,
+    and from archives of them (see sweb.sources.find_sources),
+    decompressing them in memory.
+
+    With more than one worker, the pages are parsed by a pool of processes.
+    Either way, the sites are yielded in the order of the sources.
+
+    With a cache, only the pages missing from it are parsed,
+    and the sites parsed from them are added to it.
+
+    Args:
+        html_dir: Path to the directory containing the HTML files to parse.
+        workers: number of processes parsing the HTML files.
+        chunksize: number of HTML files sent to a worker process at once.
+        engine: name of the parser engine to use (see sweb.parser.ENGINES).
+        cache: cache of the sites parsed from the HTML files.
+
+    Yields:
+        The SimilarwebSites scraped from the HTML files.
+    """
+    sources = find_sources(html_dir)
+    if cache is None:
+        yield from METRICS.count(
+            "extract", _parse_html_files(sources, workers, chunksize, engine)
+        )
+        return
+    # only the misses are parsed, the cached sites are merged in order here
+    misses, lookups = tee(_lookup(sources, cache))
+    parsed_sites = _parse_html_files(
+        (source for source, (_, cached) in misses if not cached),
+        workers,
+        chunksize,
+        engine,
+    )
+    yield from METRICS.count("extract", _merge_cached(lookups, parsed_sites, cache))
+
+
+def write_csv(
+    sites: Iterable[SimilarwebSite], csv_file: Path, flush_every: int = 100
+) -> None:
+    """Write SimilarwebSites into a csv file, as they come.
+
+    Each site is written as soon as it's available, and the file is flushed every
+    flush_every sites, so a partially written csv is still a valid csv.
+    The series fields are encoded in JSON (see sweb.site.encode_site).
+
+    Args:
+        sites: SimilarwebSites to write.
+        csv_file: Path to the csv file where to write the sites.
+        flush_every: number of sites written between flushes.
+    """
+    columns = [site_field.name for site_field in dataclasses.fields(SimilarwebSite)]
+    with csv_file.open("w", newline="") as csv_stream:
+        writer = csv.DictWriter(csv_stream, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        for count, site in enumerate(sites, start=1):
+            writer.writerow(encode_site(site))
+            if count % flush_every == 0:
+                csv_stream.flush()
+
+
+def write_sites(sites: Iterable[SimilarwebSite], sites_file: Path) -> None:
+    """Write SimilarwebSites into a csv file, or a Parquet file.
+
+    Parquet files are told apart by their .parquet suffix,
+    and require the optional dependency pyarrow.
+    They only hold the normalized values of the sites with visits stats,
+    a row group per batch of normalized sites (see sweb.columnar).
+
+    Args:
+        sites: SimilarwebSites to write.
+        sites_file: Path to the file where to write the sites.
+    """
+    if sites_file.suffix == ".parquet":
+        # pylint: disable-next=import-outside-toplevel
+        from sweb.columnar import write_parquet
+        from sweb.loader import normalize_batches
+
+        write_parquet(normalize_batches(filter(has_visits, sites)), sites_file)
+    else:
+        write_csv(sites, sites_file)
 
-def extract_csv(html_dir: Path, csv_file: Path) -> None:
+
+def extract_csv(  # pylint: disable=too-many-arguments
+    html_dir: Path,
+    csv_file: Path,
+    workers: int = 1,
+    chunksize: int = 1,
+    engine: str = "dom",
+    cache: Optional["ExtractionCache"] = None,
+) -> None:
     """Parse a collection of Similarweb site page HTML files and export it into a csv.
 
     Args:
         html_dir: Path to the directory containing the HTML files to parse.
         csv_file: Path to the csv file where to write the parsed content.
+        workers: number of processes parsing the HTML files.
+        chunksize: number of HTML files sent to a worker process at once.
+        engine: name of the parser engine to use (see sweb.parser.ENGINES).
+        cache: cache of the sites parsed from the HTML files.
+    """
+    with METRICS.measure("extract"), PROFILER.profile("extract"):
+        write_csv(extract_sites(html_dir, workers, chunksize, engine, cache), csv_file)
+
+
+def extract_parquet(  # pylint: disable=too-many-arguments
+    html_dir: Path,
+    parquet_file: Path,
+    workers: int = 1,
+    chunksize: int = 1,
+    engine: str = "dom",
+    cache: Optional["ExtractionCache"] = None,
+) -> None:
+    """Parse a collection of Similarweb site page HTML files into a Parquet file.
+
+    The file holds the normalized values of the sites (see sweb.columnar),
+    and requires the optional dependency pyarrow.
+
+    Args:
+        html_dir: Path to the directory containing the HTML files to parse.
+        parquet_file: Path to the Parquet file where to write the parsed content.
+        workers: number of processes parsing the HTML files.
+        chunksize: number of HTML files sent to a worker process at once.
+        engine: name of the parser engine to use (see sweb.parser.ENGINES).
+        cache: cache of the sites parsed from the HTML files.
     """
-    items = []
-    for html_file in html_dir.glob("*.html"):
-        dom = parsel.selector.Selector(text=html_file.read_text())
-        similarweb_item = parse(dom)
-        items.append(vars(similarweb_item))
-    pd.DataFrame(items).to_csv(csv_file, index=False)
+    with METRICS.measure("extract"), PROFILER.profile("extract"):
+        write_sites(
+            extract_sites(html_dir, workers, chunksize, engine, cache), parquet_file
+        )
 
 
-def load_sqlite(csv_file: Path, sqlite_file: Path) -> None:
+def load_sqlite(
+    csv_file: Path,
+    sqlite_file: Path,
+    bulk: bool = False,
+    batch_size: int = BATCH_SIZE,
+    incremental: bool = False,
+) -> None:
     """Loads a collection of SimilarwebSite from a csv
     into the appropriate normalized tables in a SQLite DB.
 
     Args:
-        csv_file: Path to the csv file with the content to load.
+        csv_file: Path to the csv (or Parquet) file with the content to load.
+        sqlite_file: Path to the sqlite file where to load the content.
+        bulk: flag to insert the rows with batched executemany calls,
+              instead of normalizing one site at a time.
+        batch_size: number of sites loaded at once, in bulk.
+        incremental: flag to upsert the rows into the existing ones, in bulk.
+    """
+    from sweb.loader import bulk_load_csv_into_sqlite, load_csv_into_sqlite
+
+    with METRICS.measure("load"), PROFILER.profile("load"):
+        if bulk or incremental:
+            bulk_load_csv_into_sqlite(csv_file, sqlite_file, batch_size, incremental)
+        else:
+            load_csv_into_sqlite(csv_file, sqlite_file)
+
+
+def _measure_load(
+    sites: Iterable[SimilarwebSite],
+    sqlite_file: Path,
+    batch_size: int,
+    incremental: bool,
+) -> None:
+    from sweb.loader import bulk_load_into_sqlite
+
+    with METRICS.measure("load"), PROFILER.profile("load"):
+        bulk_load_into_sqlite(sites, sqlite_file, batch_size, incremental)
+
+
+def _iter_queue(
+    sites_queue: "queue.Queue[Optional[SimilarwebSite]]",
+) -> Iterator[SimilarwebSite]:
+    while (site := sites_queue.get()) is not None:
+        if has_visits(site):
+            yield site
+
+
+def _put(
+    sites_queue: "queue.Queue[Optional[SimilarwebSite]]",
+    site: Optional[SimilarwebSite],
+    loading: "Future[None]",
+) -> None:
+    # gives up waiting for room in the queue if the loading fails
+    while not loading.done():
+        try:
+            sites_queue.put(site, timeout=1)
+            return
+        except queue.Full:
+            pass
+    loading.result()
+
+
+def _enqueue(
+    sites: Iterable[SimilarwebSite],
+    sites_queue: "queue.Queue[Optional[SimilarwebSite]]",
+    loading: "Future[None]",
+) -> Iterator[SimilarwebSite]:
+    for site in sites:
+        _put(sites_queue, site, loading)
+        yield site
+
+
+def extract_load_sqlite(  # pylint: disable=too-many-arguments
+    html_dir: Path,
+    sqlite_file: Path,
+    sites_file: Optional[Path] = None,
+    workers: int = 1,
+    chunksize: int = 1,
+    engine: str = "dom",
+    batch_size: int = BATCH_SIZE,
+    incremental: bool = False,
+    cache: Optional["ExtractionCache"] = None,
+) -> None:
+    """Parse a collection of Similarweb site page HTML files straight into SQLite.
+
+    The parsed sites flow through a bounded queue into a thread loading them
+    in bulk, so that parsing and loading overlap,
+    instead of loading only after extracting everything into a file.
+    The extract and load stages are measured (see sweb.metrics) as they overlap,
+    but only one of them can be profiled (see sweb.profiling).
+
+    Args:
+        html_dir: Path to the directory containing the HTML files to parse.
         sqlite_file: Path to the sqlite file where to load the content.
+        sites_file: Path to a csv (or Parquet) file where to also write the sites.
+        workers: number of processes parsing the HTML files.
+        chunksize: number of HTML files sent to a worker process at once.
+        engine: name of the parser engine to use (see sweb.parser.ENGINES).
+        batch_size: number of sites loaded at once.
+        incremental: flag to upsert the rows into the existing ones.
+        cache: cache of the sites parsed from the HTML files.
+
+    Raises:
+        ValueError: if both the extract and load stages are profiled.
     """
-    load_csv_into_sqlite(csv_file, sqlite_file)
+    if {"extract", "load"}.issubset(PROFILER.stages):
+        raise ValueError(
+            "Can't profile both the extract and load stages while they overlap,"
+            " profile only one of them!"
+        )
+    sites_queue: "queue.Queue[Optional[SimilarwebSite]]" = queue.Queue(QUEUE_SIZE)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        loading = executor.submit(
+            _measure_load,
+            _iter_queue(sites_queue),
+            sqlite_file,
+            batch_size,
+            incremental,
+        )
+        try:
+            sites = _enqueue(
+                extract_sites(html_dir, workers, chunksize, engine, cache),
+                sites_queue,
+                loading,
+            )
+            with METRICS.measure("extract"), PROFILER.profile("extract"):
+                if sites_file is None:
+                    deque(sites, maxlen=0)
+                else:
+                    write_sites(sites, sites_file)
+        finally:
+            _put(sites_queue, None, loading)
+        loading.result()
 
 
 def analyse_visits_growth(sqlite_file: Path, chart_file: Path) -> None:
@@ -52,6 +420,8 @@ def analyse_visits_growth(sqlite_file: Path, chart_file: Path) -> None:
         sqlite_file: Path to the sqlite file where to query the visits.
         chart_file: Path to the jpeg file where to output the chart.
     """
+    from sweb.analyser import get_visits_growth, plot_timeseries
+
     visits = get_visits_growth(sqlite_file)
     plot_timeseries(visits, chart_file, "Total visits", "visits")
 
@@ -63,6 +433,8 @@ def analyse_ranks_growth(sqlite_file: Path, chart_file: Path) -> None:
         sqlite_file: Path to the sqlite file where to query the visits.
         chart_file: Path to the jpeg file where to output the chart.
     """
+    from sweb.analyser import get_ranks_growth, plot_timeseries
+
     ranks = get_ranks_growth(sqlite_file)
     plot_timeseries(ranks, chart_file, "Category ranks", "rank", reversed_y=True)
 
@@ -74,41 +446,407 @@ def rank(sqlite_file: Path, chart_file: Path) -> None:
         sqlite_file: Path to the sqlite file where to query the visits.
         chart_file: Path to the jpeg file where to output the chart.
     """
+    from sweb.analyser import plot_rank, rank_websites
+
     websites_rank = rank_websites(sqlite_file)
     plot_rank(websites_rank, chart_file, title="Websites rank")
 
 
+def analyse(  # pylint: disable=too-many-arguments,too-many-locals
+    sqlite_file: Path,
+    visits_growth_chart_file: Path,
+    ranks_growth_chart_file: Path,
+    websites_rank_chart_file: Path,
+    renderers: int = 1,
+    domain_charts_dir: Optional[Path] = None,
+) -> None:
+    """Plots all the analysis charts, querying the visits only once.
+
+    The timeseries are downsampled to bound the charts size
+    (see sweb.charts.downsample), and the charts are exported concurrently,
+    in the format of each file suffix (see sweb.charts.FORMATS).
+
+    Args:
+        sqlite_file: Path to the sqlite file where to query the visits.
+        visits_growth_chart_file: Path to the file where to plot visits growth.
+        ranks_growth_chart_file: Path to the file where to plot ranks growth.
+        websites_rank_chart_file: Path to the file where to plot websites rank.
+        renderers: number of charts exported concurrently.
+        domain_charts_dir: Path to the directory where to also plot the visits
+                           growth of each domain, or None to skip them.
+    """
+    from sweb.analyser import WebVisitsAnalysis, rank_figure, timeseries_figure
+    from sweb.charts import downsample, export_timeseries_charts
+
+    with METRICS.measure("analyse") as analysed, PROFILER.profile("analyse"):
+        with METRICS.measure("analyse.query") as query:
+            analysis = WebVisitsAnalysis.from_sqlite(sqlite_file)
+            query.items = int(analysis.frame.count().sum())
+        with METRICS.measure("analyse.growth", items=2):
+            visits = analysis.visits_growth()
+            ranks = analysis.ranks_growth()
+        with METRICS.measure("analyse.rank") as ranking:
+            websites_rank = analysis.rank_websites()
+            ranking.items = analysed.items = len(websites_rank)
+        with METRICS.measure("analyse.plot", items=3):
+            _plot(
+                [
+                    (
+                        timeseries_figure(downsample(visits), "Total visits", "visits"),
+                        visits_growth_chart_file,
+                    ),
+                    (
+                        timeseries_figure(
+                            downsample(ranks, others="median", ascending=True),
+                            "Category ranks",
+                            "rank",
+                            reversed_y=True,
+                        ),
+                        ranks_growth_chart_file,
+                    ),
+                    (
+                        rank_figure(websites_rank, "Websites rank"),
+                        websites_rank_chart_file,
+                    ),
+                ],
+                renderers,
+            )
+        if domain_charts_dir is not None:
+            LOGGER.info(
+                "Plotting each website visits growth into %s", domain_charts_dir
+            )
+            chart_format = visits_growth_chart_file.suffix[1:]
+            with METRICS.measure("analyse.domain_charts", items=len(visits.columns)):
+                export_timeseries_charts(
+                    visits, domain_charts_dir, chart_format, workers=renderers
+                )
+
+
+def _plot(charts: List[Tuple["go.Figure", Path]], renderers: int) -> None:
+    from sweb.charts import ChartExporter
+
+    LOGGER.info(
+        "Plotting websites visits growth, category rank growth and rank into %s",
+        ", ".join(chart_file.as_posix() for _, chart_file in charts),
+    )
+    with ChartExporter(renderers) as exporter:
+        exporter.export(charts)
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:  # pylint: disable=too-many-instance-attributes
+    """The workflow settings, read from the environment variables (see run)."""
+
+    html_dir: Path
+    results_dir: Path
+    workers: int
+    chunksize: int
+    engine: str
+    bulk: bool
+    batch_size: int
+    incremental: bool
+    intermediate: str
+    pipeline: bool
+    cache_file: str
+    cache_size: Optional[int]
+    chart_format: str
+    renderers: int
+    domain_charts: bool
+    metrics_file: Path
+    profiled: Sequence[str]
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Reads the settings from the environment variables.
+
+        A ValueError is raised if SWEB_LOADER isn't one of LOADERS,
+        or SWEB_INTERMEDIATE one of INTERMEDIATES
+        (the settings of each stage are checked by check).
+
+        Returns:
+            The settings, with the default of each missing variable.
+        """
+        results_dir = Path(os.environ.get("RESULTS_DIR", default="./results"))
+        cache_size = os.environ.get("SWEB_CACHE_SIZE")
+        loader = os.environ.get("SWEB_LOADER", default="site")
+        intermediate = os.environ.get("SWEB_INTERMEDIATE", default="csv")
+        _check_choice("SWEB_LOADER", loader, LOADERS)
+        _check_choice("SWEB_INTERMEDIATE", intermediate, INTERMEDIATES)
+        return cls(
+            html_dir=Path(os.environ.get("HTML_DIR", default="./source_html")),
+            results_dir=results_dir,
+            workers=int(os.environ.get("SWEB_WORKERS", default="1")),
+            chunksize=int(os.environ.get("SWEB_CHUNKSIZE", default="1")),
+            engine=os.environ.get("SWEB_PARSER", default="dom"),
+            bulk=loader == "bulk",
+            batch_size=int(os.environ.get("SWEB_BATCH_SIZE", default=str(BATCH_SIZE))),
+            incremental=os.environ.get("SWEB_INCREMENTAL", default="0") == "1",
+            intermediate=intermediate,
+            pipeline=os.environ.get("SWEB_PIPELINE", default="0") == "1",
+            cache_file=os.environ.get("SWEB_CACHE", default=""),
+            cache_size=None if cache_size is None else int(cache_size),
+            chart_format=os.environ.get("SWEB_CHART_FORMAT", default="jpg"),
+            renderers=int(os.environ.get("SWEB_RENDERERS", default="1")),
+            domain_charts=os.environ.get("SWEB_DOMAIN_CHARTS", default="0") == "1",
+            metrics_file=Path(
+                os.environ.get(
+                    "SWEB_METRICS", default=str(results_dir / "metrics.json")
+                )
+            ),
+            profiled=sorted(parse_stages(os.environ.get("SWEB_PROFILE", default=""))),
+        )
+
+    def check(self, stages: Sequence[str]) -> None:
+        """Checks the settings of the stages to run, before running any.
+
+        The parser engine and the charts format are only checked when the stages
+        using them run, since checking them imports their modules.
+
+        Args:
+            stages: names of the stages to run (see sweb.profiling.STAGES).
+
+        Raises:
+            ValueError: if SWEB_PARSER isn't one of sweb.parser.ENGINES,
+                        or SWEB_CHART_FORMAT one of sweb.charts.FORMATS,
+                        or SWEB_INTERMEDIATE is none while the load stage runs
+                        apart, since it reads the extracted sites file.
+        """
+        if "extract" in stages:
+            from sweb.parser import ENGINES
+
+            _check_choice("SWEB_PARSER", self.engine, ENGINES)
+        if "analyse" in stages:
+            from sweb.charts import FORMATS
+
+            _check_choice("SWEB_CHART_FORMAT", self.chart_format, FORMATS)
+        if (
+            "load" in stages
+            and not self.pipelined(stages)
+            and self.intermediate == "none"
+        ):
+            raise ValueError("SWEB_INTERMEDIATE=none requires SWEB_PIPELINE=1!")
+
+    def pipelined(self, stages: Sequence[str]) -> bool:
+        """Whether the extract and load stages run at once (see run_extract_load).
+
+        Args:
+            stages: names of the stages to run (see sweb.profiling.STAGES).
+
+        Returns:
+            True if SWEB_PIPELINE=1 and both stages run, False otherwise.
+        """
+        return self.pipeline and {"extract", "load"}.issubset(stages)
+
+    @property
+    def sites_file(self) -> Path:
+        """File between the extract and load stages.
+
+        Returns:
+            The csv (or Parquet) file in the results.
+        """
+        return self.results_dir / f"webvisits.{self.intermediate}"
+
+    @property
+    def sqlite_file(self) -> Path:
+        """DB where the sites are loaded.
+
+        Returns:
+            The SQLite file in the results.
+        """
+        return self.results_dir / "webvisits.db"
+
+    def chart_file(self, name: str) -> Path:
+        """File of a chart.
+
+        Args:
+            name: name of the chart.
+
+        Returns:
+            The file in the results, in the charts format.
+        """
+        return self.results_dir / f"{name}.{self.chart_format}"
+
+
+def _check_choice(name: str, value: str, choices: Iterable[str]) -> None:
+    # raises the error of an environment variable whose value isn't a choice
+    if value not in choices:
+        raise ValueError(
+            f"Unknown {name} {value!r}, expected one of {', '.join(choices)}!"
+        )
+
+
+@contextlib.contextmanager
+def _open_cache(settings: Settings) -> Iterator[Optional["ExtractionCache"]]:
+    if not settings.cache_file:
+        yield None
+        return
+    from sweb.cache import MAX_ENTRIES, ExtractionCache
+
+    cache_size = MAX_ENTRIES if settings.cache_size is None else settings.cache_size
+    with ExtractionCache(Path(settings.cache_file), cache_size) as cache:
+        yield cache
+
+
+def _reset_db(settings: Settings) -> None:
+    if settings.sqlite_file.exists() and not settings.incremental:
+        LOGGER.info("Deleting %s", settings.sqlite_file)
+        settings.sqlite_file.unlink()
+
+
+def run_extract(settings: Settings) -> None:
+    """Runs the extract stage, from the HTML files into the csv (or Parquet) file.
+
+    Args:
+        settings: the workflow settings.
+    """
+    LOGGER.info("Extracting website visits into %s", settings.sites_file)
+    extract = extract_parquet if settings.intermediate == "parquet" else extract_csv
+    with _open_cache(settings) as cache:
+        extract(
+            settings.html_dir,
+            settings.sites_file,
+            settings.workers,
+            settings.chunksize,
+            settings.engine,
+            cache,
+        )
+
+
+def run_load(settings: Settings) -> None:
+    """Runs the load stage, from the csv (or Parquet) file into the DB.
+
+    Args:
+        settings: the workflow settings.
+    """
+    _reset_db(settings)
+    LOGGER.info(
+        "Loading %s into SQLite file %s", settings.sites_file, settings.sqlite_file
+    )
+    load_sqlite(
+        settings.sites_file,
+        settings.sqlite_file,
+        settings.bulk,
+        settings.batch_size,
+        settings.incremental,
+    )
+
+
+def run_extract_load(settings: Settings) -> None:
+    """Runs the extract and load stages at once, from the HTML files into the DB.
+
+    Args:
+        settings: the workflow settings.
+    """
+    _reset_db(settings)
+    LOGGER.info("Extracting website visits into %s", settings.sqlite_file)
+    with _open_cache(settings) as cache:
+        extract_load_sqlite(
+            settings.html_dir,
+            settings.sqlite_file,
+            None if settings.intermediate == "none" else settings.sites_file,
+            settings.workers,
+            settings.chunksize,
+            settings.engine,
+            settings.batch_size,
+            settings.incremental,
+            cache,
+        )
+
+
+def run_analyse(settings: Settings) -> None:
+    """Runs the analyse stage, from the DB into the charts.
+
+    Args:
+        settings: the workflow settings.
+    """
+    analyse(
+        settings.sqlite_file,
+        settings.chart_file("visits_growth"),
+        settings.chart_file("ranks_growth"),
+        settings.chart_file("websites_rank"),
+        settings.renderers,
+        settings.results_dir / "domains" if settings.domain_charts else None,
+    )
+
+
+def run_stages(stages: Sequence[str]) -> None:
+    """Runs workflow stages, with the settings of the environment variables.
+
+    Args:
+        stages: names of the stages to run (see sweb.profiling.STAGES),
+                in the workflow order.
+    """
+    logging.basicConfig(level=logging.INFO)
+    settings = Settings.from_env()
+    settings.check(stages)
+    settings.results_dir.mkdir(parents=True, exist_ok=True)
+    METRICS.reset()
+    PROFILER.configure(settings.profiled, settings.results_dir)
+    if settings.pipelined(stages):
+        run_extract_load(settings)
+    else:
+        if "extract" in stages:
+            run_extract(settings)
+        if "load" in stages:
+            run_load(settings)
+    if "analyse" in stages:
+        run_analyse(settings)
+    LOGGER.info("Reporting the stages metrics into %s", settings.metrics_file)
+    METRICS.write_json(settings.metrics_file)
+    LOGGER.info("Done!")
+
+
 def run() -> None:
     """Run entire workflow:
-    1. extract data from HTML files into a csv file
+    1. extract data from HTML files into a csv (or Parquet) file
     2. load csv's data into a SQLite database file
     3. plot analysis charts:
         - visits growth
         - category ranks growth
         - websites rank
+
+    The environment variables SWEB_WORKERS and SWEB_CHUNKSIZE set the number of
+    processes parsing the HTML files, and how many files each one takes at once.
+    SWEB_PARSER selects the parser engine (see sweb.parser.ENGINES).
+    SWEB_LOADER selects how to load the csv into the DB, either normalizing
+    one site at a time ("site") or a batch per column ("bulk"),
+    and SWEB_BATCH_SIZE the size of the bulk batches.
+    With SWEB_INCREMENTAL=1, the existing DB is kept and the csv upserted into it.
+    With SWEB_INTERMEDIATE=parquet, the data is extracted into a Parquet file
+    instead of a csv.
+    With SWEB_PIPELINE=1, the extracted data is loaded in bulk while extracting,
+    and the csv (or Parquet) file is only a side output,
+    which SWEB_INTERMEDIATE=none skips.
+    SWEB_CACHE sets the file where to cache the sites parsed from the HTML files,
+    which SWEB_CACHE_SIZE bounds to a number of sites.
+    SWEB_CHART_FORMAT sets the format of the charts (see sweb.charts.FORMATS),
+    and SWEB_RENDERERS the number of charts exported concurrently.
+    With SWEB_DOMAIN_CHARTS=1, the visits growth of each website is also plotted,
+    into the domains directory of the results.
+    The time, memory and throughput of each stage (see sweb.metrics) are reported
+    into the JSON file SWEB_METRICS, metrics.json in the results by default.
+    SWEB_PROFILE selects the stages to profile (see sweb.profiling),
+    whose profiles are written into the results.
     """
-    logging.basicConfig(level=logging.INFO)
-    source_html_dir = Path(os.environ.get("HTML_DIR", default="./source_html"))
-    results_path = Path(os.environ.get("RESULTS_DIR", default="./results"))
-    csv_file = results_path / "webvisits.csv"
-    sqlite_file = results_path / "webvisits.db"
-    visits_growth_chart_file = results_path / "visits_growth.jpg"
-    ranks_growth_chart_file = results_path / "ranks_growth.jpg"
-    websites_rank_chart_file = results_path / "websites_rank.jpg"
-    results_path.mkdir(parents=True, exist_ok=True)
-    LOGGER.info("Extracting website visits into csv %s", csv_file)
-    extract_csv(source_html_dir, csv_file)
-    if sqlite_file.exists():
-        LOGGER.info("Deleting %s", sqlite_file)
-        sqlite_file.unlink()
-    LOGGER.info("Loading csv's data into SQLite database file %s", sqlite_file)
-    load_sqlite(csv_file, sqlite_file)
-    LOGGER.info("Plotting websites visits growth into %s", visits_growth_chart_file)
-    analyse_visits_growth(sqlite_file, visits_growth_chart_file)
-    LOGGER.info(
-        "Plotting websites category rank growth into %s", ranks_growth_chart_file
+    run_stages(STAGES)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Runs the workflow, or one of its stages, from the command line.
+
+    Args:
+        argv: the command line arguments, or None for sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sweb",
+        description="Runs the sweb workflow, configured by environment variables.",
     )
-    analyse_ranks_growth(sqlite_file, ranks_growth_chart_file)
-    LOGGER.info("Plotting websites rank into %s", websites_rank_chart_file)
-    rank(sqlite_file, websites_rank_chart_file)
-    LOGGER.info("Done!")
+    subparsers = parser.add_subparsers(dest="stage", title="stages")
+    subparsers.add_parser("extract", help="extract the HTML files into a csv file")
+    subparsers.add_parser("load", help="load the csv file into a SQLite DB")
+    subparsers.add_parser("analyse", help="plot the charts of the SQLite DB")
+    args = parser.parse_args(argv)
+    if args.stage is None:
+        run()
+    else:
+        run_stages([args.stage])
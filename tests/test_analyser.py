@@ -1,15 +1,79 @@
 """Tests analysing similaerwebsites data."""
+import datetime
+import warnings
 from pathlib import Path
+from typing import Dict, Optional, Sequence
 
 import pandas as pd
 
 from sweb.analyser import (
+    VisitsFilter,
+    WebVisitsAnalysis,
     get_ranks_growth,
     get_visits_growth,
     plot_rank,
     plot_timeseries,
     rank_websites,
 )
+from sweb.loader import (
+    create_sqlite_file_db_engine,
+    create_tables,
+    get_table,
+    load_csv_into_sqlite,
+    update_aggregates,
+)
+from sweb.model import WebVisits
+
+MONTHS = (
+    datetime.date(2022, 1, 31),
+    datetime.date(2022, 2, 28),
+    datetime.date(2022, 3, 31),
+)
+
+# the total visits of each domain in MONTHS, None for a month missing
+GAPPED_VISITS: Dict[str, Sequence[Optional[int]]] = {
+    "a.com": (100, 100, 100),
+    "b.com": (100, None, 300),
+    "c.com": (100, 110, 110),
+}
+
+
+def write_visits(
+    sqlite_file: Path,
+    visits: Dict[str, Sequence[Optional[int]]],
+    aggregate: bool = False,
+) -> None:
+    """Writes the total visits of domains into a DB, with a constant rank.
+
+    Args:
+        sqlite_file: the SQLite DB.
+        visits: the total visits of each domain in MONTHS.
+        aggregate: flag to also write the aggregates of the visits.
+    """
+    engine = create_sqlite_file_db_engine(sqlite_file)
+    table = get_table(WebVisits)
+    if aggregate:
+        create_tables(engine)
+    else:
+        table.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            table.insert(),
+            [
+                {
+                    "domain": domain,
+                    "date": date,
+                    "total_visits": total_visits,
+                    "category_rank": 10,
+                }
+                for domain, domain_visits in visits.items()
+                for date, total_visits in zip(MONTHS, domain_visits)
+                if total_visits is not None
+            ],
+        )
+        if aggregate:
+            update_aggregates(connection)
+    engine.dispose()
 
 
 def test_get_visits_growth(sqlite_file: Path) -> None:
@@ -71,6 +135,126 @@ def test_rank_websites(sqlite_file: Path) -> None:
     assert rank.equals(expected_rank)
 
 
+def test_rank_websites_with_missing_months(tmp_path: Path) -> None:
+    """Test ranking websites measuring their growth across missing months.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    sqlite_file = tmp_path / "gapped.db"
+    write_visits(sqlite_file, GAPPED_VISITS)
+    expected_rank = pd.Series([0.95, 0.05, 0.0], index=["b.com", "c.com", "a.com"])
+    assert rank_websites(sqlite_file).equals(expected_rank)
+
+
+def test_rank_websites_from_aggregates_or_frame(tmp_path: Path) -> None:
+    """Test ranking websites the same from the aggregates and from the frame.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    sqlite_file = tmp_path / "gapped.db"
+    write_visits(sqlite_file, {**GAPPED_VISITS, "d.com": (200, 100, 150)}, True)
+    visits_filters = (
+        VisitsFilter(),
+        VisitsFilter(start=datetime.date(2022, 2, 1)),
+        VisitsFilter(end=datetime.date(2022, 2, 28)),
+        VisitsFilter(start=datetime.date(2022, 2, 1), domains=["b.com", "d.com"]),
+    )
+    for visits_filter in visits_filters:
+        analysis = WebVisitsAnalysis.from_sqlite(
+            sqlite_file, visits_filter=visits_filter
+        )
+        assert analysis.growth is not None
+        rank = WebVisitsAnalysis(analysis.frame).rank_websites()
+        assert analysis.rank_websites().equals(rank)
+    recent = VisitsFilter(start=datetime.date(2022, 2, 1))
+    analysis = WebVisitsAnalysis.from_sqlite(sqlite_file, visits_filter=recent)
+    assert analysis.rank_websites().index[0] == "d.com"
+
+
+def test_webvisits_analysis(sqlite_file: Path) -> None:
+    """Test analysing the timeseries loaded at once from the DB.
+
+    Args:
+        sqlite_file: SQLite DB file for testing.
+    """
+    analysis = WebVisitsAnalysis.from_sqlite(sqlite_file)
+    assert analysis.frame.shape == (3, 8)
+    assert analysis.visits_growth().equals(get_visits_growth(sqlite_file))
+    assert analysis.ranks_growth().equals(get_ranks_growth(sqlite_file))
+    assert analysis.rank_websites().equals(rank_websites(sqlite_file))
+
+
+def test_webvisits_analysis_with_filter(sqlite_file: Path) -> None:
+    """Test loading only the timeseries selected by a filter.
+
+    Args:
+        sqlite_file: SQLite DB file for testing.
+    """
+
+    def load(visits_filter: VisitsFilter) -> pd.DataFrame:
+        analysis = WebVisitsAnalysis.from_sqlite(
+            sqlite_file, ("total_visits",), visits_filter
+        )
+        return analysis.visits_growth()
+
+    visits = get_visits_growth(sqlite_file)
+    recent = VisitsFilter(start=datetime.date(2022, 11, 1))
+    assert load(recent).equals(visits[1:])
+    old = VisitsFilter(end=datetime.date(2022, 11, 30))
+    assert load(old).equals(visits[:2])
+    some = VisitsFilter(domains=["google.com", "stripe.com", "other.com"])
+    assert load(some).equals(visits[["google.com", "stripe.com"]])
+    prefixed = VisitsFilter(domains=["google.com", "stripe.com"], domain_prefix="s")
+    assert load(prefixed).equals(visits[["stripe.com"]])
+    assert load(VisitsFilter(domain_prefix="%")).empty
+    top = VisitsFilter(top=2, domain_prefix="c")
+    assert load(top).equals(visits[["crunchbase.com"]])
+    top = VisitsFilter(top=2, start=datetime.date(2022, 12, 1))
+    assert load(top).equals(visits.loc[visits.index[2:], ["google.com", "stripe.com"]])
+
+
+def test_rank_websites_from_aggregates(
+    sqlite_file: Path, csv_file: Path, tmp_path: Path
+) -> None:
+    """Test ranking websites from the growths precomputed by the loader.
+
+    Args:
+        sqlite_file: SQLite DB file for testing, loaded before the aggregates.
+        csv_file: csv file for testing.
+        tmp_path: temporary directory.
+    """
+    assert WebVisitsAnalysis.from_sqlite(sqlite_file).growth is None
+    aggregated_sqlite_file = tmp_path / "data.sqlite"
+    load_csv_into_sqlite(csv_file, aggregated_sqlite_file)
+    analysis = WebVisitsAnalysis.from_sqlite(aggregated_sqlite_file)
+    assert analysis.growth is not None
+    assert analysis.rank_websites().equals(rank_websites(sqlite_file))
+    some = VisitsFilter(domains=["google.com", "stripe.com", "pitchbook.com"], top=2)
+    analysis = WebVisitsAnalysis.from_sqlite(aggregated_sqlite_file, visits_filter=some)
+    assert analysis.growth is not None
+    assert analysis.growth.index.tolist() == ["google.com", "stripe.com"]
+    assert analysis.rank_websites().index.tolist() == ["stripe.com", "google.com"]
+
+
+def test_rank_websites_with_weights_and_top(sqlite_file: Path) -> None:
+    """Test ranking websites weighting the growth components, and selecting the top.
+
+    Args:
+        sqlite_file: SQLite DB file for testing.
+    """
+    analysis = WebVisitsAnalysis.from_sqlite(sqlite_file)
+    rank = analysis.rank_websites()
+    assert analysis.rank_websites(top=2).equals(rank[:2])
+    assert analysis.rank_websites(top=10).equals(rank)
+    assert analysis.rank_websites(2.0, 2.0).equals(rank)
+    visits_rank = analysis.rank_websites(ranks_weight=0.0)
+    visits_growth = analysis.visits_growth().pct_change().sum()
+    expected_order = visits_growth.sort_values(ascending=False).index
+    assert visits_rank.index.tolist() == expected_order.tolist()
+
+
 def test_plot_timeseries(
     tmp_path: Path,
 ) -> None:
@@ -123,3 +307,26 @@ def test_plot_rank(
         title="example chart",
     )
     assert chart_file.exists()
+
+
+def test_rank_websites_of_few_websites(
+    sqlite_file: Path, csv_file: Path, tmp_path: Path
+) -> None:
+    """Test ranking no website, or a single one, both from the frame and the DB.
+
+    Args:
+        sqlite_file: SQLite DB file for testing, loaded before the aggregates.
+        csv_file: csv file for testing.
+        tmp_path: temporary directory.
+    """
+    aggregated_sqlite_file = tmp_path / "data.sqlite"
+    load_csv_into_sqlite(csv_file, aggregated_sqlite_file)
+    for db_file in (sqlite_file, aggregated_sqlite_file):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            none = VisitsFilter(domain_prefix="zzz")
+            rank = WebVisitsAnalysis.from_sqlite(db_file, visits_filter=none)
+            assert rank.rank_websites().empty
+            one = VisitsFilter(domains=["google.com"])
+            rank = WebVisitsAnalysis.from_sqlite(db_file, visits_filter=one)
+            assert rank.rank_websites().index.tolist() == ["google.com"]
@@ -0,0 +1,79 @@
+"""Tests the benchmarks, on tiny corpora."""
+import json
+from pathlib import Path
+
+from benchmarks.__main__ import Result, compare, main
+from benchmarks.corpus import scale_pages, write_sites_csv
+from sweb.loader import parse_csv
+from sweb.parser import parse_dom
+
+
+def test_scale_pages() -> None:
+    """Tests making pages of distinct domains out of the fixture pages."""
+    sites = [parse_dom(page) for page in scale_pages(6)]
+    assert len({site.domain for site in sites}) == 6
+
+
+def test_write_sites_csv(tmp_path: Path) -> None:
+    """Tests writing sites of more domains, with longer histories.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    csv_file = tmp_path / "webvisits.csv"
+    write_sites_csv(csv_file, domains=6, months=7)
+    sites = list(parse_csv(csv_file))
+    assert len(sites) == 18
+    assert len({site.domain for site in sites}) == 6
+    assert [site.date for site in sites[:3]] == [
+        "December 2022",
+        "September 2022",
+        "June 2022",
+    ]
+
+
+def test_compare() -> None:
+    """Tests telling the regressions from a baseline."""
+    baseline = {
+        "parse_dom": {"value": 100.0},
+        "rank_websites": {"value": 1.0},
+    }
+    results = {
+        "parse_dom": Result(80.0, "pages/s", True),
+        "rank_websites": Result(1.2, "s", False),
+        "load_bulk": Result(1.0, "rows/s", True),
+    }
+    assert not compare(results, baseline, threshold=0.25)
+    assert compare(results, baseline, threshold=0.1) == [
+        "parse_dom: 80 pages/s, baseline 100 pages/s",
+        "rank_websites: 1.2 s, baseline 1 s",
+    ]
+
+
+def test_main(tmp_path: Path) -> None:
+    """Tests running the benchmarks, storing a baseline and comparing with it.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    baseline_file = tmp_path / "baseline.json"
+    output_file = tmp_path / "results.json"
+    args = ["--pages=1", "--domains=5", "--months=6", "--repeat=1"]
+    args.append(f"--baseline={baseline_file}")
+    assert main(args) == 0
+    assert main(args + ["--update-baseline", f"--output={output_file}"]) == 0
+    baseline = json.loads(baseline_file.read_text())
+    assert baseline == json.loads(output_file.read_text())
+    assert baseline["params"] == {"pages": 1, "domains": 5, "months": 6}
+    assert set(baseline["results"]) == {
+        "parse_dom",
+        "parse_sections",
+        "load_site",
+        "load_bulk",
+        "rank_websites",
+        "get_webvisits_timeseries",
+        "import_workflow",
+    }
+    assert main(args + ["--threshold=1"]) == 0
+    assert main(args + ["--threshold=-1"]) == 1
+    assert main(args[:-1] + ["--domains=6", f"--baseline={baseline_file}"]) == 0
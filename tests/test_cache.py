@@ -0,0 +1,134 @@
+"""Tests caching the SimilarwebSites parsed from HTML files."""
+import os
+import shutil
+import sqlite3
+import unittest.mock
+from pathlib import Path
+
+from sweb.cache import ExtractionCache, file_digest, source_digest
+from sweb.model import SimilarwebSite
+from sweb.sources import HtmlSource
+
+
+def test_file_digest(html_file: Path, tmp_path: Path) -> None:
+    """Tests hashing the content of a file.
+
+    Args:
+        html_file: HTML file for tests.
+        tmp_path: temporary directory.
+    """
+    copied_html_file = tmp_path / "copy.html"
+    shutil.copy(html_file, copied_html_file)
+    assert len(file_digest(html_file)) == 64
+    assert file_digest(copied_html_file) == file_digest(html_file)
+
+
+def test_extraction_cache(
+    html_file: Path, tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests caching the SimilarwebSite parsed from an HTML file.
+
+    Args:
+        html_file: HTML file for tests.
+        tmp_path: temporary directory.
+        similarweb_site: SimilarwebSite data expected for the test HTML file.
+    """
+    cached_html_file = tmp_path / "page.html"
+    shutil.copy(html_file, cached_html_file)
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        key, cached = cache.lookup(HtmlSource(cached_html_file))
+        assert key == file_digest(cached_html_file)
+        assert not cached
+        with unittest.mock.patch("sweb.cache.source_digest") as source_digest_mock:
+            cache.put(HtmlSource(cached_html_file), similarweb_site, key)
+        source_digest_mock.assert_not_called()
+        assert cache.lookup(HtmlSource(cached_html_file)) == (key, True)
+        assert cache.get(key) == similarweb_site
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        os.utime(cached_html_file, ns=(0, 0))
+        assert cache.lookup(HtmlSource(cached_html_file)) == (key, True)
+        renamed_html_file = cached_html_file.rename(tmp_path / "renamed.html")
+        assert cache.lookup(HtmlSource(renamed_html_file)) == (key, True)
+        renamed_html_file.write_text("<html></html>")
+        assert not cache.lookup(HtmlSource(renamed_html_file)).cached
+
+
+def test_extraction_cache_archive_members(
+    html_file: Path, tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests caching the SimilarwebSite parsed from a page in an archive.
+
+    Args:
+        html_file: HTML file for tests.
+        tmp_path: temporary directory.
+        similarweb_site: SimilarwebSite data expected for the test HTML file.
+    """
+    member = HtmlSource(tmp_path / "pages.tar", "page.html", html_file.read_text())
+    assert source_digest(member) == file_digest(html_file)
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        cache.put(HtmlSource(html_file), similarweb_site)
+        assert cache.lookup(member) == (file_digest(html_file), True)
+        assert not cache.lookup(member._replace(html="<html></html>")).cached
+
+
+def test_extraction_cache_invalidation(
+    tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests discarding the entries cached by another parser version.
+
+    Args:
+        tmp_path: temporary directory.
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    html_file = tmp_path / "page.html"
+    html_file.write_text("<html></html>")
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        cache.put(HtmlSource(html_file), similarweb_site)
+    with unittest.mock.patch("sweb.cache.PARSER_VERSION", "0"):
+        with ExtractionCache(tmp_path / "cache.db") as cache:
+            assert not cache.lookup(HtmlSource(html_file)).cached
+
+
+def test_extraction_cache_commits(
+    tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests committing the cached entries every few writes.
+
+    Args:
+        tmp_path: temporary directory.
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    cache_file = tmp_path / "cache.db"
+    with ExtractionCache(cache_file, commit_every=2) as cache:
+        for index in range(3):
+            html_file = tmp_path / f"page{index}.html"
+            html_file.write_text(f"<html>{index}</html>")
+            cache.put(HtmlSource(html_file), similarweb_site)
+            with sqlite3.connect(cache_file) as cache_db:
+                (entries,) = cache_db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            assert entries == [0, 2, 2][index]
+
+
+def test_extraction_cache_eviction(
+    tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests evicting the least recently used entries.
+
+    Args:
+        tmp_path: temporary directory.
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    html_files = [tmp_path / f"page{index}.html" for index in range(3)]
+    with ExtractionCache(tmp_path / "cache.db", max_entries=2) as cache:
+        for index, html_file in enumerate(html_files):
+            html_file.write_text(f"<html>{index}</html>")
+            cache.put(HtmlSource(html_file), similarweb_site)
+        cache.get(file_digest(html_files[0]))
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        assert [
+            not cache.lookup(HtmlSource(html_file)).cached for html_file in html_files
+        ] == [
+            False,
+            True,
+            False,
+        ]
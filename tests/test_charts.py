@@ -0,0 +1,103 @@
+"""Tests exporting charts."""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from sweb.charts import (
+    ChartExporter,
+    downsample,
+    export_timeseries_charts,
+    lttb,
+    top_with_others,
+)
+
+
+def test_chart_exporter(tmp_path: Path) -> None:
+    """Tests exporting charts into files of several formats, concurrently.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    figure = px.bar(x=["a", "b"], y=[1, 2], title="example chart")
+    chart_files = [tmp_path / f"chart.{suffix}" for suffix in ["jpg", "png", "svg"]]
+    with ChartExporter(renderers=2) as exporter:
+        exporter.export((figure, chart_file) for chart_file in chart_files * 2)
+        exporter.write(figure, tmp_path / "chart.html")
+        exporter.write(figure, tmp_path / "chart.json")
+        with pytest.raises(ValueError):
+            exporter.write(figure, tmp_path / "chart.txt")
+    assert (tmp_path / "chart.jpg").read_bytes().startswith(b"\xff\xd8")
+    assert (tmp_path / "chart.png").read_bytes().startswith(b"\x89PNG")
+    assert (tmp_path / "chart.svg").read_text().startswith("<svg")
+    assert "example chart" in (tmp_path / "chart.html").read_text()
+    chart = json.loads((tmp_path / "chart.json").read_text())
+    assert chart["layout"]["title"]["text"] == "example chart"
+
+
+def test_lttb() -> None:
+    """Tests selecting the points that keep the shape of a line."""
+    x_values = np.arange(1000, dtype=float)
+    y_values = np.zeros(1000)
+    y_values[500] = 10.0
+    selected = lttb(x_values, y_values, 10)
+    assert len(selected) == 10
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert (np.diff(selected) > 0).all()
+    assert lttb(x_values[:5], y_values[:5], 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_top_with_others() -> None:
+    """Tests aggregating the timeseries beyond the top ones."""
+    series = pd.DataFrame({"a": [1, 1], "b": [5, 5], "c": [3, 3], "d": [2, 2]})
+    assert top_with_others(series, 4).equals(series)
+    assert top_with_others(series, 3).to_dict("list") == {
+        "b": [5, 5],
+        "c": [3, 3],
+        "others": [3, 3],
+    }
+    assert top_with_others(series, 2, "median", ascending=True).to_dict("list") == {
+        "a": [1, 1],
+        "others": [3, 3],
+    }
+
+
+def test_downsample() -> None:
+    """Tests bounding the dates and timeseries of a chart."""
+    dates = pd.date_range("2000-01-31", periods=240, freq="M")
+    series = pd.DataFrame(
+        np.arange(240 * 30).reshape(240, 30), index=dates, columns=list(range(30))
+    )
+    downsampled = downsample(series, max_points=24, max_lines=5)
+    assert downsampled.shape == (24, 5)
+    assert downsampled.index[[0, -1]].equals(dates[[0, -1]])
+
+
+def test_export_timeseries_charts(tmp_path: Path) -> None:
+    """Tests charting the timeseries of each domain, and of cohorts of domains.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    series = pd.DataFrame(
+        {"a.com": [1, 2, 3], "b.com": [3, 2, 1], "c/d": [2, 2, 2]},
+        index=pd.date_range("2022-10-31", periods=3, freq="M"),
+    )
+    export_timeseries_charts(series, tmp_path / "domains", "json", workers=2)
+    assert sorted(path.name for path in (tmp_path / "domains").iterdir()) == [
+        "a.com.json",
+        "b.com.json",
+        "c_d.json",
+    ]
+    cohorts = {"ab": ["a.com", "b.com"], "cd": ["c/d"]}
+    export_timeseries_charts(series, tmp_path / "cohorts", "svg", cohorts=cohorts)
+    assert sorted(path.name for path in (tmp_path / "cohorts").iterdir()) == [
+        "ab.svg",
+        "cd.svg",
+    ]
+    chart = json.loads((tmp_path / "domains" / "a.com.json").read_text())
+    assert chart["layout"]["title"]["text"] == "a.com"
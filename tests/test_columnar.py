@@ -0,0 +1,42 @@
+"""Tests reading and writing SimilarwebSites in Parquet files."""
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from sweb.columnar import SCHEMA, parse_parquet, write_parquet
+from sweb.loader import normalize_batches, normalize_site, parse_csv
+from sweb.rows import NormalizedSite
+
+
+def test_write_parquet(tmp_path: Path, csv_file: Path) -> None:
+    """Tests writing SimilarwebSites into a Parquet file and parsing them back.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+    """
+    parquet_file = tmp_path / "data.parquet"
+    swsites = list(parse_csv(csv_file))
+    write_parquet(normalize_batches(swsites, batch_size=3), parquet_file)
+    assert pq.ParquetFile(parquet_file).schema_arrow.names == list(
+        NormalizedSite._fields
+    )
+    batches = list(parse_parquet(parquet_file))
+    assert [len(batch) for batch in batches] == [3, 1]
+    sites = [site for batch in batches for site in batch]
+    assert sites == [normalize_site(swsite) for swsite in swsites]
+
+
+def test_parse_parquet_of_other_schema(tmp_path: Path) -> None:
+    """Tests refusing to parse a Parquet file without normalized values.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    parquet_file = tmp_path / "data.parquet"
+    schema = pa.schema([(field.name, pa.string()) for field in SCHEMA])
+    pq.write_table(pa.Table.from_pylist([], schema=schema), parquet_file)
+    with pytest.raises(ValueError):
+        list(parse_parquet(parquet_file))
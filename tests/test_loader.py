@@ -1,22 +1,43 @@
 """Tests loading a csv file of SimilarwebSites into a SQLite DB."""
+import dataclasses
+import shutil
+import sqlite3
 from datetime import date
 from pathlib import Path
+from typing import Dict
 
+import pandas as pd
 import pytest
 from sqlmodel import Session, SQLModel, select
 
 from sweb.loader import (
+    ROW_MODELS,
     as_float,
+    as_float_array,
     as_int,
+    as_int_array,
     as_seconds,
+    as_seconds_array,
+    bulk_load,
+    bulk_load_csv_into_sqlite,
+    bulk_load_into_sqlite,
     create_sqlite_file_db_engine,
+    create_tables,
     get_country_visists_shares,
+    get_site_rows,
+    get_table,
     get_visits_by_age,
     get_webvisits,
+    insert_many,
     load_csv_into_sqlite,
+    normalize_batches,
+    normalize_site,
+    normalize_sites,
     parse_csv,
+    update_aggregates,
 )
 from sweb.model import CountryVisitsShare, SimilarwebSite, VisitsByAge, WebVisits
+from sweb.rows import WebVisitsRow
 
 
 def test_parse_csv(csv_file: Path, similarweb_site: SimilarwebSite) -> None:
@@ -52,6 +73,78 @@ def test_as_seconds() -> None:
     assert as_seconds("01:02:03") == 60 * 60 + 2 * 60 + 3
 
 
+def test_as_number_array() -> None:
+    """Tests normalizing a series of number strings."""
+    with pytest.raises(ValueError):
+        as_float_array(pd.Series(["10", "< 5K"]))
+    for number in ("", "K", "1.2.3", "1.0KB"):
+        with pytest.raises(ValueError):
+            as_float_array(pd.Series(["10", number]))
+    numbers = ["10.0", "10,000.0", "10.0K", "1.0M", "86.4B", "10.0%", "7.43%"]
+    numbers += ["0.005%", "0.015%", "1.005%", "2.675%", "0.00005%"]
+    numbers += [".5", "5.", "1,234.5K", "-5", "1e3", "1234567890123456789"]
+    assert as_float_array(pd.Series(numbers)).tolist() == [
+        as_float(number) for number in numbers
+    ]
+    assert as_int_array(pd.Series(numbers)).tolist() == [
+        as_int(number) for number in numbers
+    ]
+    assert as_float_array(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_as_seconds_array() -> None:
+    """Tests normalizing a series of duration strings."""
+    times = ["01:02:03", "00:04:08", "00:00:00", "100:59:59", "1:2:3", " 1:02:03"]
+    assert as_seconds_array(pd.Series(times)).tolist() == [
+        as_seconds(time) for time in times
+    ]
+    for time in ("01:02", "01::03", "01:02:03:04", "01:02:0x", ""):
+        with pytest.raises(ValueError):
+            as_seconds_array(pd.Series(["01:02:03", time]))
+    assert as_seconds_array(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_normalize_sites(csv_file: Path) -> None:
+    """Tests normalizing a batch of SimilarwebSites per column, as one at a time.
+
+    Args:
+        csv_file: csv file for testing.
+    """
+    swsites = list(parse_csv(csv_file))
+    # percentages whose rounding differs between NumPy and round
+    swsites.append(
+        dataclasses.replace(
+            swsites[-1],
+            bounce_rate="0.005%",
+            top_countries=[("India", "0.015%"), ("Others", "99.98%")],
+            age_distribution=["1.005%", "2.675%", "0.00005%"],
+        )
+    )
+    sites = normalize_sites(swsites)
+    assert sites == [normalize_site(swsite) for swsite in swsites]
+    assert sites[-1].bounce_rate == 0.0001
+    batches = list(normalize_batches(swsites, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [site for batch in batches for site in batch] == sites
+
+
+def test_get_site_rows(similarweb_site: SimilarwebSite) -> None:
+    """Tests obtaining the rows of a SimilarwebSite as plain tuples.
+
+    Args:
+        similarweb_site: testing similarweb site page.
+    """
+    rows = list(get_site_rows(normalize_site(similarweb_site)))
+    assert len(rows) == 3 + 6 + 5
+    assert rows[2] == WebVisitsRow(
+        "pitchbook.com", "2022-12-31", 2500000, 51, 18054, 0.3603, 248
+    )
+    for row_type, model in ROW_MODELS.items():
+        columns = [column.name for column in get_table(model).columns]
+        assert list(row_type._fields) == columns
+        assert sum(isinstance(row, row_type) for row in rows) > 0
+
+
 def test_get_webvisits(similarweb_site: SimilarwebSite) -> None:
     """Tests obtaining the WebVisits represented in a SimilarwebSite.
 
@@ -178,6 +271,55 @@ def test_create_sqlite_file_db_engine(tmp_path: Path) -> None:
     sqlite_file = tmp_path / "data.db"
     engine = create_sqlite_file_db_engine(sqlite_file)
     SQLModel.metadata.create_all(engine)
+    with create_sqlite_file_db_engine(sqlite_file, "load").connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+    with create_sqlite_file_db_engine(sqlite_file, "read").connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA temp_store").scalar() == 2
+
+
+def test_insert_many(tmp_path: Path) -> None:
+    """Test inserting plain rows into a table, and upserting them.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    engine = create_sqlite_file_db_engine(tmp_path / "data.db")
+    create_tables(engine)
+    table = get_table(WebVisits)
+    with engine.begin() as connection:
+        insert_many(connection, table, [WebVisitsRow("a.com", "2022-03-31", 10, 2, 5)])
+        insert_many(
+            connection,
+            table,
+            [
+                WebVisitsRow("a.com", "2022-03-31", 20, 1),
+                WebVisitsRow("b.com", "2022-03-31", 30, 3),
+            ],
+            on_conflict="update",
+        )
+        insert_many(
+            connection,
+            table,
+            [
+                WebVisitsRow("a.com", "2022-03-31", 40, 4),
+                WebVisitsRow("c.com", "2022-03-31", 50, 5),
+            ],
+            on_conflict="ignore",
+        )
+        rows = connection.exec_driver_sql(
+            "SELECT domain, total_visits, category_rank, global_rank FROM webvisits"
+            " ORDER BY domain"
+        ).fetchall()
+    assert rows == [
+        ("a.com", 20, 1, 5),
+        ("b.com", 30, 3, None),
+        ("c.com", 50, 5, None),
+    ]
+    with pytest.raises(sqlite3.IntegrityError), engine.begin() as connection:
+        insert_many(connection, table, [WebVisitsRow("a.com", "2022-03-31", 20, 1)])
+    engine.dispose()
 
 
 def test_load_csv_into_sqlite(tmp_path: Path, csv_file: Path) -> None:
@@ -196,3 +338,166 @@ def test_load_csv_into_sqlite(tmp_path: Path, csv_file: Path) -> None:
         assert sum(1 for _ in session.exec(select(VisitsByAge)).all()) == 6 * 4
 
         assert sum(1 for _ in session.exec(select(CountryVisitsShare)).all()) == 5 * 4
+
+
+def test_bulk_load_csv_into_sqlite(tmp_path: Path, csv_file: Path) -> None:
+    """Tests that loading in bulk produces the same DB contents as site by site.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+    """
+    site_sqlite_file = tmp_path / "site.sqlite"
+    bulk_sqlite_file = tmp_path / "bulk.sqlite"
+    load_csv_into_sqlite(csv_file, site_sqlite_file)
+    bulk_load_csv_into_sqlite(csv_file, bulk_sqlite_file, batch_size=5)
+    for table in ["webvisits", "visitsbyage", "countryvisitsshare"]:
+        query = f"SELECT * FROM {table} ORDER BY 1, 2, 3"
+        with sqlite3.connect(site_sqlite_file) as site_db:
+            expected = site_db.execute(query).fetchall()
+        with sqlite3.connect(bulk_sqlite_file) as bulk_db:
+            assert bulk_db.execute(query).fetchall() == expected
+
+
+def test_load_creates_indexes(tmp_path: Path, csv_file: Path) -> None:
+    """Tests that the loaded DB answers the timeseries queries from an index.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+    """
+    site_sqlite_file = tmp_path / "site.sqlite"
+    bulk_sqlite_file = tmp_path / "bulk.sqlite"
+    load_csv_into_sqlite(csv_file, site_sqlite_file)
+    bulk_load_csv_into_sqlite(csv_file, bulk_sqlite_file)
+    bulk_load_csv_into_sqlite(csv_file, bulk_sqlite_file, upsert=True)
+    query = (
+        "EXPLAIN QUERY PLAN SELECT domain, date, total_visits, category_rank"
+        " FROM webvisits ORDER BY date, domain"
+    )
+    for sqlite_file in [site_sqlite_file, bulk_sqlite_file]:
+        with sqlite3.connect(sqlite_file) as sqlite_db:
+            plan = sqlite_db.execute(query).fetchall()
+        assert [step[-1] for step in plan] == [
+            "SCAN webvisits USING COVERING INDEX ix_webvisits_date_domain"
+        ]
+
+
+def test_bulk_load_upserts(
+    tmp_path: Path, csv_file: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests upserting the next month's SimilarwebSite into a loaded DB, twice.
+
+    The visits and ranks the page re-reports for the months before it
+    don't overwrite the loaded ones.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+        similarweb_site: testing similarweb site page.
+    """
+    sqlite_file = tmp_path / "data.sqlite"
+    bulk_load_csv_into_sqlite(csv_file, sqlite_file)
+    next_month_site = dataclasses.replace(
+        similarweb_site,
+        date="January 2023",
+        global_rank="17,000",
+        total_visits="2.7M",
+        past_category_ranks=[44, 52, 40],
+        past_total_visits=["3.1M", "2.6M", "2.7M"],
+    )
+    engine = create_sqlite_file_db_engine(sqlite_file)
+    bulk_load([next_month_site], engine, upsert=True)
+    recrawled_site = dataclasses.replace(
+        next_month_site, total_visits="2.8M", past_total_visits=["3.1M", "2.6M", "2.8M"]
+    )
+    bulk_load([recrawled_site], engine, upsert=True)
+    with sqlite3.connect(sqlite_file) as sqlite_db:
+        rows = sqlite_db.execute(
+            "SELECT date, global_rank, total_visits, category_rank FROM webvisits"
+            " WHERE domain = 'pitchbook.com' ORDER BY date"
+        ).fetchall()
+        assert sqlite_db.execute("SELECT COUNT(*) FROM visitsbyage").fetchone() == (
+            6 * 5,
+        )
+    assert rows == [
+        ("2022-10-31", None, 2800000, 47),
+        ("2022-11-30", None, 3000000, 43),
+        ("2022-12-31", 18054, 2500000, 51),
+        ("2023-01-31", 17000, 2800000, 40),
+    ]
+
+
+def _get_aggregates(sqlite_file: Path) -> Dict[str, pd.DataFrame]:
+    with sqlite3.connect(sqlite_file) as sqlite_db:
+        return {
+            table: pd.read_sql(f"SELECT * FROM {table} ORDER BY 1, 2", sqlite_db)
+            for table in ["monthlygrowth", "monthlycountryshare"]
+        }
+
+
+def test_update_aggregates(tmp_path: Path, csv_file: Path) -> None:
+    """Tests computing the aggregate tables while loading.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+    """
+    site_sqlite_file = tmp_path / "site.sqlite"
+    load_csv_into_sqlite(csv_file, site_sqlite_file)
+    aggregates = _get_aggregates(site_sqlite_file)
+    with sqlite3.connect(site_sqlite_file) as sqlite_db:
+        visits = pd.read_sql("SELECT * FROM webvisits ORDER BY domain, date", sqlite_db)
+        shares = pd.read_sql("SELECT * FROM countryvisitsshare", sqlite_db)
+    growths = visits.groupby("domain")[["total_visits", "category_rank"]].pct_change()
+    pd.testing.assert_frame_equal(
+        aggregates["monthlygrowth"][["visits_growth", "rank_growth"]],
+        growths.set_axis(["visits_growth", "rank_growth"], axis=1),
+    )
+    country_shares = shares.groupby(["date", "country"])["share"].agg(["count", "mean"])
+    pd.testing.assert_frame_equal(
+        aggregates["monthlycountryshare"],
+        country_shares.reset_index().set_axis(
+            ["date", "country", "domains", "mean_share"], axis=1
+        ),
+    )
+
+    bulk_sqlite_file = tmp_path / "bulk.sqlite"
+    bulk_load_csv_into_sqlite(csv_file, bulk_sqlite_file, batch_size=2)
+    bulk_aggregates = _get_aggregates(bulk_sqlite_file)
+    for table, expected_rows in aggregates.items():
+        pd.testing.assert_frame_equal(bulk_aggregates[table], expected_rows)
+
+
+def test_update_aggregates_incrementally(
+    tmp_path: Path, csv_file: Path, sqlite_file: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Tests updating the aggregate tables of the loaded rows only.
+
+    Args:
+        tmp_path: temporary directory.
+        csv_file: csv file for testing.
+        sqlite_file: SQLite DB file for testing, loaded before the aggregates.
+        similarweb_site: testing similarweb site page.
+    """
+    bulk_sqlite_file = tmp_path / "bulk.sqlite"
+    bulk_load_csv_into_sqlite(csv_file, bulk_sqlite_file)
+    previous_month_site = dataclasses.replace(
+        similarweb_site,
+        date="September 2022",
+        past_category_ranks=[50, 49, 47],
+        past_total_visits=["2.0M", "2.5M", "2.8M"],
+    )
+    outdated_sqlite_file = tmp_path / "outdated.sqlite"
+    shutil.copy(sqlite_file, outdated_sqlite_file)
+    for loaded_sqlite_file in [bulk_sqlite_file, outdated_sqlite_file]:
+        bulk_load_into_sqlite([previous_month_site], loaded_sqlite_file, upsert=True)
+        updated_aggregates = _get_aggregates(loaded_sqlite_file)
+        assert len(updated_aggregates["monthlygrowth"]) == 3 * 4 + 3
+        engine = create_sqlite_file_db_engine(loaded_sqlite_file)
+        with engine.begin() as connection:
+            update_aggregates(connection)
+        engine.dispose()
+        recomputed_aggregates = _get_aggregates(loaded_sqlite_file)
+        for table, expected_rows in updated_aggregates.items():
+            pd.testing.assert_frame_equal(recomputed_aggregates[table], expected_rows)
@@ -0,0 +1,104 @@
+"""Tests measuring the workflow stages."""
+import json
+import threading
+from pathlib import Path
+
+from sweb.metrics import Metrics, Timing
+
+
+def test_measure() -> None:
+    """Tests measuring a stage over several calls."""
+    metrics = Metrics()
+    with metrics.measure("extract", items=2):
+        sum(range(100000))
+    with metrics.measure("extract") as timing:
+        timing.items = 3
+    extract = metrics.timings["extract"]
+    assert extract.items == 5
+    assert extract.calls == 2
+    assert extract.wall_time > 0
+    assert extract.cpu_time >= 0
+    assert extract.items_per_second == 5 / extract.wall_time
+    assert Timing().items_per_second == 0
+
+
+def test_count() -> None:
+    """Tests counting the items of a stage as they come."""
+    metrics = Metrics()
+    items = metrics.count("load", iter("abc"))
+    with metrics.measure("load"):
+        assert list(items) == ["a", "b", "c"]
+    assert metrics.timings["load"].items == 3
+    assert metrics.timings["load"].calls == 1
+
+
+def test_collect() -> None:
+    """Tests collecting Timings apart, and merging them back."""
+    metrics = Metrics()
+    with metrics.measure("extract.read", items=1):
+        pass
+    with metrics.collect() as timings:
+        with metrics.measure("extract.read", items=1):
+            pass
+        with metrics.measure("extract.dom", items=1):
+            pass
+    assert set(timings) == {"extract.read", "extract.dom"}
+    assert metrics.timings["extract.read"].items == 1
+    metrics.merge(timings)
+    assert metrics.timings["extract.read"].items == 2
+    assert metrics.timings["extract.read"].calls == 2
+    assert metrics.timings["extract.dom"].items == 1
+
+
+def test_collect_in_threads() -> None:
+    """Tests collecting the Timings of a thread, while other threads record theirs."""
+    metrics = Metrics()
+    collecting = threading.Event()
+    loads = [0] * 4
+
+    def record_loads(thread: int) -> None:
+        collecting.wait()
+        while collecting.is_set():
+            metrics.record("load", Timing(items=1))
+            loads[thread] += 1
+
+    threads = [threading.Thread(target=record_loads, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    collecting.set()
+    collected = []
+    for _ in range(10000):
+        with metrics.collect() as timings:
+            metrics.record("extract", Timing(items=1))
+        collected.append(timings)
+    collecting.clear()
+    for thread in threads:
+        thread.join()
+    assert all(timings == {"extract": Timing(items=1)} for timings in collected)
+    assert metrics.timings == {"load": Timing(items=sum(loads))}
+
+
+def test_write_json(tmp_path: Path) -> None:
+    """Tests reporting the Timings into a JSON file.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    metrics = Metrics()
+    metrics.record("load", Timing(wall_time=2.0, cpu_time=1.5, items=10, calls=1))
+    metrics.record("extract", Timing(wall_time=1.0, items=4, calls=1))
+    json_file = tmp_path / "metrics.json"
+    metrics.write_json(json_file)
+    report = json.loads(json_file.read_text())
+    assert report["started"] == metrics.started.isoformat()
+    assert report["peak_rss"] > 0
+    assert list(report["stages"]) == ["extract", "load"]
+    assert report["stages"]["load"] == {
+        "wall_time": 2.0,
+        "cpu_time": 1.5,
+        "items": 10,
+        "calls": 1,
+        "items_per_second": 5.0,
+    }
+    metrics.reset()
+    assert not metrics.timings
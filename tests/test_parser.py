@@ -4,7 +4,7 @@ from pathlib import Path
 import parsel.selector
 
 from sweb.model import SimilarwebSite
-from sweb.parser import parse, parse_number
+from sweb.parser import ENGINES, find_section, parse, parse_number, slice_sections
 
 
 def test_parse_number() -> None:
@@ -22,3 +22,34 @@ def test_parse(html_file: Path, similarweb_site: SimilarwebSite) -> None:
     """
     dom = parsel.selector.Selector(text=html_file.read_text())
     assert parse(dom) == similarweb_site
+
+
+def test_slice_sections(html_file: Path) -> None:
+    """Tests slicing the scraped sections out of a Similarweb page.
+
+    Args:
+        html_file: HTML file for tests.
+    """
+    sliced = slice_sections(html_file.read_text(), ["demographics", "overview"])
+    dom = parsel.selector.Selector(text=sliced)
+    assert dom.css("section::attr(id)").getall() == ["demographics", "overview"]
+    assert slice_sections("<html></html>") == "<html><body></body></html>"
+
+
+def test_find_section() -> None:
+    """Tests finding a section of a Similarweb page."""
+    html = '<p></p><section id="ranking"><section></section></section>'
+    assert find_section(html, "ranking") == (7, len(html))
+    assert find_section(html, "overview") is None
+    assert find_section('<section id="ranking"><p>', "ranking") is None
+
+
+def test_engines(source_html_dir: Path) -> None:
+    """Tests that every parser engine scrapes the same values.
+
+    Args:
+        source_html_dir: directory containing the HTML files for tests.
+    """
+    for html_file in source_html_dir.glob("*.html"):
+        html = html_file.read_text()
+        assert ENGINES["sections"](html) == ENGINES["dom"](html)
@@ -0,0 +1,57 @@
+"""Tests profiling the workflow stages."""
+import pstats
+from pathlib import Path
+
+import pytest
+
+from sweb.profiling import STAGES, Profiler, parse_stages
+
+
+def test_parse_stages() -> None:
+    """Tests parsing the stages to profile."""
+    assert parse_stages("") == frozenset()
+    assert parse_stages("extract, load") == {"extract", "load"}
+    assert parse_stages("all") == frozenset(STAGES)
+    with pytest.raises(ValueError, match="plot"):
+        parse_stages("extract,plot")
+
+
+def test_profile(tmp_path: Path) -> None:
+    """Tests profiling the selected stages, over several runs.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    profiler = Profiler()
+    profiler.configure({"extract"}, tmp_path)
+    for _ in range(2):
+        with profiler.profile("extract"):
+            sorted(range(1000))
+        with profiler.profile("load"):
+            sorted(range(1000))
+    stats = pstats.Stats(str(tmp_path / "profile-extract.pstats"))
+    calls = [
+        stat[1]
+        for (_, _, function), stat in stats.stats.items()  # type: ignore[attr-defined]
+        if function == "<built-in method builtins.sorted>"
+    ]
+    assert calls == [2]
+    assert "sorted" in (tmp_path / "profile-extract.txt").read_text()
+    assert not (tmp_path / "profile-load.pstats").exists()
+
+
+def test_profile_concurrent_stages(tmp_path: Path) -> None:
+    """Tests refusing to profile a stage while profiling another one.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    profiler = Profiler()
+    profiler.configure({"extract", "load"}, tmp_path)
+    with profiler.profile("extract"):
+        with pytest.raises(RuntimeError, match="load"):
+            with profiler.profile("load"):
+                pass
+    with profiler.profile("load"):
+        sorted(range(1000))
+    assert (tmp_path / "profile-load.pstats").exists()
@@ -0,0 +1,38 @@
+"""Tests the csv records of the Similarweb pages."""
+from sweb.model import SimilarwebSite
+from sweb.site import decode_site, encode_site, has_visits
+
+
+def test_encode_site(similarweb_site: SimilarwebSite) -> None:
+    """Tests encoding a SimilarwebSite into a csv record and decoding it back.
+
+    Args:
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    record = encode_site(similarweb_site)
+    assert record["domain"] == "pitchbook.com"
+    assert record["past_category_ranks"] == "[47, 43, 51]"
+    assert record["top_countries"].startswith('[["United States", "48.83%"], ')
+    assert decode_site(record) == similarweb_site
+
+
+def test_decode_site_with_python_representation(
+    similarweb_site: SimilarwebSite,
+) -> None:
+    """Tests decoding a csv record whose series hold their Python representation.
+
+    Args:
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    record = {key: str(value) for key, value in vars(similarweb_site).items()}
+    assert decode_site(record) == similarweb_site
+
+
+def test_has_visits(similarweb_site: SimilarwebSite) -> None:
+    """Tests telling the sites with visits stats.
+
+    Args:
+        similarweb_site: SimilarwebSite data for testing.
+    """
+    assert has_visits(similarweb_site)
+    assert not has_visits(SimilarwebSite(total_visits="< 5K"))
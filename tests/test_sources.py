@@ -0,0 +1,64 @@
+"""Tests finding and reading the HTML pages to parse."""
+import gzip
+import tarfile
+import unittest.mock
+import zipfile
+from pathlib import Path
+
+import zstandard
+
+from sweb.sources import find_sources, read_source
+
+
+def test_find_sources(html_file: Path, tmp_path: Path) -> None:
+    """Tests finding the HTML pages in files, compressed files and archives.
+
+    Args:
+        html_file: HTML file for tests.
+        tmp_path: temporary directory.
+    """
+    html = html_file.read_text()
+    (tmp_path / "a.html").write_text(html)
+    (tmp_path / "b.html.gz").write_bytes(gzip.compress(html.encode()))
+    (tmp_path / "c.html.zst").write_bytes(
+        zstandard.ZstdCompressor().compress(html.encode())
+    )
+    (tmp_path / "d.txt").write_text(html)
+    with zipfile.ZipFile(tmp_path / "e.zip", "w") as archive:
+        archive.writestr("2.html", html)
+        archive.writestr("1.html.gz", gzip.compress(html.encode()))
+        archive.writestr("3.txt", html)
+    with tarfile.open(tmp_path / "f.tar.gz", "w:gz") as archive:
+        archive.add(tmp_path / "b.html.gz", "2.html.gz")
+        archive.add(tmp_path / "a.html", "1.html")
+        archive.add(tmp_path / "d.txt", "3.txt")
+        archive.add(tmp_path, "pages", recursive=False)
+    sources = list(find_sources(tmp_path))
+    assert [source.name for source in sources] == [
+        (tmp_path / "a.html").as_posix(),
+        (tmp_path / "b.html.gz").as_posix(),
+        (tmp_path / "c.html.zst").as_posix(),
+        f"{(tmp_path / 'e.zip').as_posix()}!1.html.gz",
+        f"{(tmp_path / 'e.zip').as_posix()}!2.html",
+        f"{(tmp_path / 'f.tar.gz').as_posix()}!2.html.gz",
+        f"{(tmp_path / 'f.tar.gz').as_posix()}!1.html",
+    ]
+    assert [source.html is None for source in sources] == [True] * 3 + [False] * 4
+    assert [read_source(source) for source in sources] == [html] * 7
+
+
+def test_find_sources_in_large_zip(tmp_path: Path) -> None:
+    """Tests reading a zip archive of many pages, opening it only once.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    with zipfile.ZipFile(tmp_path / "pages.zip", "w") as archive:
+        for index in range(4000):
+            archive.writestr(f"{index:04}.html", f"<html>{index}</html>")
+    with unittest.mock.patch(
+        "sweb.sources.zipfile.ZipFile", wraps=zipfile.ZipFile
+    ) as zip_file_mock:
+        pages = [read_source(source) for source in find_sources(tmp_path)]
+    assert pages == [f"<html>{index}</html>" for index in range(4000)]
+    zip_file_mock.assert_called_once()
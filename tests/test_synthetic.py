@@ -0,0 +1,144 @@
+"""Tests generating synthetic Similarweb data."""
+import sqlite3
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sweb.loader import bulk_load_csv_into_sqlite, load_csv_into_sqlite
+from sweb.parser import ENGINES
+from sweb.synthetic import (
+    PageTemplate,
+    generate_history,
+    history_sites,
+    write_history_csv,
+    write_history_sqlite,
+    write_pages,
+)
+from sweb.workflow import extract_sites, write_csv
+
+TABLES = (
+    "webvisits",
+    "visitsbyage",
+    "countryvisitsshare",
+    "monthlygrowth",
+    "monthlycountryshare",
+)
+
+
+def read_tables(sqlite_file: Path) -> Dict[str, pd.DataFrame]:
+    """Reads the tables of a DB, sorted by all their columns.
+
+    Args:
+        sqlite_file: the SQLite DB.
+
+    Returns:
+        The tables.
+    """
+    with sqlite3.connect(sqlite_file) as connection:
+        tables = {
+            table: pd.read_sql(f"SELECT * FROM {table}", connection)  # nosec
+            for table in TABLES
+        }
+    return {
+        table: frame.sort_values(list(frame.columns)).reset_index(drop=True)
+        for table, frame in tables.items()
+    }
+
+
+def test_generate_history() -> None:
+    """Tests generating the visits of domains over months."""
+    history = generate_history(domains=4, months=7, seed=1)
+    assert len(history.domains) == 4
+    assert history.months[-1] == pd.Period("December 2022")
+    assert history.total_visits.shape == (4, 7)
+    assert (history.total_visits > 0).all()
+    assert (history.country_shares.sum(axis=-1) <= 10000).all()
+    assert list(history.site_months) == [6, 3]
+    other = generate_history(domains=4, months=7, seed=1)
+    assert np.array_equal(history.total_visits, other.total_visits)
+
+
+def test_history_sites() -> None:
+    """Tests making the SimilarwebSites of a History."""
+    history = generate_history(domains=3, months=8)
+    sites = list(history_sites(history))
+    assert len(sites) == 6
+    assert [site.date for site in sites[:2]] == ["December 2022", "September 2022"]
+    assert len(list(history_sites(history, sites=1))) == 3
+
+
+def test_write_history_csv(tmp_path: Path) -> None:
+    """Tests writing the sites of a History, as write_csv writes them.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    history = generate_history(domains=20, months=9, seed=2)
+    write_history_csv(history, tmp_path / "history.csv")
+    write_csv(history_sites(history), tmp_path / "sites.csv")
+    history_csv = (tmp_path / "history.csv").read_text()
+    assert history_csv == (tmp_path / "sites.csv").read_text()
+
+
+def test_write_history_sqlite(tmp_path: Path) -> None:
+    """Tests writing a History into a DB, as the loaders load its sites.
+
+    Args:
+        tmp_path: temporary directory.
+    """
+    history = generate_history(domains=20, months=10, seed=3)
+    csv_file = tmp_path / "webvisits.csv"
+    write_history_csv(history, csv_file)
+    write_history_sqlite(history, tmp_path / "history.db")
+    expected = read_tables(tmp_path / "history.db")
+    loaders: Tuple[Callable[[Path, Path], None], ...] = (
+        load_csv_into_sqlite,
+        bulk_load_csv_into_sqlite,
+    )
+    for loader in loaders:
+        sqlite_file = tmp_path / f"{loader.__name__}.db"
+        loader(csv_file, sqlite_file)
+        for table, frame in read_tables(sqlite_file).items():
+            pd.testing.assert_frame_equal(frame, expected[table])
+
+
+def test_page_template(html_file: Path) -> None:
+    """Tests rendering sites into a page, which parses back into them.
+
+    Args:
+        html_file: HTML file for tests.
+    """
+    template = PageTemplate.from_file(html_file)
+    for site in history_sites(generate_history(domains=10, months=3)):
+        page = template.render(site)
+        assert all(parse(page) == site for parse in ENGINES.values())
+    with pytest.raises(ValueError):
+        PageTemplate("<html></html>")
+    page = html_file.read_text()
+    with pytest.raises(ValueError):
+        PageTemplate(page.replace("highcharts-markers", "markers"))
+    with pytest.raises(ValueError):
+        PageTemplate(page.replace("highcharts-yaxis-labels", "yaxis-labels"))
+    with pytest.raises(ValueError):
+        PageTemplate(page.replace(" A 4 4 0 1 1 ", " L "))
+    with pytest.raises(ValueError):
+        PageTemplate(page.replace("wa-traffic__chart-data-label", "label"))
+
+
+def test_write_pages(html_file: Path, tmp_path: Path) -> None:
+    """Tests writing the pages of sites, and extracting the sites back.
+
+    Args:
+        html_file: HTML file for tests.
+        tmp_path: temporary directory.
+    """
+    sites = list(history_sites(generate_history(domains=3, months=6)))
+    write_pages(sites, tmp_path, PageTemplate.from_file(html_file))
+    assert len(list(tmp_path.glob("*.html"))) == 6
+    extracted = sorted(
+        extract_sites(tmp_path), key=lambda site: (site.domain, site.date)
+    )
+    assert extracted == sorted(sites, key=lambda site: (site.domain, site.date))
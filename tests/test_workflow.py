@@ -1,15 +1,36 @@
 """Test the app."""
+import gzip
+import json
 import os
+import pstats
+import sqlite3
+import subprocess  # nosec
+import sys
+import tarfile
+import time
 import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Iterator
 
+import pytest
+
+from sweb.cache import ExtractionCache
+from sweb.loader import parse_csv
+from sweb.metrics import METRICS
+from sweb.model import SimilarwebSite
 from sweb.workflow import (
     analyse_ranks_growth,
     analyse_visits_growth,
     extract_csv,
+    extract_load_sqlite,
+    extract_parquet,
+    extract_sites,
     load_sqlite,
+    main,
     rank,
     run,
+    write_csv,
 )
 
 
@@ -28,6 +49,221 @@ def test_extract_csv(source_html_dir: Path, tmp_path: Path) -> None:
     assert len(csv_rows[0].split(",")) == 10
 
 
+def test_extract_sites_in_parallel(source_html_dir: Path) -> None:
+    """Test parsing the HTML files with a pool of processes.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+    """
+    sites = list(extract_sites(source_html_dir))
+    assert [site.domain for site in sites] == [
+        "byte-trading.com",
+        "crunchbase.com",
+        "google.com",
+        "pitchbook.com",
+        "stripe.com",
+    ]
+    METRICS.reset()
+    assert list(extract_sites(source_html_dir, workers=2, chunksize=2)) == sites
+    # the timings of the pages parsed by the worker processes are merged
+    assert METRICS.timings["extract.read"].items == 5
+    assert METRICS.timings["extract.dom"].calls == 5
+    assert METRICS.timings["extract"].items == 5
+    assert list(extract_sites(source_html_dir, engine="sections")) == sites
+
+
+def test_extract_compressed_sites(source_html_dir: Path, tmp_path: Path) -> None:
+    """Test parsing compressed HTML files and archives of them.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        tmp_path: temporary directory for testing.
+    """
+    html_files = sorted(source_html_dir.glob("*.html"))
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for html_file in html_files[:2]:
+        compressed_html_file = html_dir / f"{html_file.name}.gz"
+        compressed_html_file.write_bytes(gzip.compress(html_file.read_bytes()))
+    with tarfile.open(html_dir / "similarweb-pages.tar.gz", "w:gz") as archive:
+        for html_file in html_files[2:]:
+            archive.add(html_file, html_file.name)
+    sites = list(extract_sites(source_html_dir))
+    assert list(extract_sites(html_dir)) == sites
+    assert list(extract_sites(html_dir, workers=2)) == sites
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        assert list(extract_sites(html_dir, cache=cache)) == sites
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        with unittest.mock.patch(
+            "sweb.workflow.parse_html_file", side_effect=AssertionError
+        ):
+            assert list(extract_sites(html_dir, cache=cache)) == sites
+
+
+def test_extract_sites_with_cache(source_html_dir: Path, tmp_path: Path) -> None:
+    """Test parsing only the HTML files whose content is missing from the cache.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        tmp_path: temporary directory for testing.
+    """
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for html_file in sorted(source_html_dir.glob("*.html"))[:3]:
+        (html_dir / html_file.name).write_text(html_file.read_text())
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        sites = list(extract_sites(html_dir, cache=cache))
+    (html_dir / "similarweb-new-com.html").write_text(
+        (html_dir / "similarweb-google-com.html").read_text()
+    )
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        with unittest.mock.patch(
+            "sweb.workflow.parse_html_file", side_effect=AssertionError
+        ):
+            assert list(extract_sites(html_dir, cache=cache)) == sites + sites[-1:]
+    assert [site.domain for site in sites] == [
+        "byte-trading.com",
+        "crunchbase.com",
+        "google.com",
+    ]
+
+
+def test_extract_sites_parses_only_misses(
+    source_html_dir: Path, tmp_path: Path
+) -> None:
+    """Test sending only the pages missing from the cache to be parsed, in order.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        tmp_path: temporary directory for testing.
+    """
+    html_files = sorted(source_html_dir.glob("*.html"))[:3]
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for html_file in html_files[::2]:
+        (html_dir / html_file.name).write_text(html_file.read_text())
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        list(extract_sites(html_dir, cache=cache))
+    (html_dir / html_files[1].name).write_text(html_files[1].read_text())
+    chunks = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        """Executor recording the chunks it's sent, in place of the process pool."""
+
+        def __init__(self, max_workers: int, mp_context: Any) -> None:
+            assert mp_context is not None
+            super().__init__(max_workers)
+
+        def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> Any:
+            chunks.append([source.name for source in args[0]])
+            return super().submit(fn, *args, **kwargs)
+
+    with ExtractionCache(tmp_path / "cache.db") as cache:
+        with unittest.mock.patch(
+            "sweb.workflow.ProcessPoolExecutor", RecordingExecutor
+        ):
+            sites = list(extract_sites(html_dir, workers=2, chunksize=10, cache=cache))
+    assert chunks == [[str(html_dir / html_files[1].name)]]
+    assert [site.domain for site in sites] == [
+        "byte-trading.com",
+        "crunchbase.com",
+        "google.com",
+    ]
+
+
+def test_write_csv_streams_sites(
+    tmp_path: Path, similarweb_site: SimilarwebSite
+) -> None:
+    """Test that sites are readable from the csv file while it's being written.
+
+    Args:
+        tmp_path: temporary directory for testing.
+        similarweb_site: SimilarwebSite to write.
+    """
+    csv_file = tmp_path / "data.csv"
+
+    def _sites() -> Iterator[SimilarwebSite]:
+        yield similarweb_site
+        yield similarweb_site
+        assert list(parse_csv(csv_file)) == [similarweb_site, similarweb_site]
+        yield similarweb_site
+
+    write_csv(_sites(), csv_file, flush_every=1)
+    assert list(parse_csv(csv_file)) == [similarweb_site] * 3
+
+
+def test_extract_parquet(source_html_dir: Path, tmp_path: Path) -> None:
+    """Test extracting SimilarwebSites into a Parquet file, and loading it as a csv.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        tmp_path: temporary directory for testing.
+    """
+    parquet_file = tmp_path / "data.parquet"
+    extract_parquet(html_dir=source_html_dir, parquet_file=parquet_file)
+    assert parquet_file.exists()
+    csv_file = tmp_path / "data.csv"
+    extract_csv(html_dir=source_html_dir, csv_file=csv_file)
+    for bulk in [False, True]:
+        sqlite_file = tmp_path / f"parquet-{bulk}.db"
+        load_sqlite(parquet_file, sqlite_file, bulk=bulk)
+        csv_sqlite_file = tmp_path / f"csv-{bulk}.db"
+        load_sqlite(csv_file, csv_sqlite_file, bulk=bulk)
+        for table in ["webvisits", "visitsbyage", "countryvisitsshare"]:
+            query = f"SELECT * FROM {table} ORDER BY 1, 2, 3"
+            with sqlite3.connect(csv_sqlite_file) as csv_db:
+                expected = csv_db.execute(query).fetchall()
+            with sqlite3.connect(sqlite_file) as parquet_db:
+                assert parquet_db.execute(query).fetchall() == expected
+
+
+def test_extract_load_sqlite(
+    source_html_dir: Path, csv_file: Path, tmp_path: Path
+) -> None:
+    """Test parsing the HTML files straight into a SQLite DB.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        csv_file: csv file containing testing data.
+        tmp_path: temporary directory for testing.
+    """
+    sqlite_file = tmp_path / "pipeline.db"
+    side_csv_file = tmp_path / "data.csv"
+    extract_load_sqlite(source_html_dir, sqlite_file, side_csv_file, workers=2)
+    assert len(side_csv_file.read_text().splitlines()) == 6
+    staged_sqlite_file = tmp_path / "staged.db"
+    load_sqlite(csv_file, staged_sqlite_file, bulk=True)
+    for table in ["webvisits", "visitsbyage", "countryvisitsshare"]:
+        query = f"SELECT * FROM {table} ORDER BY 1, 2, 3"
+        with sqlite3.connect(staged_sqlite_file) as staged_db:
+            expected = staged_db.execute(query).fetchall()
+        with sqlite3.connect(sqlite_file) as pipeline_db:
+            assert pipeline_db.execute(query).fetchall() == expected
+    extract_load_sqlite(source_html_dir, sqlite_file, incremental=True)
+
+
+def test_extract_load_sqlite_fails_with_loading(
+    source_html_dir: Path, tmp_path: Path
+) -> None:
+    """Test that parsing the HTML files into SQLite stops when loading fails.
+
+    Args:
+        source_html_dir: directory containing the HTML files to parse.
+        tmp_path: temporary directory for testing.
+    """
+
+    def _fail_loading(*_: Any) -> None:
+        time.sleep(1.5)
+        raise RuntimeError("loading failed")
+
+    with unittest.mock.patch("sweb.workflow.QUEUE_SIZE", 1):
+        with unittest.mock.patch(
+            "sweb.loader.bulk_load_into_sqlite", side_effect=_fail_loading
+        ):
+            with pytest.raises(RuntimeError):
+                extract_load_sqlite(source_html_dir, tmp_path / "data.db")
+
+
 def test_load(csv_file: Path, tmp_path: Path) -> None:
     """Test extracting an SimilarwebSite into a csv file.
 
@@ -38,6 +274,11 @@ def test_load(csv_file: Path, tmp_path: Path) -> None:
     sqlite_file = tmp_path / "webvisits.jpg"
     load_sqlite(csv_file, sqlite_file)
     assert sqlite_file.exists()
+    bulk_sqlite_file = tmp_path / "bulk.db"
+    load_sqlite(csv_file, bulk_sqlite_file, bulk=True, batch_size=10)
+    assert bulk_sqlite_file.exists()
+    load_sqlite(csv_file, bulk_sqlite_file, incremental=True)
+    assert bulk_sqlite_file.exists()
 
 
 def test_analyse_vists_growth(sqlite_file: Path, tmp_path: Path) -> None:
@@ -85,7 +326,15 @@ def test_run_pipeline(tmp_path: Path) -> None:
     results_path = tmp_path / "results"
     results_path.mkdir()
     (results_path / "webvisits.db").touch()
-    with unittest.mock.patch.dict(os.environ, {"RESULTS_DIR": results_path.as_posix()}):
+    with unittest.mock.patch.dict(
+        os.environ,
+        {
+            "RESULTS_DIR": results_path.as_posix(),
+            "SWEB_WORKERS": "2",
+            "SWEB_CACHE": (tmp_path / "cache.db").as_posix(),
+            "SWEB_RENDERERS": "2",
+        },
+    ):
         run()
     assert results_path.exists()
     assert (results_path / "webvisits.csv").exists()
@@ -93,3 +342,175 @@ def test_run_pipeline(tmp_path: Path) -> None:
     assert (results_path / "visits_growth.jpg").exists()
     assert (results_path / "ranks_growth.jpg").exists()
     assert (results_path / "websites_rank.jpg").exists()
+    stages = json.loads((results_path / "metrics.json").read_text())["stages"]
+    assert stages["extract"]["items"] == 5
+    assert stages["extract.lookup"]["items"] == 5
+    # sites without visits aren't loaded
+    assert stages["load"]["items"] == 4
+    assert {"load.normalize", "load.flush", "analyse.rank", "analyse.plot"} < set(
+        stages
+    )
+
+
+def test_run_pipeline_with_parquet(tmp_path: Path) -> None:
+    """Test running all pipeline steps, with a Parquet intermediate file.
+
+    Args:
+        tmp_path: temporary directory for testing.
+    """
+    results_path = tmp_path / "results"
+    with unittest.mock.patch.dict(
+        os.environ,
+        {"RESULTS_DIR": results_path.as_posix(), "SWEB_INTERMEDIATE": "parquet"},
+    ):
+        run()
+    assert (results_path / "webvisits.parquet").exists()
+    assert not (results_path / "webvisits.csv").exists()
+    assert (results_path / "webvisits.db").exists()
+
+
+def test_run_pipeline_with_unknown_settings(tmp_path: Path) -> None:
+    """Test refusing to run the pipeline with settings it can't apply.
+
+    Args:
+        tmp_path: temporary directory for testing.
+    """
+    results_path = tmp_path / "results"
+    for name, value in (
+        ("SWEB_INTERMEDIATE", "json"),
+        ("SWEB_INTERMEDIATE", "none"),
+        ("SWEB_LOADER", "orm"),
+        ("SWEB_PARSER", "regex"),
+        ("SWEB_CHART_FORMAT", "gif"),
+    ):
+        with unittest.mock.patch.dict(
+            os.environ, {"RESULTS_DIR": results_path.as_posix(), name: value}
+        ):
+            with pytest.raises(ValueError, match=name):
+                run()
+    assert not results_path.exists()
+
+
+def test_main_stages_check_their_settings(tmp_path: Path) -> None:
+    """Test checking only the settings of the stages to run.
+
+    Args:
+        tmp_path: temporary directory for testing.
+    """
+    results_path = tmp_path / "results"
+    with unittest.mock.patch.dict(
+        os.environ,
+        {
+            "RESULTS_DIR": results_path.as_posix(),
+            "SWEB_INTERMEDIATE": "none",
+            "SWEB_PARSER": "regex",
+            "SWEB_CHART_FORMAT": "gif",
+        },
+    ):
+        with pytest.raises(ValueError, match="SWEB_PARSER"):
+            main(["extract"])
+        with pytest.raises(ValueError, match="SWEB_INTERMEDIATE"):
+            main(["load"])
+        with pytest.raises(ValueError, match="SWEB_CHART_FORMAT"):
+            main(["analyse"])
+        with unittest.mock.patch.dict(os.environ, {"SWEB_CHART_FORMAT": "html"}):
+            with unittest.mock.patch("sweb.workflow.analyse") as analyse:
+                main(["analyse"])
+    analyse.assert_called_once()
+
+
+def test_run_streaming_pipeline(tmp_path: Path) -> None:
+    """Test running all pipeline steps, loading the data while extracting it.
+
+    Args:
+        tmp_path: temporary directory for testing.
+    """
+    results_path = tmp_path / "results"
+    with unittest.mock.patch.dict(
+        os.environ,
+        {
+            "RESULTS_DIR": results_path.as_posix(),
+            "SWEB_PIPELINE": "1",
+            "SWEB_INTERMEDIATE": "none",
+            "SWEB_CHART_FORMAT": "html",
+            "SWEB_DOMAIN_CHARTS": "1",
+            "SWEB_PROFILE": "load",
+        },
+    ):
+        run()
+    assert not (results_path / "webvisits.none").exists()
+    assert (results_path / "webvisits.db").exists()
+    assert (results_path / "websites_rank.html").exists()
+    assert (results_path / "domains" / "google.com.html").exists()
+    stages = json.loads((results_path / "metrics.json").read_text())["stages"]
+    assert stages["extract"]["items"] == 5
+    assert stages["load"]["items"] == 4
+    assert stages["analyse.domain_charts"]["items"] == 4
+    # the load stage is profiled in the thread loading the data
+    load_profile = pstats.Stats(str(results_path / "profile-load.pstats"))
+    assert any(
+        function == "bulk_load_into_sqlite"
+        for _, _, function in load_profile.stats  # type: ignore[attr-defined]
+    )
+    assert not (results_path / "profile-extract.pstats").exists()
+    assert not (results_path / "profile-analyse.pstats").exists()
+    # the overlapping stages can't be profiled at once
+    with unittest.mock.patch.dict(
+        os.environ,
+        {
+            "RESULTS_DIR": results_path.as_posix(),
+            "SWEB_PIPELINE": "1",
+            "SWEB_PROFILE": "extract,load",
+        },
+    ):
+        with pytest.raises(ValueError, match="extract and load"):
+            run()
+
+
+def test_main_stages(tmp_path: Path) -> None:
+    """Test running each stage apart from the command line.
+
+    Args:
+        tmp_path: temporary directory for testing.
+    """
+    results_path = tmp_path / "results"
+    with unittest.mock.patch.dict(
+        os.environ,
+        {
+            "RESULTS_DIR": results_path.as_posix(),
+            "SWEB_CACHE": (tmp_path / "cache.db").as_posix(),
+            "SWEB_CACHE_SIZE": "10",
+            "SWEB_CHART_FORMAT": "html",
+        },
+    ):
+        main(["extract"])
+        assert (results_path / "webvisits.csv").exists()
+        assert not (results_path / "webvisits.db").exists()
+        main(["load"])
+        assert (results_path / "webvisits.db").exists()
+        assert not (results_path / "websites_rank.html").exists()
+        main(["analyse"])
+        assert (results_path / "websites_rank.html").exists()
+        stages = json.loads((results_path / "metrics.json").read_text())["stages"]
+        assert "analyse" in stages
+        assert "load" not in stages
+        (results_path / "websites_rank.html").unlink()
+        main([])
+        assert (results_path / "websites_rank.html").exists()
+
+
+def test_import_stages_lazily() -> None:
+    """Test that importing the workflow doesn't import the stages dependencies."""
+    heavy_modules = ("pandas", "plotly", "parsel", "sqlalchemy", "sqlmodel")
+    imported = subprocess.run(  # nosec
+        [
+            sys.executable,
+            "-c",
+            "import sys, sweb.workflow;"
+            f"print(*sorted(sys.modules.keys() & {set(heavy_modules)}))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert imported.stdout.strip() == ""